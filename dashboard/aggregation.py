@@ -0,0 +1,81 @@
+'''-------------------------------------------------------------------------------------------
+                                      >> AGGREGATION <<
+   -------------------------------------------------------------------------------------------
+   The sums the callbacks need, computed once per data load for all the registered metrics:
+   one group-by per view over every actual and target column, instead of one filter and
+   group-by per request. A request is then a lookup whatever the number of metrics.
+'''
+import numpy as np
+import pandas as pd
+
+from metrics import registry, columns
+
+
+class Cube:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * sales: dataframe of sales_summary.csv
+        * registry: metrics whose actual and target columns are summed (list of metrics.Metric)
+
+    dense (date, City, Cat, column) array of the sums: every breakdown of the dashboard is a slice
+    and a sum of it, whatever the number of dimensions shown
+    """
+    dimensions = ['City', 'Cat']
+
+    def __init__(self, sales, registry=registry):
+        self.columns = columns(registry)
+        grouped = sales.groupby(['Date'] + self.dimensions)[self.columns].sum()
+        full = pd.MultiIndex.from_product(grouped.index.remove_unused_levels().levels)
+        self.dates, *labels = full.levels
+        self.labels = dict(zip(self.dimensions, labels))
+        shape = [len(level) for level in full.levels] + [len(self.columns)]
+        self.values = grouped.reindex(full, fill_value=0).to_numpy().reshape(shape)
+
+    def filter(self, cells, filters=None):
+        """ zero the cells (with or without the date axis) out of the filters ({column: value or list of values}) """
+        first = cells.ndim - 1 - len(self.dimensions)
+        for axis, dimension in enumerate(self.dimensions, start=first):
+            if filters and dimension in filters:
+                values = filters[dimension]
+                keep = self.labels[dimension].isin([values] if np.isscalar(values) else values)
+                cells = cells * np.expand_dims(keep, tuple(i for i in range(cells.ndim) if i != axis))
+        return cells
+
+    def month(self, month, filters=None):
+        """ (City, Cat, column) sums of a month number, the filtered dimensions keep only their values """
+        return self.filter(self.values[self.dates.month == month].sum(axis=0), filters)
+
+    def series(self, filters=None):
+        """ daily sums of the filtered cells, one column per summed column """
+        daily = self.filter(self.values, filters).sum(axis=tuple(range(1, 1 + len(self.dimensions))))
+        return pd.DataFrame(daily, index=self.dates, columns=self.columns)
+
+    def by(self, cells, dimension):
+        """ dataframe of cells summed per value of a dimension, one column per summed column """
+        others = tuple(axis for axis, other in enumerate(self.dimensions) if other != dimension)
+        return pd.DataFrame(cells.sum(axis=others), index=self.labels[dimension], columns=self.columns)
+
+    def ratio(self, cells, metric):
+        """ (City, Cat) actual / target of a metric """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return cells[..., self.columns.index(metric.key)] / cells[..., self.columns.index(metric.target)]
+
+
+def aggregate(sales, dashboard_date, registry=registry):
+    """
+        * by_month: totals per month number (index 1-12)
+        * to_date_by_month: same, only the days up to the dashboard date
+        * monthly: totals per month (index: first day of the month)
+        * cube: sums per (date, City, Cat), for the breakdowns
+    """
+    values = columns(registry)
+    month = sales['Date'].dt.month.rename('month')
+    to_date = sales['Date'].dt.date <= dashboard_date
+    months = sorted(month.unique())
+    return dict(
+        by_month=sales.groupby(month)[values].sum(),
+        to_date_by_month=sales.loc[to_date].groupby(month[to_date])[values].sum().reindex(months, fill_value=0),
+        monthly=sales.groupby('Date')[values].sum().resample('MS').sum(),
+        cube=Cube(sales, registry),
+    )
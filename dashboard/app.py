@@ -1,18 +1,41 @@
 import os
+import sys
 
 import pandas as pd
 import numpy as np
-from dateutil.parser import parse
-import plotly.graph_objects as go
 
+import time
 import datetime
 import calendar
+import glob
+import threading
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 
+import flask
 import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Output, Input
+from dash.dependencies import Output, Input, State
+from dash.exceptions import PreventUpdate
+
+# modules shared by the dashboard and the report
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figure_template import FigureTemplate
+from metrics import registry, metrics, columns
+from aggregation import aggregate, Cube
+from row_index import RowIndex
+from downsampling import lttb, min_max
+from export import formats as export_formats, iter_chunks, rechunk, content_disposition
+from scenarios import simulate, percentiles
+from shared.http_cache import create_server, enable_etags
+from shared.styling import threshold_colors, millify
+from shared.chunked import PartialAggregate, read_chunks, aggregate_chunks
+from shared.partitions import PartitionedDataset, METADATA
+from shared.memory import BudgetCache, enable_memory_endpoint
+from shared.jobs import JobQueue, job_components, background_callback, enable_jobs_endpoint
+from shared.result_cache import SharedCache, content_version
 
 
 '''
@@ -23,16 +46,84 @@ from dash.dependencies import Output, Input
 # ## TODO: GET RESOLUTION OF THE WEB BROWSER
 
 ## PLOTLY
-import plotly.io as pio
-pio.templates.default = "plotly_white"
+# plotly.graph_objects (and the template it loads) is the slowest import of the app,
+# it is only imported when the first figure is built
+go = None
+
+def init_plotly():
+    global go
+    if go is None:
+        import plotly.graph_objects
+        import plotly.io as pio
+        pio.templates.default = "plotly_white"
+        go = plotly.graph_objects
+    return go
+
+## SCENARIOS
+# monte-carlo targets, the dashboard shows the band between the two percentiles
+scenario_count = 1000
+scenario_band = (10, 90)
+
+## DAILY SERIES
+# most points sent per trace of the daily chart, whatever the length of the zoomed range
+daily_max_points = 1000
+# 'lttb' keeps the shape of the lines, 'min_max' every peak
+daily_downsampling = 'lttb'
+
+## DATA
+# a csv file or a month partitioned dataset (python -m shared.partitions). The exports and the
+# filtered views of a partitioned dataset only read the partitions of their month, the whole
+# dataset is only read to build the cube and the scenarios, once per version of the data when
+# the workers share their results (SALES_DATA)
+sales_path = os.environ.get('SALES_DATA', 'sales_summary.csv')
+# the csv is read and summed per (Date, City, Cat) chunk_size rows at a time, the file can be
+# larger than the memory of a worker (DATA_CHUNK_SIZE)
+chunk_size = int(os.environ.get('DATA_CHUNK_SIZE', 100_000))
+
+## WARM-UP
+# compute every view of the dashboard in background when the app starts (WARM_UP=0 to disable)
+warm_up_on_start = os.environ.get('WARM_UP', '1') == '1'
+warm_up_workers = 4
+
+## JOBS
+# the views are computed on a pool of job_workers threads, out of the request threads: the
+# browser polls its job every job_poll_ms until the figures are ready (JOB_WORKERS)
+job_workers = int(os.environ.get('JOB_WORKERS', 2))
+job_poll_ms = 500
+# /_jobs: status of the jobs, DELETE /_jobs/<id> cancels one (JOBS_ENDPOINT=1)
+jobs_endpoint = os.environ.get('JOBS_ENDPOINT', '0') == '1'
+
+## SHARED CACHE
+# aggregates, scenarios and views computed by a worker are written to result_cache_dir and read
+# by the other workers of the host, for result_cache_ttl seconds (RESULT_CACHE_TTL) within
+# result_cache_bytes (RESULT_CACHE_MB). Disabled unless RESULT_CACHE_DIR is set: a folder of the
+# user running the app, created with mode 700, refused if others can write to it. A change of
+# the data or of the code of the dashboard (dashboard/*.py, shared/*.py) starts a new cache.
+result_cache_dir = os.environ.get('RESULT_CACHE_DIR', '')
+result_cache_ttl = float(os.environ.get('RESULT_CACHE_TTL', 24 * 3600))
+result_cache_bytes = int(os.environ.get('RESULT_CACHE_MB', 512)) * 2**20
+
+## MEMORY
+# budget of the cache of the computed views, the least recently used are evicted (OUTPUTS_CACHE_MB)
+outputs_cache_bytes = int(os.environ.get('OUTPUTS_CACHE_MB', 256)) * 2**20
+# /_memory: bytes per dataset, aggregate, cache and figure template (MEMORY_ENDPOINT=1) and the
+# allocation peak of each request (MEMORY_TRACE=1, slows the app down)
+memory_endpoint = os.environ.get('MEMORY_ENDPOINT', '0') == '1'
+memory_trace = os.environ.get('MEMORY_TRACE', '0') == '1'
+
+## JSON
+# send the figure arrays as base64 typed arrays, needs plotly.js >= 2.28 (dash >= 2.15)
+typed_arrays = False
 
 ## DASH
 config_dash = {'displayModeBar': False, 'showAxisDragHandles':False}  
 margin = dict(l=20, r=20, t=10, b=10)
 # External CSS + Dash Bootstrap components
 external_stylesheets=[dbc.themes.BOOTSTRAP, "assets/main.css"]
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-server = app.server
+# brotli / gzip compression of every response and ETags on the layout, dependencies and callbacks
+server = create_server(__name__)
+app = dash.Dash(__name__, server=server, compress=True, external_stylesheets=external_stylesheets)
+enable_etags(server)
 
 ## USE THE FRENCH DATE - not working with heroku
 import locale
@@ -46,19 +137,13 @@ grey = '#6c757d'
 target_opacity = 0.7
 
 ## USEFUL FUNCTION
-def millify(n):
-    if n > 999:
-        if n > 1e6-1:
-            return f'{round(n/1e6,1)}M'
-        return f'{round(n/1e3,1)}K'
-    return n
-
 def format_date(str_date, date_format):
+    from dateutil.parser import parse
     date = parse(str_date)
     return date.strftime(date_format) 
 
-def red_or_green(df):
-    return df.apply(lambda x: green if x >=1 else red)
+def red_or_green(values):
+    return threshold_colors(values, 1, green, red)
 
 
 
@@ -68,9 +153,92 @@ def red_or_green(df):
    ------------------------------------------------------------------------------------------- 
 
 '''
-sales = pd.read_csv('sales_summary.csv', parse_dates=[0])
+# the csv is read on the first callback, not at import time
+sales = None
+aggregates = None
+row_index = None
+scenarios = None
+result_cache = None
+# incremented at each (re)load, results computed on older data are dropped
+data_version = 0
 dashboard_date = datetime.date(2019, 5, 23)
 
+def get_dataset():
+    """ the partitioned dataset of sales_path, None for a csv file """
+    return PartitionedDataset(sales_path) if PartitionedDataset.is_dataset(sales_path) else None
+
+def read_sales():
+    """ sums of every column per (Date, City, Cat), the file is streamed in chunks (or partitions) """
+    keys = ['Date', 'City', 'Cat']
+    dataset = get_dataset()
+    if dataset is not None:
+        sums = PartialAggregate(keys, [column for column in dataset.columns if column not in keys])
+        return aggregate_chunks(dataset.iter_partitions(), [sums])[0].result()
+    sums = PartialAggregate(keys, pd.read_csv(sales_path, nrows=0).columns.drop(keys))
+    aggregate_chunks(read_chunks(sales_path, chunk_size, parse_dates=['Date']), [sums])
+    return sums.result()
+
+def code_files():
+    """ sources of the modules computing the results: the dashboard and the shared modules """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return sorted(glob.glob(os.path.join(root, 'dashboard', '*.py')) + glob.glob(os.path.join(root, 'shared', '*.py')))
+
+def get_result_cache():
+    """ the cache shared by the workers, on the version of the data and of the code """
+    global result_cache, result_cache_dir
+    if result_cache is None and result_cache_dir:
+        data_file = os.path.join(sales_path, METADATA) if get_dataset() is not None else sales_path
+        version = content_version(data_file, *code_files())
+        try:
+            result_cache = SharedCache(result_cache_dir, version, result_cache_ttl, result_cache_bytes, classes=(Cube,))
+        except PermissionError as error:
+            print(f'shared cache disabled: {error}', file=sys.stderr, flush=True)
+            result_cache_dir = ''
+    return result_cache
+
+def shared_result(key, function, *args):
+    """ function(*args), computed once for all the workers when the shared cache is enabled """
+    cache = get_result_cache()
+    return function(*args) if cache is None else cache.get_or_compute(key, function, *args)
+
+def get_sales():
+    global sales
+    if sales is None:
+        sales = read_sales()
+    return sales
+
+def get_aggregates():
+    global aggregates
+    if aggregates is None:
+        aggregates = shared_result(('aggregates', str(dashboard_date)), lambda: aggregate(get_sales(), dashboard_date))
+    return aggregates
+
+def get_row_index():
+    global row_index
+    if row_index is None:
+        row_index = RowIndex(get_sales())
+    return row_index
+
+def get_scenarios():
+    global scenarios
+    if scenarios is None:
+        scenarios = shared_result(('scenarios', str(dashboard_date), scenario_count), lambda: simulate(get_sales(), dashboard_date, scenario_count))
+    return scenarios
+
+def reload_data():
+    global sales, aggregates, row_index, scenarios, data_version, result_cache
+    sales = read_sales()
+    aggregates = None
+    row_index = None
+    scenarios = None
+    data_version += 1
+    # a new version of the data starts a new folder of shared results
+    result_cache = None
+    outputs_cache.clear()
+    # the views being computed finish for their browsers, the next ones are computed on the new data
+    jobs.invalidate()
+    return warm_up()
+
 
 '''------------------------------------------------------------------------------------------- 
                                         DASH COMPONENTS
@@ -178,18 +346,14 @@ dashboard_date = datetime.date(2019, 5, 23)
 
 metric_dropdown = dcc.Dropdown(
     id='metric_dropwdown',
-    options=[
-        {'label': "Chiffre d'affaire", 'value': 'sales_2020'},
-        {'label': "Bénéfices", 'value': 'profit_2020'},
-    ],
-    value='sales_2020',
+    options=[{'label': metric.label, 'value': metric.key} for metric in registry],
+    value=registry[0].key,
     searchable=False,
     clearable=False,
     style={"border": "none"},
     className="metric_dropdown"
 )
 
-months = sales['Date'].dt.month.unique()
 month_option = [{'label':calendar.month_abbr[m], 'value':m}for m in range(1,dashboard_date.month+1)]
 # month_option.append({'label':None, 'value':"Année"}) # TODO: ajouter une option "Année"
 date_dropdown = dcc.Dropdown(
@@ -202,17 +366,34 @@ date_dropdown = dcc.Dropdown(
     className="months_dropdown"
 )
 
+# rows of the current view, the links follow the dropdowns and the filters
+export_links = html.Div(
+    [
+        html.A("CSV", id='export_csv', className="mr-2"),
+        html.A("Parquet", id='export_parquet')
+    ],
+    className="mt-2"
+)
+
+# progress of the view being computed in background, empty once it is shown
+view_progress = dbc.Progress(id='view_progress', value=0, style={'height': '3px'}, className="mt-1")
+# error of a view that could not be computed
+view_error = html.Div(id='view_error', className="text-danger ml-2")
+
 header = dbc.Card([
     dbc.Row(html.H1("Centre de Commande"), className='ml-2 mt-1'),
     html.Hr(className="mt-1 mb-0"),
     dbc.Row(
         [
             dbc.Col(metric_dropdown, className="ml-2", lg=2, xs=4),
-            dbc.Col(date_dropdown, lg=2, xs=4)
+            dbc.Col(date_dropdown, lg=2, xs=4),
+            dbc.Col(export_links, lg=2, xs=3)
         ],
         justify="start",
         className="mt-2 mb-2"
-    )
+    ),
+    view_progress,
+    view_error
 ])
 
 # 2. Colonne de Gauche
@@ -251,6 +432,40 @@ right_block = dbc.Col(
     style={"background-color": "white"}, 
     className=" mt-3 mb-3 border",
 )
+
+#  4. Catégories
+# --------------------------------------------------------
+cat_sales = dcc.Graph(id='cat_sales', config=config_dash, style={'height':'40vh', 'width':'100%'})
+city_cat_heatmap = dcc.Graph(id='city_cat_heatmap', config=config_dash, style={'height':'40vh', 'width':'100%'})
+
+#  5. Série journalière
+# --------------------------------------------------------
+granularity = dbc.RadioItems(
+    id='granularity',
+    options=[
+        {'label': 'Jour', 'value': 'D'},
+        {'label': 'Semaine', 'value': 'W'},
+        {'label': 'Mois', 'value': 'MS'},
+    ],
+    value='D',
+    inline=True,
+    className="ml-2 mt-2"
+)
+# zoomable: the visible range is sent back to the server through relayoutData
+daily_sales = dcc.Graph(id='daily_sales', config={'displayModeBar': False}, style={'height':'40vh', 'width':'100%'})
+
+daily_block = dbc.Row(
+    dbc.Col([granularity, daily_sales], style={"background-color": "white"}, className="border mb-3"),
+    className="mr-3 ml-3 p-0"
+)
+
+bottom_block = dbc.Row(
+    [
+        dbc.Col(cat_sales, style={"background-color": "white"}, className="border mr-3 mb-3", lg=4, xs=12),
+        dbc.Col(city_cat_heatmap, style={"background-color": "white"}, className="border mb-3")
+    ],
+    className="mr-3 ml-3 p-0"
+)
     
                 
 
@@ -262,6 +477,10 @@ right_block = dbc.Col(
 app.layout = html.Div(
     [
     header,
+    # cross-filters set by clicking the charts, {column: value}
+    dcc.Store(id='filters', data={}),
+    # job of the view computed in background and its polling
+    *job_components('view', job_poll_ms),
     dbc.Container(
         [
         dbc.Row(
@@ -270,50 +489,28 @@ app.layout = html.Div(
                     right_block
                 ],
                 className="mr-3 ml-3 p-0"
-            )
+            ),
+        bottom_block,
+        daily_block
         ],fluid=True, className="p-0 mb-3"),
     ],
     style={"height": "100%"}   
 )
 '''------------------------------------------------------------------------------------------- 
-                                            INTERACT
+                                        FIGURE TEMPLATES
    ------------------------------------------------------------------------------------------- 
 '''
+# static part of the figures, validated once by plotly, the callback only fills the data
+templates = None
 
-@app.callback(
-    [
-        Output('progress_pie', 'figure'),
-        Output('card_sum', 'figure'),
-        Output('city_sales', 'figure'),
-        Output('monthly_sales', 'figure')
-    ],
-    [
-        Input('metric_dropwdown', 'value'),
-        Input('date_dropwdown', 'value')
-    ]
-)
-
-def global_update(metric, month):
-    filtred_sales = sales.loc[sales['Date'].dt.month.isin([month])]
-    target = 'sales_target' if metric == 'sales_2020' else 'profit_target'
-
-    #  CREATION DES KPI
-    # --------------------------------------------------------
+def create_templates():
+    global templates
+    if templates is not None:
+        return templates
+    go = init_plotly()
 
     # Pie Progress
-    amount = filtred_sales[metric].sum()
-    progress = amount /  filtred_sales[target].sum()
-    rest = 1 - progress if 1 - progress > 0 else 0
-    progress_color = green if progress > 1 else red 
-    values = [progress, rest]
-    colors = [progress_color, 'white']
-    progress_pie = go.Figure(
-        go.Pie(
-            values = values, 
-            hole = .95, 
-            marker_colors = colors
-        )
-    )
+    progress_pie = go.Figure(go.Pie(hole = .95))
     progress_pie.update_layout(showlegend = False, hovermode = False )
     progress_pie.update_traces(textinfo='none')
     progress_pie.update_layout(
@@ -322,7 +519,6 @@ def global_update(metric, month):
             dict(
                 x=0.5,
                 y=0.40,
-                text=f'Objectif pour {calendar.month_name[month]}',
                 showarrow=False,
                 font=dict(
                     size=25,
@@ -332,26 +528,24 @@ def global_update(metric, month):
             dict(
                 x=0.5,
                 y=0.60,
-                text='{}%'.format(int(progress*100)),
                 showarrow=False,
                 font=dict(
-                    size=70,
-                    color=progress_color
+                    size=70
+                )
+            ),
+            dict(
+                x=0.5,
+                y=0.28,
+                showarrow=False,
+                font=dict(
+                    size=16,
+                    color=grey
                 )
             )
         ]
     )
 
     # Summary card 
-    target_goal = filtred_sales.loc[filtred_sales['Date'].dt.date <= dashboard_date, target].sum()
-    score = amount / target_goal -1
-
-    if score > 0:
-        color = green
-        text_score = '+ {}% ⬆︎'.format(int(score*100))
-    else:
-        color = red
-        text_score = '{}% ⬇︎'.format(int(score*100))
     # create a white pie
     card_sum = go.Figure(go.Pie(values = [0,0]))
     # add annotation
@@ -361,7 +555,6 @@ def global_update(metric, month):
             dict(
                 x = 0.5,
                 y = 0.40,
-                text = "Chiffre d'Affaires ($)" if metric=="sales_2020" else "Bénéfices",
                 showarrow = False,
                 font = dict(
                     size = 25,
@@ -371,7 +564,6 @@ def global_update(metric, month):
             dict(
                 x = 0.5,
                 y = 0.60,
-                text = '{}'.format(millify(amount)),
                 showarrow = False,
                 font = dict(
                     size = 70,
@@ -381,45 +573,31 @@ def global_update(metric, month):
             dict(
                 x = 0.5,
                 y = 0.20,
-                text = text_score,
                 showarrow = False,
                 # bgcolor=green,
                 font = dict(
-                    size = 23,
-                    color = color
+                    size = 23
                 )
             )
         ]
     )
 
     #  CITY SALES
-    # --------------------------------------------------------
-    city_sales = filtred_sales.groupby('City').sum()
-    percents = city_sales[metric] / city_sales[target]
-    # plot
     city_plot = go.Figure([
         go.Bar(
             name = 'Objectif', 
-            y = city_sales.index, 
-            x = city_sales[target], 
             marker_color=grey,
             marker_line_width=0.5,
             marker_line_color='black',
             opacity=target_opacity
         ),
         go.Bar(
-            name = "Chiffre d'affaires" if metric=="sales_2020" else "Bénéfices", 
-            y = city_sales.index, 
-            x = city_sales[metric],
-            text = percents,
-            marker_color = red_or_green(percents),
             marker_line_width=0,
             width = 0.5,
         )
     ])
-    # update
     city_plot.update_traces(texttemplate='%{text:.0%}', textposition='inside', selector=dict(marker_line_width=0))
-    city_plot.update_traces(orientation='h', hovertemplate="%{x:.2s} $",)
+    city_plot.update_traces(orientation='h')
     city_plot.update_layout(
         hovermode="y unified",
         uniformtext_minsize=8, 
@@ -430,34 +608,69 @@ def global_update(metric, month):
     city_plot.update_xaxes(nticks=5)
     city_plot.update_yaxes(linewidth=0.5, linecolor='black', zeroline=True)
 
+    #  CATEGORY SALES, same bars as the cities
+    cat_plot = go.Figure(city_plot)
+
+    #  CITY x CATEGORY: progress of each cell, red under the target and green over it
+    city_cat_plot = go.Figure(go.Heatmap(
+        colorscale = [[0, red], [0.5, red], [0.5, green], [1, green]],
+        zmin = 0,
+        zmax = 2,
+        xgap = 2,
+        ygap = 2,
+        showscale = False,
+        hovertemplate = "%{y} - %{x}: %{z:.0%}<extra></extra>"
+    ))
+    city_cat_plot.update_layout(margin = margin)
+
+    #  DAILY SALES, webgl lines
+    daily_plot = go.Figure([
+        go.Scattergl(
+            name = 'Objectif',
+            mode = 'lines',
+            line = dict(color = grey, dash = 'dash')
+        ),
+        go.Scattergl(
+            mode = 'lines',
+            line = dict(color = blue)
+        )
+    ])
+    daily_plot.update_layout(
+        hovermode="x unified",
+        showlegend=False,
+        margin = margin,
+        # keep the zoom of the user when the downsampled data is sent back
+        uirevision = 'daily')
+    daily_plot.update_yaxes(nticks=6)
+
     #  MONTH SALES
-    # --------------------------------------------------------
-    daily_sales = sales.groupby('Date').sum()
-    monthly_sales = daily_sales.resample('MS').sum()
-    percents = monthly_sales[metric] / monthly_sales[target]
-    # plot
     monthly_plot = go.Figure([
         go.Bar(
             name = 'Objectif', 
-            x = monthly_sales.index, 
-            y = monthly_sales[target], 
             marker_color=grey,
             marker_line_width=0.5,
             marker_line_color='black',
             opacity=target_opacity
         ),
         go.Bar(
-            name = "Chiffre d'affaires" if metric=="sales_2020" else "Bénéfices", 
-            x = monthly_sales.index, 
-            y = monthly_sales[metric],
-            text = percents,
             width = 0.6 *(1000*3600*24*22),
-            marker_color = red_or_green(percents),
             marker_line_width=0,
+        ),
+        # band of the scenario targets
+        go.Scatter(
+            mode = 'lines',
+            line_width = 0,
+            hoverinfo = 'skip'
+        ),
+        go.Scatter(
+            mode = 'lines',
+            line_width = 0,
+            fill = 'tonexty',
+            fillcolor = 'rgba(108, 117, 125, 0.25)',
+            hoverinfo = 'skip'
         )
     ])
     monthly_plot.update_traces(texttemplate='%{text:.0%}', textposition='auto', selector=dict(marker_line_width=0))
-    monthly_plot.update_traces(hovertemplate="%{y:.2s} $")
     monthly_plot.update_layout(
         hovermode="x unified",
         uniformtext_minsize=8, 
@@ -468,28 +681,474 @@ def global_update(metric, month):
     monthly_plot.update_xaxes(
         nticks=12, 
         linecolor='black', 
-        zeroline=True,
-        ticktext=[datetime.datetime.strftime(date, "%b") for date in monthly_sales.index],
-        tickvals=monthly_sales.index)
+        zeroline=True)
     monthly_plot.update_yaxes(nticks=6)    
 
+    templates = dict(
+        progress_pie=FigureTemplate(progress_pie, typed_arrays),
+        card_sum=FigureTemplate(card_sum, typed_arrays),
+        city_plot=FigureTemplate(city_plot, typed_arrays),
+        cat_plot=FigureTemplate(cat_plot, typed_arrays),
+        city_cat_plot=FigureTemplate(city_cat_plot, typed_arrays),
+        daily_plot=FigureTemplate(daily_plot, typed_arrays),
+        monthly_plot=FigureTemplate(monthly_plot, typed_arrays)
+    )
+    return templates
+
+
+'''------------------------------------------------------------------------------------------- 
+                                            INTERACT
+   ------------------------------------------------------------------------------------------- 
+'''
+
+# the jobs of the callbacks run in background (see shared.jobs)
+jobs = JobQueue(max_workers=job_workers)
+if jobs_endpoint:
+    enable_jobs_endpoint(server, jobs)
+
+@background_callback(
+    app, jobs, 'view',
+    [
+        Output('progress_pie', 'figure'),
+        Output('card_sum', 'figure'),
+        Output('city_sales', 'figure'),
+        Output('monthly_sales', 'figure'),
+        Output('cat_sales', 'figure'),
+        Output('city_cat_heatmap', 'figure')
+    ],
+    [
+        Input('metric_dropwdown', 'value'),
+        Input('date_dropwdown', 'value'),
+        Input('filters', 'data')
+    ],
+    progress=Output('view_progress', 'value'),
+    error=Output('view_error', 'children')
+)
+
+def global_update(job, metric, month, filters):
+    """ the figures of a view, computed as a job: the data is loaded step by step, a change of the view cancels it in between """
+    job.progress(0, 4, 'sales')
+    get_aggregates()
+    job.progress(1, message='scenarios')
+    get_scenarios()
+    if filters and get_dataset() is None:
+        job.progress(2, message='row index')
+        get_row_index()
+    job.progress(3, message='figures')
+    return view_outputs(metric, month, filters)
+
+
+def view_outputs(metric, month, filters):
+    key = (metric, month, tuple(sorted((filters or {}).items())))
+    outputs = outputs_cache.get(key)
+    if outputs is None:
+        version = data_version
+        outputs = shared_result(('view',) + key, compute_outputs, *key)
+        if version == data_version:
+            outputs_cache[key] = outputs
+    return outputs
+
+
+@app.callback(
+    Output('filters', 'data'),
+    [
+        Input('city_sales', 'clickData'),
+        Input('cat_sales', 'clickData'),
+        Input('city_cat_heatmap', 'clickData')
+    ],
+    [State('filters', 'data')]
+)
+
+def select_filter(city_click, cat_click, cell_click, filters):
+    """ a click on a city, a category or a cell filters the other charts on it, a second click removes the filter """
+    clicks = {'city_sales': city_click, 'cat_sales': cat_click, 'city_cat_heatmap': cell_click}
+    trigger = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+    if clicks.get(trigger) is None:
+        raise PreventUpdate
+    point = clicks[trigger]['points'][0]
+    if trigger == 'city_sales':
+        selection = {'City': point['y']}
+    elif trigger == 'cat_sales':
+        selection = {'Cat': point['y']}
+    else:
+        selection = {'City': point['y'], 'Cat': point['x']}
+    filters = dict(filters or {})
+    if all(filters.get(column) == value for column, value in selection.items()):
+        for column in selection:
+            del filters[column]
+    else:
+        filters.update(selection)
+    return filters
+
+
+@app.callback(
+    Output('date_dropwdown', 'value'),
+    [Input('monthly_sales', 'clickData')]
+)
+
+def select_month(click):
+    """ a click on a month of monthly_sales selects it in the dropdown """
+    if click is None:
+        raise PreventUpdate
+    month = pd.Timestamp(click['points'][0]['x']).month
+    if month not in [option['value'] for option in month_option]:
+        raise PreventUpdate
+    return month
+
+
+def visible_range(relayout):
+    """ x range zoomed by the user in relayoutData, (None, None) for the whole history """
+    relayout = relayout or {}
+    if 'xaxis.range[0]' in relayout:
+        return relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'])
+    return None, None
+
+
+def downsample(series):
+    """ positions of the points of a series (index: dates) sent to the browser """
+    if daily_downsampling == 'min_max':
+        return min_max(series.to_numpy(), daily_max_points)
+    return lttb(series.index.to_numpy(), series.to_numpy(), daily_max_points)
+
+
+@app.callback(
+    Output('daily_sales', 'figure'),
+    [
+        Input('metric_dropwdown', 'value'),
+        Input('filters', 'data'),
+        Input('granularity', 'value'),
+        Input('daily_sales', 'relayoutData')
+    ]
+)
+
+def daily_update(metric, filters, granularity, relayout):
+    """ actual and target series of the visible range, at most daily_max_points points per trace """
+    metric = metrics[metric]
+    series = get_aggregates()['cube'].series(filters)[[metric.target, metric.key]]
+    if granularity != 'D':
+        series = series.resample(granularity).sum()
+    start, end = visible_range(relayout)
+    if start is not None:
+        series = series.loc[start:end]
+    traces = []
+    for column in series.columns:
+        kept = downsample(series[column])
+        traces.append(dict(
+            x = series.index[kept].strftime('%Y-%m-%d').tolist(),
+            y = series[column].to_numpy()[kept],
+            hovertemplate = metric.hovertemplate('y')))
+    traces[1]['name'] = metric.name
+    return create_templates()['daily_plot'].fill(traces = traces, layout = dict(yaxis = metric.axis()))
+
+
+def month_ranges(month):
+    """ [(first day, first day of the next month)] of every month of the data with this number """
+    months = get_aggregates()['monthly'].index
+    return [(start, start + pd.offsets.MonthBegin()) for start in months[months.month == month]]
+
+
+def view_aggregates(month, filters):
+    """
+        sums of every metric for the month (month), up to the dashboard date (to_date) and
+        per month (monthly); the filtered rows are read through the row index, or from the
+        partitions of the month only for a partitioned dataset
+    """
+    aggregates = get_aggregates()
+    if not filters:
+        return dict(
+            month=aggregates['by_month'].loc[month],
+            to_date=aggregates['to_date_by_month'].loc[month],
+            monthly=aggregates['monthly'])
+    values = columns()
+    dataset = get_dataset()
+    if dataset is not None:
+        # the filtered months are sums of the cube, no partition is read for them
+        month_rows = dataset.read(['Date'] + values, month_ranges(month), filters)
+        monthly = aggregates['cube'].series(filters)[values].resample('MS').sum()
+    else:
+        sales = get_sales()
+        month_rows = sales.iloc[get_row_index().rows(filters, month_ranges(month))]
+        monthly = sales.iloc[get_row_index().rows(filters)].groupby('Date')[values].sum().resample('MS').sum()
+    return dict(
+        month=month_rows[values].sum(),
+        to_date=month_rows.loc[month_rows['Date'].dt.date <= dashboard_date, values].sum(),
+        monthly=monthly)
+
+
+def highlight(index, filters, column):
+    """ bar opacities putting forward the filtered value of column """
+    return np.where(index == filters[column], 1, 0.4)
+
+
+@app.callback(
+    [
+        Output('export_csv', 'href'),
+        Output('export_parquet', 'href')
+    ],
+    [
+        Input('metric_dropwdown', 'value'),
+        Input('date_dropwdown', 'value'),
+        Input('filters', 'data')
+    ]
+)
+
+def export_links_update(metric, month, filters):
+    query = dict(filters or {}, metric=metric, month=month)
+    return [app.get_relative_path('/_export?' + urlencode(dict(query, format=format))) for format in ('csv', 'parquet')]
+
+
+@server.route('/_export')
+def export_view():
+    """
+        rows of a view streamed chunk by chunk, query string:
+        metric, month (all the months if missing), City and Cat (repeatable), format (csv or parquet)
+        an unknown metric, month, city, category or format is answered with a 400
+    """
+    args = flask.request.args
+    metric = metrics.get(args.get('metric', registry[0].key))
+    format = args.get('format', 'csv')
+    if metric is None or format not in export_formats:
+        flask.abort(400)
+    month = args.get('month')
+    if month is not None:
+        month = int(month) if month.isdigit() else 0
+        if not 1 <= month <= 12:
+            flask.abort(400)
+    filters = {column: args.getlist(column) for column in ('City', 'Cat') if column in args}
+    labels = get_aggregates()['cube'].labels
+    if any(not pd.Index(values).isin(labels[column]).all() for column, values in filters.items()):
+        flask.abort(400)
+    ranges = None if month is None else month_ranges(month)
+    mimetype, chunks = export_formats[format]
+    columns = ['Date', 'City', 'Cat', metric.key, metric.target]
+    dataset = get_dataset()
+    if dataset is not None:
+        # only the partitions of the month (and of the filtered cities) are read
+        frames, sample = rechunk(dataset.iter_partitions(columns, ranges, filters)), dataset.sample(columns)
+    else:
+        sales = get_sales()
+        frames, sample = iter_chunks(sales, get_row_index().rows(filters, ranges), columns), sales.iloc[:1][columns]
+    response = flask.Response(chunks(frames, columns, sample), mimetype=mimetype)
+    name = '_'.join([metric.key] + ([calendar.month_abbr[month]] if month else []) + [v for values in filters.values() for v in values])
+    response.headers['Content-Disposition'] = content_disposition(f'{name}.{format}')
+    return response
+
+
+def compute_outputs(metric, month, filters=()):
+    templates = create_templates()
+    aggregates = get_aggregates()
+    metric = metrics[metric]
+    filters = dict(filters)
+    view = view_aggregates(month, filters)
+    month_totals = view['month']
+
+    #  CREATION DES KPI
+    # --------------------------------------------------------
+
+    # Pie Progress
+    amount = month_totals[metric.key]
+    progress = amount / month_totals[metric.target]
+    rest = 1 - progress if 1 - progress > 0 else 0
+    progress_color = green if progress > 1 else red 
+    # month-end progress over the target scenarios, simulated for the whole company only
+    scenarios = get_scenarios()
+    month_index = np.flatnonzero(scenarios['months'].month == month)[-1]
+    low, high = percentiles(scenarios[metric.key]['progress'][:, month_index], scenario_band)
+    band_text = '' if filters else 'fin du mois: {}% - {}% (P{}-P{})'.format(int(low*100), int(high*100), *scenario_band)
+    progress_pie = templates['progress_pie'].fill(
+        traces = [dict(values = [progress, rest], marker = dict(colors = [progress_color, 'white']))],
+        layout = dict(annotations = [
+            dict(text = ' - '.join([f'Objectif pour {calendar.month_name[month]}', *filters.values()])),
+            dict(text = '{}%'.format(int(progress*100)), font = dict(color = progress_color)),
+            dict(text = band_text)
+        ])
+    )
+
+    # Summary card 
+    target_goal = view['to_date'][metric.target]
+    score = amount / target_goal -1
+
+    if score > 0:
+        color = green
+        text_score = '+ {}% ⬆︎'.format(int(score*100))
+    else:
+        color = red
+        text_score = '{}% ⬇︎'.format(int(score*100))
+    card_sum = templates['card_sum'].fill(
+        layout = dict(annotations = [
+            dict(text = metric.title),
+            dict(text = '{}'.format(millify(amount))),
+            dict(text = text_score, font = dict(color = color))
+        ])
+    )
+
+    #  CITY SALES
+    # --------------------------------------------------------
+    # breakdowns of the month, a chart is filtered on the other dimensions only
+    cube = aggregates['cube']
+    city_sales = cube.by(cube.month(month, {k: v for k, v in filters.items() if k != 'City'}), 'City')
+    percents = city_sales[metric.key] / city_sales[metric.target]
+    city_marker = dict(color = red_or_green(percents).tolist())
+    if 'City' in filters:
+        # the filtered city stands out
+        city_marker['opacity'] = highlight(city_sales.index, filters, 'City')
+    city_plot = templates['city_plot'].fill(
+        traces = [
+            dict(
+                y = city_sales.index.tolist(),
+                x = city_sales[metric.target].to_numpy(),
+                hovertemplate = metric.hovertemplate('x')),
+            dict(
+                name = metric.name,
+                y = city_sales.index.tolist(),
+                x = city_sales[metric.key].to_numpy(),
+                text = percents.to_numpy(),
+                marker = city_marker,
+                hovertemplate = metric.hovertemplate('x'))
+        ],
+        layout = dict(xaxis = metric.axis())
+    )
+
+    #  MONTH SALES
+    # --------------------------------------------------------
+    monthly_sales = view['monthly']
+    percents = monthly_sales[metric.key] / monthly_sales[metric.target]
+    dates = monthly_sales.index.strftime('%Y-%m-%d').tolist()
+    if filters:
+        band_low = band_high = np.empty(0)
+        band_dates = []
+    else:
+        band_low, band_high = percentiles(scenarios[metric.key]['target'], scenario_band)
+        band_dates = scenarios['months'].strftime('%Y-%m-%d').tolist()
+    monthly_plot = templates['monthly_plot'].fill(
+        traces = [
+            dict(x = dates, y = monthly_sales[metric.target].to_numpy(), hovertemplate = metric.hovertemplate('y')),
+            dict(
+                name = metric.name,
+                x = dates,
+                y = monthly_sales[metric.key].to_numpy(),
+                text = percents.to_numpy(),
+                marker = dict(color = red_or_green(percents).tolist()),
+                hovertemplate = metric.hovertemplate('y')),
+            dict(x = band_dates, y = band_low),
+            dict(x = band_dates, y = band_high)
+        ],
+        layout = dict(
+            xaxis = dict(
+                ticktext = [datetime.datetime.strftime(date, "%b") for date in monthly_sales.index],
+                tickvals = dates),
+            yaxis = metric.axis())
+    )
+
+    #  CATEGORY SALES
+    # --------------------------------------------------------
+    cat_sales = cube.by(cube.month(month, {k: v for k, v in filters.items() if k != 'Cat'}), 'Cat')
+    percents = cat_sales[metric.key] / cat_sales[metric.target]
+    cat_marker = dict(color = red_or_green(percents).tolist())
+    if 'Cat' in filters:
+        cat_marker['opacity'] = highlight(cat_sales.index, filters, 'Cat')
+    cat_plot = templates['cat_plot'].fill(
+        traces = [
+            dict(
+                y = cat_sales.index.tolist(),
+                x = cat_sales[metric.target].to_numpy(),
+                hovertemplate = metric.hovertemplate('x')),
+            dict(
+                name = metric.name,
+                y = cat_sales.index.tolist(),
+                x = cat_sales[metric.key].to_numpy(),
+                text = percents.to_numpy(),
+                marker = cat_marker,
+                hovertemplate = metric.hovertemplate('x'))
+        ],
+        layout = dict(xaxis = metric.axis())
+    )
+
+    #  CITY x CATEGORY
+    # --------------------------------------------------------
+    cells = cube.ratio(cube.month(month), metric)
+    city_cat_plot = templates['city_cat_plot'].fill(
+        traces = [dict(
+            z = cells,
+            x = cube.labels['Cat'].tolist(),
+            y = cube.labels['City'].tolist())]
+    )
+
     # OUTPUT
     # --------------------------------------------------------
     output_tuple = (
         progress_pie,
         card_sum,
         city_plot,
-        monthly_plot
+        monthly_plot,
+        cat_plot,
+        city_cat_plot
     )
     return output_tuple
 
 
-if __name__ == '__main__':
-    app.run_server(debug=True)
+'''------------------------------------------------------------------------------------------- 
+                                            WARM-UP
+   ------------------------------------------------------------------------------------------- 
+'''
+# outputs of view_outputs per (metric, month, filters), filled by the warm-up and the callback
+outputs_cache = BudgetCache(max_bytes=outputs_cache_bytes)
+warm_up_status = {'state': 'idle', 'done': 0, 'total': 0, 'duration': None}
 
+def view_keys():
+    return [(metric['value'], month['value'], ()) for metric in metric_dropdown.options for month in month_option]
 
+def warm_up(max_workers=warm_up_workers):
+    """ compute (or read from the shared cache) all the views on a thread pool, in background: the server keeps answering meanwhile """
+    keys = view_keys()
+    warm_up_status.update(state='running', done=0, total=len(keys), duration=None)
 
+    def run():
+        start = time.perf_counter()
+        version = data_version
+        # load once before the pool, not in every thread
+        get_aggregates()
+        if get_dataset() is None:
+            get_row_index()
+        get_scenarios()
+        create_templates()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for key, outputs in zip(keys, pool.map(lambda key: shared_result(('view',) + key, compute_outputs, *key), keys)):
+                if version != data_version:
+                    # the data was reloaded meanwhile, a new warm-up is running
+                    return
+                outputs_cache[key] = outputs
+                warm_up_status['done'] += 1
+                print(f"warm-up {warm_up_status['done']}/{len(keys)}: {key}", flush=True)
+        warm_up_status.update(state='done', duration=time.perf_counter() - start)
+        print(f"warm-up done in {warm_up_status['duration']:.2f}s", flush=True)
 
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
 
+@server.route('/_warm-up')
+def warm_up_progress():
+    return warm_up_status
 
+if warm_up_on_start:
+    warm_up()
 
+
+'''------------------------------------------------------------------------------------------- 
+                                            MEMORY
+   ------------------------------------------------------------------------------------------- 
+'''
+def memory_objects():
+    """ what the worker keeps in memory, see shared.memory """
+    return dict(sales=sales, aggregates=aggregates, row_index=row_index, scenarios=scenarios,
+                templates=templates, outputs_cache=outputs_cache)
+
+if memory_endpoint:
+    enable_memory_endpoint(server, memory_objects, budgets=[outputs_cache], trace=memory_trace)
+
+
+if __name__ == '__main__':
+    app.run_server(debug=True)
@@ -1,7 +1,6 @@
 import numpy as np 
 
 # PLOTLY
-import plotly.express as px
 import plotly.io as pio
 pio.templates.default = "plotly_white"
 
@@ -236,6 +235,7 @@ class Container:
    ------------------------------------------------------------------------------------------- 
 '''
 if __name__ == '__main__':
+    import plotly.express as px
 
     # create a simple graph
     df = px.data.iris() # iris is a pandas DataFrame
@@ -0,0 +1,63 @@
+'''-------------------------------------------------------------------------------------------
+                                      >> DOWNSAMPLING <<
+   -------------------------------------------------------------------------------------------
+   Reduce a series to a bounded number of points before sending it to the browser. Both
+   functions return the positions of the points to keep, sorted, first and last included.
+
+        * lttb: Largest-Triangle-Three-Buckets, keeps the visual shape of a line
+        * min_max: the lowest and highest point of each bucket, keeps every peak
+'''
+import numpy as np
+
+
+def bucket_edges(n, n_buckets):
+    """ edges of n_buckets buckets over the points 1 .. n-2 (the first and last points are kept) """
+    return np.linspace(1, n - 1, n_buckets + 1).astype(int)
+
+
+def lttb(x, y, n_out):
+    """
+        * x: increasing positions, dates are converted to int64 (array)
+        * y: values (array)
+        * n_out: number of points to keep (int)
+    """
+    x = np.asarray(x).astype('int64' if np.asarray(x).dtype.kind == 'M' else float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = bucket_edges(n, n_out - 2)
+    counts = np.diff(edges)
+    # average point of every bucket, the one after the last bucket is the last point
+    mean_x = np.append(np.add.reduceat(x[1:n - 1].astype(float), edges[:-1] - 1) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])
+
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        a = kept[bucket]
+        # area of the triangle (previous kept point, candidate, average of the next bucket)
+        area = np.abs((x[a] - mean_x[bucket + 1]) * (y[start:stop] - y[a])
+                      - (x[a] - x[start:stop]) * (mean_y[bucket + 1] - y[a]))
+        kept[bucket + 1] = start + np.argmax(area)
+    return kept
+
+
+def min_max(y, n_out):
+    """
+        * y: values (array)
+        * n_out: maximum number of points to keep (int)
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    edges = bucket_edges(n, (n_out - 2) // 2)
+    positions = np.arange(1, n - 1)
+    buckets = np.searchsorted(edges, positions, side='right') - 1
+    # sorted by bucket then value: the first of a bucket is its min, the last its max
+    order = positions[np.lexsort((y[positions], buckets))]
+    first = edges[:-1] - 1
+    last = edges[1:] - 2
+    return np.unique(np.concatenate([[0], order[first], order[last], [n - 1]]))
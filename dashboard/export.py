@@ -0,0 +1,89 @@
+'''-------------------------------------------------------------------------------------------
+                                          >> EXPORT <<
+   -------------------------------------------------------------------------------------------
+   The rows behind a view of the dashboard as csv or parquet, generated chunk by chunk: the
+   flask response sends each chunk as soon as it is encoded, only one chunk is in memory at
+   a time and the worker is not blocked by a large download. The chunks are rows of the
+   loaded sales (iter_chunks) or the partitions of a month partitioned dataset (rechunk).
+'''
+import re
+from urllib.parse import quote
+
+import numpy as np
+
+
+class ChunkSink:
+    """ write-only file object keeping what was written until it is popped """
+    closed = False
+
+    def __init__(self):
+        self.buffers = []
+        self.position = 0
+
+    def write(self, data):
+        self.buffers.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def pop(self):
+        data = b''.join(self.buffers)
+        self.buffers = []
+        return data
+
+
+def iter_chunks(sales, rows, columns, chunk_size=50_000):
+    """ dataframes of chunk_size rows of sales, rows are positions in sales """
+    rows = np.sort(rows)
+    positions = sales.columns.get_indexer(columns)
+    for start in range(0, len(rows), chunk_size):
+        yield sales.iloc[rows[start:start + chunk_size], positions]
+
+
+def rechunk(frames, chunk_size=50_000):
+    """ frames (partitions of a PartitionedDataset) cut in chunks of chunk_size rows at most """
+    for frame in frames:
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+
+def csv_chunks(frames, columns, sample=None):
+    """ frames: dataframes of the exported columns (iter_chunks, rechunk) """
+    yield (','.join(columns) + '\n').encode()
+    for chunk in frames:
+        yield chunk.to_csv(header=False, index=False).encode()
+
+
+def parquet_chunks(frames, columns, sample):
+    """ one row group per frame, sample: a row of the exported columns for their types, needs pyarrow """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = ChunkSink()
+    # from one row, the types of an empty object column are unknown
+    schema = pa.Schema.from_pandas(sample.iloc[:1][columns], preserve_index=False)
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in frames:
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.pop()
+    writer.close()
+    yield sink.pop()
+
+
+formats = {
+    'csv': ('text/csv', csv_chunks),
+    'parquet': ('application/octet-stream', parquet_chunks),
+}
+
+
+def content_disposition(filename):
+    """ attachment header of a download: an ascii fallback name and the utf-8 name (RFC 6266) """
+    fallback = re.sub(r'[^A-Za-z0-9._-]+', '_', filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
@@ -0,0 +1,52 @@
+'''-------------------------------------------------------------------------------------------
+                                    >> FIGURE TEMPLATE <<
+   -------------------------------------------------------------------------------------------
+'''
+from shared.serializer import prepare_figure
+
+
+def merge(static, update):
+    """ return static updated with update, only the dicts along the update path are copied """
+    if isinstance(static, dict) and isinstance(update, dict):
+        merged = dict(static)
+        for key, value in update.items():
+            merged[key] = merge(static[key], value) if key in static else value
+        return merged
+    if isinstance(static, list) and isinstance(update, list) and len(static) == len(update):
+        return [merge(s, u) for s, u in zip(static, update)]
+    return update
+
+
+class FigureTemplate:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * figure: plotly figure with every static property set: traces style, layout, axes,
+          annotations... (plotly.graph_objs._figure.Figure)
+        * typed: send the arrays of fill() as base64 typed arrays (bool, default=False, see shared.serializer)
+
+    >> OUTPUT <<
+    -------------------------------------------------------
+    The figure is validated by plotly once, here, and frozen as a plain json ready dict. fill()
+    only adds the data of a request (arrays, texts, colors) and returns a dict that dash can send
+    without going through plotly's property validation again.
+    The frozen dict is shared between the requests and must never be modified.
+    """
+    def __init__(self, figure, typed=False):
+        frozen = prepare_figure(figure)
+        self.typed = typed
+        self.data = frozen['data']
+        self.layout = frozen['layout']
+
+    def fill(self, traces=(), layout=None):
+        """
+            * traces: one dict per trace with its dynamic properties, in the order of the figure
+            * layout: dynamic layout properties (dict), lists like annotations are merged item by item
+        """
+        data = list(self.data)
+        for i, trace in enumerate(traces):
+            data[i] = merge(data[i], prepare_figure(trace, self.typed))
+        return {
+            'data': data,
+            'layout': merge(self.layout, prepare_figure(layout, self.typed)) if layout else self.layout
+        }
@@ -0,0 +1,68 @@
+'''-------------------------------------------------------------------------------------------
+                                    >> METRIC REGISTRY <<
+   -------------------------------------------------------------------------------------------
+   Every metric of the dashboard, declared once. The dropdown, the KPI cards, the charts, the
+   aggregation and the scenarios read this list: adding a year or a KPI means adding a line
+   here, not editing the callback.
+'''
+
+class Metric:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * key: column of the actual values, also the value of the dropdown (str)
+        * target: column of the target (str)
+        * label: label of the dropdown (str)
+        * name: name of the bars in the charts (str)
+        * title: title of the summary card (str)
+        * base: column of the reference year the target is computed from (str)
+        * margin: the target is a margin on the sales target, used by the scenarios (bool, default=False)
+        * unit: unit of the values, written after them in the hovers and the ticks (str, default='$')
+        * format: d3 format of the values in the hovers and the ticks (str, default='.2s')
+    """
+    def __init__(self, key, target, label, name, title, base, margin=False, unit='$', format='.2s'):
+        self.key = key
+        self.target = target
+        self.label = label
+        self.name = name
+        self.title = title
+        self.base = base
+        self.margin = margin
+        self.unit = unit
+        self.format = format
+
+    def hovertemplate(self, axis):
+        """ hover of a value read on axis ('x' or 'y'): '%{x:.2s} $' """
+        return f"%{{{axis}:{self.format}}} {self.unit}".rstrip()
+
+    def axis(self):
+        """ tick format of an axis of the values """
+        return dict(tickformat=self.format, ticksuffix=f" {self.unit}" if self.unit else '')
+
+    def __repr__(self):
+        return f"Metric({self.key!r}, target={self.target!r})"
+
+
+registry = [
+    Metric(
+        key='sales_2020',
+        target='sales_target',
+        label="Chiffre d'affaire",
+        name="Chiffre d'affaires",
+        title="Chiffre d'Affaires ($)",
+        base='sales_2019'),
+    Metric(
+        key='profit_2020',
+        target='profit_target',
+        label="Bénéfices",
+        name="Bénéfices",
+        title="Bénéfices",
+        base='sales_2019',
+        margin=True),
+]
+metrics = {metric.key: metric for metric in registry}
+
+
+def columns(registry=registry):
+    """ every actual and target column, once """
+    return list(dict.fromkeys(column for metric in registry for column in (metric.key, metric.target)))
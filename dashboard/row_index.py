@@ -0,0 +1,66 @@
+'''-------------------------------------------------------------------------------------------
+                                        >> ROW INDEX <<
+   -------------------------------------------------------------------------------------------
+   Row ids of the sales, sorted once by (City, Cat, Date): the rows of a city x category cell
+   are a contiguous block and, inside a block, the rows of a date range are found by binary
+   search. A filter (some cities, some categories, some date ranges) resolves to its rows
+   by slicing the blocks, without scanning the table.
+'''
+import numpy as np
+import pandas as pd
+
+
+class RowIndex:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * sales: dataframe of sales_summary.csv
+        * dimensions: columns the rows can be filtered on (list, default=['City', 'Cat'])
+    """
+    def __init__(self, sales, dimensions=('City', 'Cat')):
+        self.dimensions = list(dimensions)
+        dates = sales['Date'].to_numpy()
+        codes = {}
+        self.values = {}
+        for column in self.dimensions:
+            codes[column], self.values[column] = pd.factorize(sales[column], sort=True)
+
+        # rows sorted by the dimensions then by date, the last key of lexsort is the first sorted
+        self.order = np.lexsort([dates] + [codes[column] for column in reversed(self.dimensions)])
+        self.dates = dates[self.order]
+
+        # one block of self.order per cell
+        sorted_codes = np.column_stack([codes[column][self.order] for column in self.dimensions])
+        bounds = np.flatnonzero((sorted_codes[1:] != sorted_codes[:-1]).any(axis=1)) + 1
+        self.starts = np.concatenate([[0], bounds])
+        self.stops = np.concatenate([bounds, [len(self.order)]])
+        self.cells = sorted_codes[self.starts]
+
+    def cell_mask(self, filters):
+        """ cells matching the filters ({column: value or list of values}) """
+        mask = np.ones(len(self.cells), dtype=bool)
+        for column, values in filters.items():
+            values = [values] if np.isscalar(values) else values
+            wanted = self.values[column].get_indexer(values)
+            mask &= np.isin(self.cells[:, self.dimensions.index(column)], wanted[wanted >= 0])
+        return mask
+
+    def rows(self, filters=None, ranges=None):
+        """
+            * filters: {column: value or list of values}, no filter keeps every cell (dict)
+            * ranges: [(start, end)] date ranges, end excluded, none keeps every date (list)
+
+            return the row ids (positions in sales) matching the filters, sorted by cell then date
+        """
+        mask = self.cell_mask(filters or {})
+        starts, stops = self.starts[mask], self.stops[mask]
+        if ranges is None:
+            blocks = [self.order[start:stop] for start, stop in zip(starts, stops)]
+        else:
+            blocks = []
+            for start, stop in zip(starts, stops):
+                dates = self.dates[start:stop]
+                for first, last in ranges:
+                    lo, hi = np.searchsorted(dates, [np.datetime64(first), np.datetime64(last)])
+                    blocks.append(self.order[start + lo:start + hi])
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=self.order.dtype)
@@ -0,0 +1,79 @@
+'''-------------------------------------------------------------------------------------------
+                                    >> TARGET SCENARIOS <<
+   -------------------------------------------------------------------------------------------
+   Monte-Carlo version of the targets of generate_data.ipynb (sales_target = sales_2019 * 1.15,
+   profit_target = sales_target * 0.08). Every scenario draws its own growth per city and per
+   category and its own margin per category, then all the scenarios are evaluated at once as
+   (scenarios x cells) matrices, a cell being a city x category pair of the daily grid:
+
+        monthly target   = (growth * base) @ monthly_2019.T
+        month-end actual = known actual + (growth * rate) @ remaining_2019.T
+
+   the remaining days (after the dashboard date) are projected with the random_rate of the
+   notebook, drawn per scenario and cell. Nothing loops over the scenarios in Python.
+'''
+import numpy as np
+
+from metrics import registry
+
+
+def monthly_grid(sales, column, mask=None):
+    """ month x (City, Cat) matrix of a column, mask keeps only some rows """
+    rows = sales if mask is None else sales.loc[mask]
+    grid = rows.pivot_table(index='Date', columns=['City', 'Cat'], values=column, aggfunc='sum', fill_value=0)
+    return grid.resample('MS').sum()
+
+
+def simulate(sales, dashboard_date, n_scenarios=1000, metrics=registry, growth=0.15, city_sd=0.05, cat_sd=0.05,
+             margin=0.08, margin_sd=0.01, min_rate=0.4, max_rate=2, seed=42):
+    """
+        * sales: dataframe of sales_summary.csv
+        * dashboard_date: last day with known sales (datetime.date)
+        * metrics: metrics to simulate (list of metrics.Metric), the margin ones get the margin on top of the growth
+        * growth, city_sd, cat_sd: mean growth of the targets and its deviation per city and per category
+        * margin, margin_sd: profit target / sales target ratio and its deviation per category
+        * min_rate, max_rate: actual / target ratio of a day still to come
+
+        return, for every metric, the monthly targets and month-end progress
+        of every scenario ((n_scenarios, months) arrays) with the months (DatetimeIndex)
+    """
+    rng = np.random.default_rng(seed)
+    future = sales['Date'].dt.date > dashboard_date
+    bases = {}
+    for base_column in dict.fromkeys(metric.base for metric in metrics):
+        base = monthly_grid(sales, base_column)
+        remaining = monthly_grid(sales, base_column, future).reindex(index=base.index, columns=base.columns, fill_value=0)
+        bases[base_column] = (base, remaining)
+    base, _ = bases[metrics[0].base]
+    cities = base.columns.get_level_values('City')
+    cats = base.columns.get_level_values('Cat')
+    city_codes, city_names = cities.factorize()
+    cat_codes, cat_names = cats.factorize()
+
+    # (scenarios, cells) factors
+    factors = (1 + growth
+               + rng.normal(0, city_sd, (n_scenarios, len(city_names)))[:, city_codes]
+               + rng.normal(0, cat_sd, (n_scenarios, len(cat_names)))[:, cat_codes])
+    margins = (margin + rng.normal(0, margin_sd, (n_scenarios, len(cat_names))))[:, cat_codes]
+
+    # known actuals of every metric in one group-by
+    known_sales = sales.loc[~future]
+    known_actuals = (known_sales.groupby(known_sales['Date'].dt.to_period('M').dt.start_time)[[m.key for m in metrics]]
+                     .sum().reindex(base.index, fill_value=0))
+
+    results = {}
+    for metric in metrics:
+        base, remaining = bases[metric.base]
+        factor = factors * margins if metric.margin else factors
+        rate = rng.uniform(min_rate, max_rate, factors.shape)
+        known = known_actuals[metric.key].to_numpy()
+        target = factor @ base.to_numpy().T
+        month_end = known + (factor * rate) @ remaining.to_numpy().T
+        results[metric.key] = dict(target=target, progress=month_end / target)
+    results['months'] = base.index
+    return results
+
+
+def percentiles(values, q):
+    """ percentiles of each month over the scenarios, one row per q """
+    return np.percentile(values, q, axis=0)
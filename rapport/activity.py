@@ -0,0 +1,109 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                     BUYING ACTIVITY
+   -------------------------------------------------------------------------------------------
+   Quantities ordered and number of orders binned per (month, weekday, hour, city, category).
+   The orders are binned once, new orders are added to the bins (add), tensors of other files
+   are merged (merge) and any heatmap or slice of the report is a sum of the tensor, the
+   orders are not read again.
+'''
+import numpy as np
+import pandas as pd
+
+
+class ActivityTensor:
+	"""
+	>> AXES <<
+	---------------------------------------------------------------------------------------------
+		* Period: month of the order, 'YYYY-MM', grows with the orders
+		* Weekday: 0 (monday) to 6
+		* Hour: 0 to 23
+		* City, Cat: grow with the orders
+	"""
+	axes = ['Period', 'Weekday', 'Hour', 'City', 'Cat']
+	measures = ['quantity', 'orders']
+
+	def __init__(self, orders=None):
+		self.labels = {
+			'Period': pd.Index([], dtype=object),
+			'Weekday': pd.RangeIndex(7),
+			'Hour': pd.RangeIndex(24),
+			'City': pd.Index([], dtype=object),
+			'Cat': pd.Index([], dtype=object),
+		}
+		self.values = {measure: np.zeros(self.shape) for measure in self.measures}
+		if orders is not None:
+			self.add(orders)
+
+	@property
+	def shape(self):
+		return tuple(len(self.labels[axis]) for axis in self.axes)
+
+	def codes(self, axis, values):
+		""" positions of values on an axis, the new values are appended to it """
+		new = pd.Index(pd.unique(values)).difference(self.labels[axis])
+		if len(new):
+			self.labels[axis] = self.labels[axis].append(new)
+			position = self.axes.index(axis)
+			for measure, tensor in self.values.items():
+				padding = [(0, 0)] * tensor.ndim
+				padding[position] = (0, len(new))
+				self.values[measure] = np.pad(tensor, padding)
+		return self.labels[axis].get_indexer(values)
+
+	def add(self, orders):
+		""" bin orders (dataframe of clean_data.csv: Order Date, City, Cat, Quantity Ordered) """
+		dates = pd.to_datetime(orders['Order Date'])
+		codes = (
+			self.codes('Period', dates.dt.strftime('%Y-%m')),
+			dates.dt.weekday.to_numpy(),
+			dates.dt.hour.to_numpy(),
+			self.codes('City', orders['City']),
+			self.codes('Cat', orders['Cat']),
+		)
+		flat = np.ravel_multi_index(codes, self.shape)
+		size = int(np.prod(self.shape))
+		self.values['quantity'] += np.bincount(flat, weights=orders['Quantity Ordered'], minlength=size).reshape(self.shape)
+		self.values['orders'] += np.bincount(flat, minlength=size).reshape(self.shape)
+		return self
+
+	def merge(self, other):
+		""" add the bins of another tensor (other orders, file or process), the labels are united """
+		positions = [self.codes(axis, other.labels[axis]) for axis in self.axes]
+		for measure in self.measures:
+			self.values[measure][np.ix_(*positions)] += other.values[measure]
+		return self
+
+	def select(self, keep=None, measure='quantity', by=('Weekday', 'Hour')):
+		"""
+			* keep: {axis: boolean mask or list of labels}, the other labels are left out (dict)
+			* by: axes kept in the result, the others are summed (list)
+
+			return a dataframe for two axes (index: first axis), a series for one
+		"""
+		masks = {
+			axis: np.asarray(values) if np.asarray(values).dtype == bool else self.labels[axis].isin(values)
+			for axis, values in (keep or {}).items()}
+		tensor = self.values[measure]
+		for axis, mask in masks.items():
+			tensor = np.compress(mask, tensor, axis=self.axes.index(axis))
+		summed = tensor.sum(axis=tuple(i for i, axis in enumerate(self.axes) if axis not in by))
+		# the axes of summed are in the order of self.axes
+		order = [axis for axis in self.axes if axis in by]
+		summed = np.transpose(summed, [order.index(axis) for axis in by])
+		labels = [self.labels[axis][masks[axis]] if axis in masks else self.labels[axis] for axis in by]
+		if len(by) == 1:
+			return pd.Series(summed, index=labels[0])
+		return pd.DataFrame(summed, index=labels[0], columns=labels[1])
+
+	def subset(self, keep):
+		""" new tensor with only the kept labels ({axis: boolean mask or list of labels}) """
+		subset = ActivityTensor()
+		subset.labels = dict(self.labels)
+		subset.values = dict(self.values)
+		for axis, values in keep.items():
+			mask = np.asarray(values) if np.asarray(values).dtype == bool else self.labels[axis].isin(values)
+			subset.labels[axis] = self.labels[axis][mask]
+			for measure, tensor in subset.values.items():
+				subset.values[measure] = np.compress(mask, tensor, axis=self.axes.index(axis))
+		return subset
@@ -1,19 +1,30 @@
 import os
-from itertools import combinations
-from collections import Counter
+import re
+import sys
+import glob
+from urllib.parse import parse_qs
 
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 
 import dash
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Output, Input, State
-import dash_table
+from dash.dependencies import Output, Input
+
+# modules shared by the dashboard and the report
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.serializer import prepare_figure
+from shared.http_cache import create_server, enable_etags
+from shared.chunked import PartialAggregate
+from shared.ingest import ingest
+from shared.memory import BudgetCache, memoize, enable_memory_endpoint
+from shared.styling import palette_codes, threshold_colors, millify, percent_labels
+from city_factors import analyse_factors, fit_curve, label_offsets
+from activity import ActivityTensor
+from star import StarSchema
+from ranking import Ranking
 
 
 '''
@@ -23,8 +34,7 @@ import dash_table
 
 '''
 ## PLOTLY
-import plotly.io as pio
-pio.templates.default = "plotly_white"
+# plotly.graph_objects is imported in create_figures, it is the slowest import of the app
 config_dash = {'displayModeBar': False, 'showAxisDragHandles':False, 'responsive':True, "scrollZoom":False}
 
 margin = dict(l=20, r=20, t=20, b=20)
@@ -33,11 +43,38 @@ with open('mapbox_token.txt') as f:
     lines=[x.rstrip() for x in f]
 mapbox_access_token = lines[0]
 
+## REPORTS
+# a dataset is a folder with raw_data.csv, clean_data.csv and city_info.csv, the app serves the
+# report of ?dataset=...&period=...&city=...&city=... (see serve_report). The orders can also
+# be split in many files of the same columns: orders/*.csv (one per month, per store...)
+datasets = os.environ.get('REPORT_DATASETS', 'data').split(',')
+default_dataset = datasets[0]
+# period shown in the texts of the figures built without a label, a report that is not restricted
+# to a period shows the years of its orders
+default_label = '2019'
+# clean_data.csv is read chunk_size rows at a time and summed, it can be larger than the memory
+chunk_size = int(os.environ.get('REPORT_CHUNK_SIZE', 100_000))
+# processes reading the order files of a dataset, default: number of cpus. A single clean_data.csv
+# is always read by one process, only the split files (orders/*.csv) are read in parallel
+ingest_workers = int(os.environ.get('REPORT_INGEST_WORKERS', 0)) or None
+
+## MEMORY
+# budget of the cache of the built reports, the least recently used are evicted (LAYOUT_CACHE_MB)
+layout_cache = BudgetCache(max_bytes=int(os.environ.get('LAYOUT_CACHE_MB', 256)) * 2**20, max_entries=64)
+# loaded datasets, never evicted
+dataset_cache = BudgetCache()
+# /_memory: bytes per dataset, table, and cached report (MEMORY_ENDPOINT=1) and the allocation
+# peak of each request (MEMORY_TRACE=1, slows the app down)
+memory_endpoint = os.environ.get('MEMORY_ENDPOINT', '0') == '1'
+memory_trace = os.environ.get('MEMORY_TRACE', '0') == '1'
+
 ## DASH
 # external CSS + dash bootstrap components
 external_stylesheets=[dbc.themes.BOOTSTRAP, "assets/main.css"]
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-server = app.server
+# brotli / gzip compression of every response and ETags on the layout, dependencies and callbacks
+server = create_server(__name__)
+app = dash.Dash(__name__, server=server, compress=True, external_stylesheets=external_stylesheets)
+enable_etags(server)
 
 
 ## COLOR and STYLE
@@ -49,21 +86,27 @@ colors_palette = {
   'TV & Moniteur':'#f4a261',
   'Machine à laver':'#e76f51'
 }
-str_to_int = {key: i for i, key in enumerate(colors_palette.keys())}
+# products of each category in the texts of the report, singular and plural
+category_products = {
+  'Ordinateur': ("modèle d’ordinateur", "modèles d’ordinateurs"),
+  'Accessoire': ("type d’accessoire", "types d’accessoires"),
+  'Smartphone': ("modèle de téléphone", "modèles de téléphones"),
+  'TV & Moniteur': ("modèle d’écran", "modèles d’écrans"),
+  'Machine à laver': ("modèle de machine à laver", "modèles de machines à laver")
+}
+# quiet months of each year, shaded in the monthly sales (figure 9)
+quiet_periods = {
+  '<b>Après Fêtes</b><br>Période creuse': [1, 2, 3],
+  '<b>Vacances Scolaires</b><br>Période creuse': [6, 7, 8, 9]
+}
+# weekdays of the activity heatmaps, monday first
+weekdays = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
 # color for high priced and low cost product
 custom_blue = "rgba(33, 158, 188, 1)"
 custom_orange = "rgba(244, 140, 6, 1)" 
 # style for figure title and subtitle
 font_title = dict(family="Verdana", size=24, color="#495057")
 
-## READ BIG NUMBER
-def millify(n):
-  if n>999:
-      if n > 1e6-1:
-          return f'{round(n/1e6,1)}M'
-      return f'{round(n/1e3,1)}K'
-  return n
-
 '''
    ------------------------------------------------------------------------------------------- 
                                             CREATE THE FIGURE
@@ -71,429 +114,687 @@ def millify(n):
 
 '''
 ## LOAD DATA
-raw_data = pd.read_csv('data/raw_data.csv')
-raw_data.sort_values(by="Date", inplace=True)
-data = pd.read_csv('data/clean_data.csv')
-
-## 1. ANALYSE DES PRODUITS
-## -----------------------
-product_report = data.groupby(['Cat', 'Product','Price Each']).sum()
-
-product_list = product_report.index.get_level_values('Product')
-categories_list =product_report.index.get_level_values('Cat')
-
-## Figure 1 (parcast): 5 catégories de 19 produits
-# create dim
-df = product_report.reset_index().sort_values('Price Each', ascending=False)
-cat_dim = go.parcats.Dimension(values=df['Cat'].values, categoryorder="trace")
-product_dim = go.parcats.Dimension(
-    values = df['Product'].values, 
-    categoryorder = "array",
-    categoryarray = df["Product"].values)
-# color 
-colors = df['Cat'].apply(lambda x:str_to_int[x])
-colorscale = [value for value in colors_palette.values()]
-# plot
-parcats = go.Figure(
-	go.Parcats(
-		dimensions = [cat_dim, product_dim],
-		line = dict(color=colors, colorscale=colorscale, shape='hspline'),
-		hoverinfo = 'none'))
-# update
-parcats.update_layout(margin=dict(l=45, r=80, t=20, b=20))
-
-## Figure 2 (horizontal bar): Classement des produits
-df = product_report.sort_values(by="Sales").reset_index(["Cat","Price Each"])
-df["percent"] = df["Sales"]/df["Sales"].sum()* 100
-# sales labels
-df["text"] = [f"{int(np.round(p))}%" for p in df["percent"]]
-text = [None] * len(df)
-text[-4:] = df.text[-4:]
-# color
-colors = np.array(["rgba(142, 143, 144, 0.8)"]*len(df))
-colors[-4:] = custom_blue
-colors[:5] = custom_orange 
-# plot
-product_bar = go.Figure(
-	go.Bar(
-		y = df.index, 
-		x = df["percent"],
-		marker_color = colors,
-		customdata = df["Cat"]))
-# update
-product_bar.update_layout(height = 600, margin = {**margin,**{"pad":10, "t":50}})
-product_bar.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
-product_bar.update_yaxes(showgrid=False, showline=False, fixedrange=True)
-product_bar.update_traces(showlegend=False, orientation='h')
-product_bar.update_traces(text=text, textposition='auto', hovertemplate="<b>%{y}</b> %{x:.2g}%<extra>%{customdata}</extra>")
-# annotations
-product_bar.add_annotation(
-	text = "% du chiffre d'affaires en 2019",
-	xref='paper', x=0, xanchor = "left",
-	yref='paper', y=1.045,
-	showarrow=False,
-	font = dict(color="#8E8F90", size=13))
-product_bar.add_annotation(
-	text="""<b>3.1% du Chiffre d'affaires</b>
-		<br><span style="color:#6c757d;">pour 5 des 19 produits</span>""", 
-	align = "left",
-	x = 0.05, xref = "paper",
-	y=0.1, yref="paper", 
-    showarrow=False, 
-	font=dict(color= custom_orange, size=15))
-product_bar.add_annotation(
-	text="""<b>58% du Chiffre d'affaires</b>
-		<br><span style="color:#6c757d;">pour les 4 meilleurs produits</span>""",
-	align = "left",
-	x = 0.6, xref = "paper", xanchor="left",
-	y = 0.93,yref = "paper", 
-    showarrow=False, 
-	font=dict(color= custom_blue, size=15))
-
-## Figure 3 (scatter): Volume de ventes des produits selon leurs prix
-df = product_report[['Sales', 'Quantity Ordered']].reset_index()
-size = df['Quantity Ordered']
-# colors
-df["colors"] = "grey"
-df.loc[df["Sales"] > 2.9e6,"colors"] = custom_blue
-df.loc[df["Price Each"] < 75, "colors"] = custom_orange
-# plot
-scatter_plot_product = go.Figure(
-	go.Scatter(
-		x=df["Price Each"],
-		y=df["Sales"],
-		mode="markers",
-		marker=dict(
-			color=df["colors"],
-			line=dict(width=0.5, color='black'),
-			size=size,
-			sizemode='area',
-			sizeref=3.*max(size)/(30.**2)),
-		text=df["Product"],
-		hovertemplate="""<b>%{text}</b><br>prix unitaire, <b>%{x} $</b> <br>volume des ventes, <b>%{y:.2s} $</b> <extra></extra>"""))
-# update
-scatter_plot_product.update_layout(height = 600, margin = margin)
-scatter_plot_product.update_xaxes(
-	title=dict(text='Prix des produits ($)', font=dict(color="grey",size=12)),
-	range=[-50,1800],
-	nticks=5, 
-	tickfont_color='grey',
-	showgrid=True, 
-	fixedrange=True,
-	zeroline=True, zerolinewidth=1, zerolinecolor='grey')
-scatter_plot_product.update_yaxes(
-	title=dict(text='Volume de ventes ($)', font=dict(color="grey", size=12)), 
-	range=[-5e5,8.5e6],
-	nticks=5,
-	tickfont_color='grey',
-	showgrid=True, 
-	fixedrange=True,
-	zeroline=True, zerolinewidth=1, zerolinecolor='grey')
-# annotations
-scatter_plot_product.add_annotation(
-	text = "<b>Macbook Pro</b>, produit haut de <br>gamme avec une rentabilité élevée",
-	align = "left",
-	x=1700, y=8037600,
-	ax=-200, ay=0),
-scatter_plot_product.add_annotation(
-	text = '<b>Machine à laver</b>, produit volumineux<br> avec une rentabilité discutable',
-	align = "left",
-	x=600, y=4e5, 
-	ay=-40, ax=60)
-scatter_plot_product.add_annotation(
-	text = '<b>Produits low cost</b>, rentabilité faible<br>nombre de ventes élevées',
-	align = "left",
-	x=10, y=3e5,
-	ay=-225, ax=120)
-
-## Figure 4 (horizontal bar): comparaison low cost high priced
-df = product_report[['Sales', 'Quantity Ordered']].reset_index()
-df["r_sales"] = df["Sales"] / df["Sales"].sum()
-df["r_quantity"] = df["Quantity Ordered"] / df["Quantity Ordered"].sum()
-# Figure 4.1 low cost product
-low_cost = df[df["Price Each"]< 25].sum()
-low_cost_viz = go.Figure([
-	go.Bar(
-		x=[1,1], 
-		marker_color="lightgrey", 
-		width = 0.5, 
-		hoverinfo='skip'),
-    go.Bar(
-        x = low_cost[["r_quantity","r_sales"]],
-        customdata = low_cost[["Sales","Quantity Ordered"]],
-        width = 0.5,
-        marker = dict(color = custom_orange, line_color = custom_orange),
-		hovertemplate="%{customdata:.3s}<extra></extra>")
-])
-#update
-low_cost_viz.update_layout(
-	height= 400 , 
-	barmode='overlay', 
-	margin=margin,
-	annotations =
-	[
-		dict(text ="Chiffre d'affaires", xref='paper', x=-0.002, yref='paper', y=0.95, showarrow=False,  font=dict(color="#6c757d", size=14)),
-		dict(text ="Nombre de ventes", xref='paper', yref='paper', x=-0.002, y=0.42, showarrow=False, font=dict(color="#6c757d", size=14)),
+# data and figures are built on the first page load (see build_layout), not at import time
+
+# the figures only sum Sales and Quantity Ordered over these columns: the orders are summed once
+# per dataset at this grain, a report for a period or some cities is computed from this table
+order_keys = ['Period', 'Month_num', 'Month', 'Hour', 'City', 'lat', 'long', 'Cat', 'Product', 'Price Each']
+
+def order_period(data):
+	return data.assign(Period=data['Order Date'].str[:7])
+
+def sum_orders(data):
+	return PartialAggregate(order_keys, ['Sales', 'Quantity Ordered'], order_period).add(data).result(sort=False)
+
+def order_files(dataset):
+	""" clean_data.csv and the files of the orders folder of a dataset """
+	paths = [os.path.join(dataset, 'clean_data.csv')] + sorted(glob.glob(os.path.join(dataset, 'orders', '*.csv')))
+	return [path for path in paths if os.path.exists(path)]
+
+def order_aggregates():
+	""" what is kept of the order files: the sums per order_keys and the activity tensor """
+	return [PartialAggregate(order_keys, ['Sales', 'Quantity Ordered'], order_period), ActivityTensor()]
+
+@memoize(dataset_cache)
+def load_dataset(dataset=default_dataset):
+	"""
+		tables of a dataset folder: raw_data (tableau 1), orders (summed per order_keys, stored as a
+		StarSchema), city_info and activity (orders binned per month, weekday, hour, city and category)
+
+		the order files are read in parallel and streamed in chunks, only the sums are kept in memory
+	"""
+	raw_data = pd.read_csv(os.path.join(dataset, 'raw_data.csv'))
+	raw_data.sort_values(by="Date", inplace=True)
+	orders, activity = ingest(order_files(dataset), order_aggregates, chunk_size, ingest_workers)
+	return dict(
+		raw_data=raw_data,
+		orders=StarSchema(orders.result(sort=False)),
+		city_info=pd.read_csv(os.path.join(dataset, 'city_info.csv')),
+		activity=activity)
+
+def add_orders(new_orders, dataset=default_dataset):
+	""" orders received since the dataset was loaded (rows of clean_data.csv), the reports are rebuilt on demand """
+	tables = load_dataset(dataset)
+	tables['activity'].add(new_orders)
+	tables['orders'].add(sum_orders(new_orders))
+	build_layout.cache_clear()
+
+def month_spans(month_num, months):
+	""" (first, last) positions of the runs of consecutive rows whose month_num is in months """
+	inside = np.isin(month_num, months).astype(int)
+	edges = np.diff(np.concatenate([[0], inside, [0]]))
+	return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1))
+
+def in_period(periods, period):
+	""" mask of the 'YYYY-MM' periods inside period (see select_report) """
+	first, _, last = period.partition(':')
+	last = last or first
+	return (periods >= first) & (periods.str[:len(last)] <= last)
+
+class ReportError(ValueError):
+	""" report that cannot be built: invalid period or city (empty=False) or no order selected (empty=True) """
+	def __init__(self, message, empty=False):
+		super().__init__(message)
+		self.empty = empty
+
+period_format = re.compile(r'\d{4}(-(0[1-9]|1[0-2]))?$')
+
+def check_period(period):
+	""" period of select_report, ReportError for another format or a first after the last """
+	first, _, last = period.partition(':')
+	last = last or first
+	if not (period_format.match(first) and period_format.match(last)) or first > last:
+		raise ReportError(f"Période invalide « {period} », attendu AAAA, AAAA-MM ou début:fin")
+
+def check_cities(city_info, cities):
+	""" ReportError for a city absent from city_info """
+	unknown = [city for city in cities if city not in set(city_info['City'])]
+	if unknown:
+		raise ReportError(f"Ville inconnue : {', '.join(unknown)}")
+
+def select_report(dataset=default_dataset, period=None, cities=None):
+	"""
+		* period: 'YYYY', 'YYYY-MM' or 'first:last' in one of these formats, last included (str, default=None, every order)
+		* cities: cities kept (list, default=None, every city)
+
+		return the tables of the dataset restricted to the period and the cities, and the label of the report.
+		The Sales of city_info are the sales of the selected orders. ReportError for an invalid period or
+		city, or when no order is left (error.empty)
+	"""
+	tables = load_dataset(dataset)
+	orders, city_info, activity = tables['orders'], tables['city_info'], tables['activity']
+	if period:
+		check_period(period)
+	if cities:
+		check_cities(city_info, cities)
+	keep = {}
+	if period:
+		orders = orders.restrict('periods', in_period(orders.tables['periods']['Period'], period))
+		keep['Period'] = in_period(activity.labels['Period'], period)
+	if cities:
+		orders = orders.restrict('cities', orders.tables['cities']['City'].isin(cities))
+		city_info = city_info[city_info['City'].isin(cities)]
+		keep['City'] = list(cities)
+	if not len(orders.facts):
+		raise ReportError(f"Aucune commande pour {report_label(period, cities)}", empty=True)
+	return dict(
+		orders=orders,
+		city_info=city_info_sales(orders, city_info),
+		activity=activity.subset(keep),
+		label=report_label(period or orders_period(orders), cities))
+
+def orders_period(orders):
+	""" years of the orders (StarSchema) as a period of select_report: 'YYYY' or 'first:last' """
+	periods = orders.tables['periods']['Period'].to_numpy()[orders.facts['period_id'].unique()]
+	first, last = min(periods)[:4], max(periods)[:4]
+	return first if first == last else f"{first}:{last}"
+
+def city_info_sales(orders, city_info):
+	""" city_info with the sales of the orders instead of its Sales column, the cities without orders are left out """
+	sales = orders.sum_by('cities', ['City'])['Sales'].reset_index()
+	return city_info.drop(columns='Sales').merge(sales, on='City')
+
+def report_label(period=None, cities=None):
+	""" text replacing 2019 in the figures """
+	label = period.replace(':', ' - ') if period else default_label
+	return f"{label}, {', '.join(cities)}" if cities else label
+
+def period_text(period=None):
+	""" period of the report in the texts: l'année 2019, le mois 2019-03 or la période 2018 - 2019-06 """
+	period = period or default_label
+	if ':' in period:
+		return f"la période {period.replace(':', ' - ')}"
+	return f"l'année {period}" if len(period) == 4 else f"le mois {period}"
+
+def enumeration(items, last='et'):
+	""" 'a, b et c' """
+	items = [str(item) for item in items]
+	return f" {last} ".join([", ".join(items[:-1]), items[-1]]) if len(items) > 1 else "".join(items)
+
+def catalog_text(product_report):
+	""" number of products of each category, in the order of category_products """
+	counts = product_report.reset_index().groupby('Cat')['Product'].nunique()
+	order = [cat for cat in category_products if cat in counts.index] + [cat for cat in counts.index if cat not in category_products]
+	names = {cat: category_products.get(cat, (cat, cat))[int(counts[cat] > 1)] for cat in order}
+	return enumeration([f"{counts[cat]} {names[cat]}" for cat in order])
+
+def correlation_text(factors, factor):
+	""" correlations of a factor with their 95% intervals """
+	row = factors.loc[factor]
+	if np.isnan(row['pearson']):
+		return ""
+	return (f"corrélation <b>{row['pearson']:.2f}</b> [{row['pearson_low']:.2f}, {row['pearson_high']:.2f}]"
+		f"<br>corrélation des rangs <b>{row['spearman']:.2f}</b> [{row['spearman_low']:.2f}, {row['spearman_high']:.2f}]")
+
+def rank_products(product_report):
+	""" best (high priced) and worst (low cost) products by sales, highlighted in figures 2 and 4 """
+	sales = product_report['Sales'].sort_values().reset_index(['Cat', 'Price Each'], drop=True)
+	return Ranking(sales, n_top=4, n_bottom=5)
+
+def product_shares(product_report, products):
+	""" share of the sales and of the quantity ordered of some products """
+	totals = product_report[['Sales', 'Quantity Ordered']]
+	return totals[totals.index.get_level_values('Product').isin(products)].sum() / totals.sum()
+
+def create_figures(orders, city_info, activity, label=default_label, factors=None):
+	"""
+		* orders, city_info, activity, label: see select_report
+		* factors: result of analyse_factors for city_info, computed if missing
+	"""
+	import plotly.graph_objects as go
+	import plotly.io as pio
+	pio.templates.default = "plotly_white"
+
+	## 1. ANALYSE DES PRODUITS
+	## -----------------------
+	product_report = orders.sum_by('products', ['Cat', 'Product', 'Price Each'])
+
+	product_list = product_report.index.get_level_values('Product')
+	categories_list =product_report.index.get_level_values('Cat')
+
+	## Figure 1 (parcast): 5 catégories de 19 produits
+	# create dim
+	df = product_report.reset_index().sort_values('Price Each', ascending=False)
+	cat_dim = go.parcats.Dimension(values=df['Cat'].values, categoryorder="trace")
+	product_dim = go.parcats.Dimension(
+	    values = df['Product'].values, 
+	    categoryorder = "array",
+	    categoryarray = df["Product"].values)
+	# color 
+	colors = palette_codes(df['Cat'], colors_palette)
+	colorscale = list(colors_palette.values())
+	# plot
+	parcats = go.Figure(
+		go.Parcats(
+			dimensions = [cat_dim, product_dim],
+			line = dict(color=colors, colorscale=colorscale, shape='hspline'),
+			hoverinfo = 'none'))
+	# update
+	parcats.update_layout(margin=dict(l=45, r=80, t=20, b=20))
+
+	## Figure 2 (horizontal bar): Classement des produits
+	df = product_report.sort_values(by="Sales").reset_index(["Cat","Price Each"])
+	df["percent"] = df["Sales"]/df["Sales"].sum()* 100
+	# best and worst products, highlighted here and compared in figure 4
+	ranking = rank_products(product_report)
+	# sales labels of the best products
+	df["text"] = percent_labels(df["percent"], scale=1)
+	text = np.where(df.index.isin(ranking.top.index), df["text"], None)
+	# color
+	colors = ranking.highlight(df.index, custom_blue, custom_orange, "rgba(142, 143, 144, 0.8)")
+	# plot
+	product_bar = go.Figure(
+		go.Bar(
+			y = df.index, 
+			x = df["percent"],
+			marker_color = colors,
+			customdata = df["Cat"]))
+	# update
+	product_bar.update_layout(height = 600, margin = {**margin,**{"pad":10, "t":50}})
+	product_bar.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
+	product_bar.update_yaxes(showgrid=False, showline=False, fixedrange=True)
+	product_bar.update_traces(showlegend=False, orientation='h')
+	product_bar.update_traces(text=text, textposition='auto', hovertemplate="<b>%{y}</b> %{x:.2g}%<extra>%{customdata}</extra>")
+	# annotations
+	product_bar.add_annotation(
+		text = f"% du chiffre d'affaires en {label}",
+		xref='paper', x=0, xanchor = "left",
+		yref='paper', y=1.045,
+		showarrow=False,
+		font = dict(color="#8E8F90", size=13))
+	product_bar.add_annotation(
+		text=f"""<b>{percent_labels(ranking.bottom_share, decimals=1)} du Chiffre d'affaires</b>
+		<br><span style="color:#6c757d;">pour {len(ranking.bottom)} des {ranking.size} produits</span>""", 
+		align = "left",
+		x = 0.05, xref = "paper",
+		y=0.1, yref="paper", 
+	    showarrow=False, 
+		font=dict(color= custom_orange, size=15))
+	product_bar.add_annotation(
+		text=f"""<b>{percent_labels(ranking.top_share)} du Chiffre d'affaires</b>
+		<br><span style="color:#6c757d;">pour les {len(ranking.top)} meilleurs produits</span>""",
+		align = "left",
+		x = 0.6, xref = "paper", xanchor="left",
+		y = 0.93,yref = "paper", 
+	    showarrow=False, 
+		font=dict(color= custom_blue, size=15))
+
+	## Figure 3 (scatter): Volume de ventes des produits selon leurs prix
+	df = product_report[['Sales', 'Quantity Ordered']].reset_index().set_index('Product', drop=False)
+	size = df['Quantity Ordered']
+	# colors: the best and worst products of figure 2
+	df["colors"] = ranking.highlight(df["Product"], custom_blue, custom_orange, "grey")
+	# plot
+	scatter_plot_product = go.Figure(
+		go.Scatter(
+			x=df["Price Each"],
+			y=df["Sales"],
+			mode="markers",
+			marker=dict(
+				color=df["colors"],
+				line=dict(width=0.5, color='black'),
+				size=size,
+				sizemode='area',
+				sizeref=3.*max(size)/(30.**2)),
+			text=df["Product"],
+			hovertemplate="""<b>%{text}</b><br>prix unitaire, <b>%{x} $</b> <br>volume des ventes, <b>%{y:.2s} $</b> <extra></extra>"""))
+	# update
+	scatter_plot_product.update_layout(height = 600, margin = margin)
+	scatter_plot_product.update_xaxes(
+		title=dict(text='Prix des produits ($)', font=dict(color="grey",size=12)),
+		range=[-0.03 * df["Price Each"].max(), 1.06 * df["Price Each"].max()],
+		nticks=5, 
+		tickfont_color='grey',
+		showgrid=True, 
+		fixedrange=True,
+		zeroline=True, zerolinewidth=1, zerolinecolor='grey')
+	scatter_plot_product.update_yaxes(
+		title=dict(text='Volume de ventes ($)', font=dict(color="grey", size=12)), 
+		range=[-0.06 * df["Sales"].max(), 1.1 * df["Sales"].max()],
+		nticks=5,
+		tickfont_color='grey',
+		showgrid=True, 
+		fixedrange=True,
+		zeroline=True, zerolinewidth=1, zerolinecolor='grey')
+	# annotations: the best product, the least sold washing machine and the cheapest of the worst products
+	best = df.loc[ranking.top.index[0]]
+	scatter_plot_product.add_annotation(
+		text = f"<b>{best['Product']}</b>, produit haut de <br>gamme avec une rentabilité élevée",
+		align = "left",
+		x=best["Price Each"], y=best["Sales"],
+		ax=-200, ay=0)
+	washing_machines = df[df["Cat"] == "Machine à laver"]
+	if len(washing_machines):
+		washing_machine = washing_machines.loc[washing_machines["Sales"].idxmin()]
+		scatter_plot_product.add_annotation(
+			text = '<b>Machine à laver</b>, produit volumineux<br> avec une rentabilité discutable',
+			align = "left",
+			x=washing_machine["Price Each"], y=washing_machine["Sales"],
+			ay=-40, ax=60)
+	worst = df.loc[ranking.bottom.index]
+	cheapest = worst.loc[worst["Price Each"].idxmin()]
+	scatter_plot_product.add_annotation(
+		text = '<b>Produits low cost</b>, rentabilité faible<br>nombre de ventes élevées',
+		align = "left",
+		x=cheapest["Price Each"], y=cheapest["Sales"],
+		ay=-225, ax=120)
+
+	## Figure 4 (horizontal bar): comparaison low cost high priced
+	df = product_report[['Sales', 'Quantity Ordered']].reset_index()
+	df["r_sales"] = df["Sales"] / df["Sales"].sum()
+	df["r_quantity"] = df["Quantity Ordered"] / df["Quantity Ordered"].sum()
+	# Figure 4.1 low cost product: the worst products of figure 2
+	low_cost = df[df["Product"].isin(ranking.bottom.index)].sum()
+	low_cost_viz = go.Figure([
+		go.Bar(
+			x=[1,1], 
+			marker_color="lightgrey", 
+			width = 0.5, 
+			hoverinfo='skip'),
+	    go.Bar(
+	        x = low_cost[["r_quantity","r_sales"]],
+	        customdata = low_cost[["Sales","Quantity Ordered"]],
+	        width = 0.5,
+	        marker = dict(color = custom_orange, line_color = custom_orange),
+			hovertemplate="%{customdata:.3s}<extra></extra>")
 	])
-low_cost_viz.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
-low_cost_viz.update_yaxes(showgrid=False, showline=False, showticklabels=False, fixedrange=True)
-low_cost_viz.update_traces(
-	orientation = "h", 
-	showlegend = False, 
-	texttemplate="%{x:2%}", textposition = 'outside', textfont=dict(size=25, color="white"))
-
-# Figure 4.2: high priced product
-high_priced = df[df["Product"].isin(['Macbook Pro', 'iPhone XR','Samsung Galaxy n10', 'Dell XPS 13'])].sum()
-high_cost_viz = go.Figure([
-	go.Bar(
+	#update
+	low_cost_viz.update_layout(
+		height= 400 , 
+		barmode='overlay', 
+		margin=margin,
+		annotations =
+		[
+			dict(text ="Chiffre d'affaires", xref='paper', x=-0.002, yref='paper', y=0.95, showarrow=False,  font=dict(color="#6c757d", size=14)),
+			dict(text ="Nombre de ventes", xref='paper', yref='paper', x=-0.002, y=0.42, showarrow=False, font=dict(color="#6c757d", size=14)),
+		])
+	low_cost_viz.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
+	low_cost_viz.update_yaxes(showgrid=False, showline=False, showticklabels=False, fixedrange=True)
+	low_cost_viz.update_traces(
+		orientation = "h", 
+		showlegend = False, 
+		texttemplate="%{x:2%}", textposition = 'outside', textfont=dict(size=25, color="white"))
+
+	# Figure 4.2: high priced product, the best products of figure 2
+	high_priced = df[df["Product"].isin(ranking.top.index)].sum()
+	high_cost_viz = go.Figure([
+		go.Bar(
 		
-		x=[1,1], 
-		marker_color = "lightgrey", 
-		width = 0.5, 
-		hoverinfo = 'skip'),
-    go.Bar( 
-        x = high_priced[["r_quantity","r_sales"]],
-        customdata = high_priced[["Sales","Quantity Ordered"]],
-        marker_color = custom_blue, 
-        width = 0.5,
-        marker_line_color = custom_blue,
-		hovertemplate="%{customdata:.3s}<extra></extra>")
-])
-high_cost_viz.update_layout(
-	height = 400 , 
-	barmode = 'overlay', 
-	margin = margin,
-	annotations =
-	[
-		dict(text = "Chiffre d'affaires", xref='paper', x=-0.002, yref='paper', y=0.95, showarrow=False,  font=dict(color="#6c757d", size=14)),
-		dict(text = "Nombre de ventes", xref='paper', yref='paper', x=-0.002, y=0.42, showarrow=False, font=dict(color="#6c757d", size=14)),
-	]
-)
-high_cost_viz.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
-high_cost_viz.update_yaxes(showgrid=False, showline=False, showticklabels=False, fixedrange=True)
-high_cost_viz.update_traces(
-	orientation = "h", 
-	showlegend = False, 
-	texttemplate="%{x:2%}", textposition = 'outside', textfont=dict(size=25, color="white"))
-
-## 2. ANALYSE DES LIEUX DE VENTES
-## -------------------------------
-city_sales = data.groupby(['City','lat','long']).sum()['Sales'].reset_index()
-city_sales['Sales_text'] = city_sales['Sales'].apply(lambda x: millify(x))
-cities = city_sales['City']
-city_sales['percents'] = city_sales['Sales']/city_sales['Sales'].sum()
-
-## Figure 5 (map): Cartographie des lieux de ventes
-# plot
-map_plot = go.Figure(
-	go.Scattermapbox(
-		lat = city_sales['lat'], 
-		lon = city_sales['long'],
-		marker = dict(
-			size = city_sales['Sales']/350000, 
-			opacity = 0.5,
-			allowoverlap = True,
-			color = custom_blue),
-		hoverinfo = 'none'
+			x=[1,1], 
+			marker_color = "lightgrey", 
+			width = 0.5, 
+			hoverinfo = 'skip'),
+	    go.Bar( 
+	        x = high_priced[["r_quantity","r_sales"]],
+	        customdata = high_priced[["Sales","Quantity Ordered"]],
+	        marker_color = custom_blue, 
+	        width = 0.5,
+	        marker_line_color = custom_blue,
+			hovertemplate="%{customdata:.3s}<extra></extra>")
+	])
+	high_cost_viz.update_layout(
+		height = 400 , 
+		barmode = 'overlay', 
+		margin = margin,
+		annotations =
+		[
+			dict(text = "Chiffre d'affaires", xref='paper', x=-0.002, yref='paper', y=0.95, showarrow=False,  font=dict(color="#6c757d", size=14)),
+			dict(text = "Nombre de ventes", xref='paper', yref='paper', x=-0.002, y=0.42, showarrow=False, font=dict(color="#6c757d", size=14)),
+		]
+	)
+	high_cost_viz.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
+	high_cost_viz.update_yaxes(showgrid=False, showline=False, showticklabels=False, fixedrange=True)
+	high_cost_viz.update_traces(
+		orientation = "h", 
+		showlegend = False, 
+		texttemplate="%{x:2%}", textposition = 'outside', textfont=dict(size=25, color="white"))
+
+	## 2. ANALYSE DES LIEUX DE VENTES
+	## -------------------------------
+	city_sales = orders.sum_by('cities', ['City', 'lat', 'long'])['Sales'].reset_index()
+	city_sales['Sales_text'] = millify(city_sales['Sales'])
+	cities = city_sales['City']
+	city_sales['percents'] = city_sales['Sales']/city_sales['Sales'].sum()
+
+	## Figure 5 (map): Cartographie des lieux de ventes
+	# plot
+	map_plot = go.Figure(
+		go.Scattermapbox(
+			lat = city_sales['lat'], 
+			lon = city_sales['long'],
+			marker = dict(
+				size = city_sales['Sales']/350000, 
+				opacity = 0.5,
+				allowoverlap = True,
+				color = custom_blue),
+			hoverinfo = 'none'
+		)
+	)
+	# add border
+	map_plot.add_trace(
+		go.Scattermapbox(
+			lat = city_sales['lat'], 
+			lon = city_sales['long'],
+			marker = dict(
+				size = city_sales['Sales']/200000, 
+				opacity=0.3,
+				allowoverlap=True,
+				color=custom_blue),
+			mode = "markers+text",
+			textposition = "top center",
+			textfont = dict(family="sans serif", size=16, color="black"),
+			text = cities
+		)
+	)
+	# update               
+	map_plot.update_layout(
+	    hoverlabel=dict(
+	        bgcolor="white",
+	        font_size=12),
+	    margin=dict(l=0, r=0, t=0, b=0),
+	    mapbox = dict(
+	        accesstoken = mapbox_access_token,
+	        zoom = 2.9,
+	        center = go.layout.mapbox.Center(lat=40,lon=-97),
+	        style = "mapbox://styles/axelitorosalito/ckb2erv2q148d1jnp7959xpz0"), 
+	    showlegend=False
+	)
+
+	## Figure 6 (horizontal bar): Classement des villes
+	df = city_sales.copy()
+	df.sort_values(by="Sales", inplace=True)
+	city_rank= go.Figure(
+		go.Bar(
+			y = df['City'],
+			x = df['percents'],
+	        hovertemplate ="<b>%{y}</b><br>%{x:.2%} du chiffre d'affaires<extra></extra>")
 	)
-)
-# add border
-map_plot.add_trace(
-	go.Scattermapbox(
-		lat = city_sales['lat'], 
-		lon = city_sales['long'],
-		marker = dict(
-			size = city_sales['Sales']/200000, 
-			opacity=0.3,
-			allowoverlap=True,
-			color=custom_blue),
-		mode = "markers+text",
-		textposition = "top center",
-		textfont = dict(family="sans serif", size=16, color="black"),
-		text = cities
+	# updates
+	city_rank.update_layout(margin = {**margin,**{"pad":10, "t":50}}, hoverlabel = dict(bgcolor="white",font_size=12))
+	city_rank.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
+	city_rank.update_yaxes(showgrid=False, showline=False, fixedrange=True)
+	city_rank.update_traces(marker_color = custom_blue, orientation='h', textposition="auto", texttemplate='%{x:.0%}',textfont_color="white")
+
+	#  annotations
+	city_rank.add_annotation(
+		text = f"% du chiffre d'affaires en {label}",
+		xref = "paper", yref="paper", 
+		x=0, y=1.06, xanchor="left",
+		showarrow = False, 
+		font = dict(color= "#8E8F90", size=13)
+	)
+
+	## Figure 7 (scatter): Salaire moyen en fonction des Ventes
+	df = city_info
+	factors = analyse_factors(city_info) if factors is None else factors
+	# plot
+	sales_income = go.Figure(
+		go.Scatter(
+			x = df["income_2010"], 
+			y = df["Sales"],
+			mode = "markers+text",
+			text = df["City"],
+			hovertemplate = "<b>%{text}</b><br><b>%{y:.2s} $</b> de chiffres d'affaires<br><b>%{x:.2s} $</b> de salaire moyen<extra></extra>")
 	)
-)
-# update               
-map_plot.update_layout(
-    hoverlabel=dict(
-        bgcolor="white",
-        font_size=12),
-    margin=dict(l=0, r=0, t=0, b=0),
-    mapbox = dict(
-        accesstoken = mapbox_access_token,
-        zoom = 2.9,
-        center = go.layout.mapbox.Center(lat=40,lon=-97),
-        style = "mapbox://styles/axelitorosalito/ckb2erv2q148d1jnp7959xpz0"), 
-    showlegend=False
-)
-
-## Figure 6 (horizontal bar): Classement des villes
-df = city_sales.copy()
-df.sort_values(by="Sales", inplace=True)
-city_rank= go.Figure(
-	go.Bar(
-		y = df['City'],
-		x = df['percents'],
-        hovertemplate ="<b>%{y}</b><br>%{x:.2%} du chiffre d'affaires<extra></extra>")
-)
-# updates
-city_rank.update_layout(margin = {**margin,**{"pad":10, "t":50}}, hoverlabel = dict(bgcolor="white",font_size=12))
-city_rank.update_xaxes(showgrid=False, showticklabels=False, zeroline=False, showline=False, fixedrange=True)
-city_rank.update_yaxes(showgrid=False, showline=False, fixedrange=True)
-city_rank.update_traces(marker_color = custom_blue, orientation='h', textposition="auto", texttemplate='%{x:.0%}',textfont_color="white")
-
-#  annotations
-city_rank.add_annotation(
-	text = "% du chiffre d'affaires en 2019",
-	xref = "paper", yref="paper", 
-	x=0, y=1.06, xanchor="left",
-	showarrow = False, 
-	font = dict(color= "#8E8F90", size=13)
-)
-
-## Figure 7 (scatter): Salaire moyen en fonction des Ventes
-df = pd.read_csv("data/city_info.csv")
-# plot
-sales_income = go.Figure(
-	go.Scatter(
-		x = df["income_2010"], 
-		y = df["Sales"],
-		mode = "markers+text",
-		text = df["City"],
-		hovertemplate = "<b>%{text}</b><br><b>%{y:.2s} $</b> de chiffres d'affaires<br><b>%{x:.2s} $</b> de salaire moyen<extra></extra>")
-)
-# update
-sales_income.update_layout(height = 600, hoverlabel=dict(bgcolor="white", font_size=14),margin=margin)
-sales_income.update_traces(textposition = 'top center', marker = dict(size=10,color = "grey"))
-sales_income.update_xaxes(
-	title=dict(text="Salaire moyen annuel net ($)", font_color="grey"), 
-	nticks=5, 
-	tickfont_color='grey',
-	zeroline=True, zerolinewidth=1, zerolinecolor='grey', fixedrange=True
-)
-sales_income.update_yaxes(
-	title=dict(text="Volume de ventes($)", font_color="grey"), 
-	nticks=5, 
-	tickfont_color='grey',
-	zeroline=True, zerolinewidth=1, zerolinecolor='grey', fixedrange=True
-)
-
-# Figure 8 (scatter): Budget pub en fonction des Ventes
-city_color = (df['City'] == "San Francisco").map(lambda x: custom_blue if x else "grey")
-# plot
-sales_ads = go.Figure(
-	go.Scatter(
-		x=df["ads_budget"], 
-		y=df["Sales"],
-		mode="markers",
-		text = df['City'],
-		hovertemplate="<b>%{text}</b><br><b>%{y:.2s} $</b> de chiffres d'affaires<br><b>%{x:.2s} $</b>de budget publicitaire<extra></extra>"
-))
-# update
-sales_ads.update_traces(marker = dict(size=10, color = city_color))
-sales_ads.update_xaxes(
-	title = dict(text="Budget publicitaire ($)", font_color="grey"),
-	nticks = 5, 
-	tickfont_color = 'grey',
-	zeroline = False, 
-	fixedrange=True
-)
-sales_ads.update_yaxes(
-	title = dict(text="Volume de ventes ($)", font_color="grey"),
-	nticks = 5, 
-	tickfont_color = 'grey',
-	zeroline = False,
-	fixedrange=True
-)
-sales_ads.update_layout(
-	height =600,
-    hoverlabel = dict(bgcolor="white", font_size=14),
-    margin = margin,
-	annotations = [
-		dict(x=27.3e3,y=8e6,text='San Francisco', showarrow=False),
-		dict(x=11.8e3,y=5.7e6,text='Los Angeles', showarrow=False),
-		dict(x=8.2e3,y=4.9e6,text='New York', showarrow=False),
-		dict(x=5.6e3,y=3.9e6,text='Boston', showarrow=False),
-		dict(x=3.625e3,y=2.79e6,text='Atlanta', ax=30, ay=-20),
-		dict(x=3.064e3,y=2.76e6,text='Dallas', ax=0, ay=-40),
-		dict(x=2.77e3,y=2.74e6,text='Seattle', ax=-30, ay=-20),
-		dict(x=2.15e3,y=2.53e6,text='Portland', showarrow=False),
-		dict(x=1.32e3,y=2e6,text='Austin', showarrow=False)
-	]
-)
-
-## 3. ANALYSE TEMPORELLE
-## -----------------------
-sales_per_month = data.groupby(['Month_num', 'Month'])['Sales'].sum().reset_index()
-
-## Figure 9 (line): chiffre d'affaires mensuel
-# plot
-ca_per_month = go.Figure(
-	go.Scatter(
-		x = sales_per_month["Month"],
-		y = sales_per_month["Sales"], 
-		fill = "tozeroy",
-		hovertemplate = "%{y:.2s} $ de CA<extra></extra>",
-		marker = dict(size=10, color=custom_blue, line=dict(width=0.5, color='black'))
+	# update
+	sales_income.update_layout(height = 600, hoverlabel=dict(bgcolor="white", font_size=14),margin=margin)
+	sales_income.add_annotation(
+		text = correlation_text(factors, 'income_2010'),
+		align = "left",
+		xref = "paper", x=0.01, xanchor="left",
+		yref = "paper", y=0.99,
+		showarrow = False,
+		font = dict(color="#6c757d", size=13))
+	sales_income.update_traces(textposition = 'top center', marker = dict(size=10,color = "grey"))
+	sales_income.update_xaxes(
+		title=dict(text="Salaire moyen annuel net ($)", font_color="grey"), 
+		nticks=5, 
+		tickfont_color='grey',
+		zeroline=True, zerolinewidth=1, zerolinecolor='grey', fixedrange=True
 	)
-)
-# update
-ca_per_month.update_xaxes(showgrid=False, tickfont_color='grey', range=[0,11.1], fixedrange=True)
-ca_per_month.update_yaxes(
-	title = dict(
-		text = "Chiffre d'Affaires mensuelle ($)",font_color="grey"),
-		nticks = 3, 
-		tickfont_color = 'grey', 
+	sales_income.update_yaxes(
+		title=dict(text="Volume de ventes($)", font_color="grey"), 
+		nticks=5, 
+		tickfont_color='grey',
+		zeroline=True, zerolinewidth=1, zerolinecolor='grey', fixedrange=True
+	)
+
+	# Figure 8 (scatter): Budget pub en fonction des Ventes
+	# the best city is the reference of the report
+	city_color = threshold_colors(df['Sales'], df['Sales'].max(), custom_blue, "grey")
+	offsets = label_offsets(df["ads_budget"])
+	# plot
+	sales_ads = go.Figure(
+		go.Scatter(
+			x=df["ads_budget"], 
+			y=df["Sales"],
+			mode="markers",
+			text = df['City'],
+			hovertemplate="<b>%{text}</b><br><b>%{y:.2s} $</b> de chiffres d'affaires<br><b>%{x:.2s} $</b>de budget publicitaire<extra></extra>"
+	))
+	# update
+	sales_ads.update_traces(marker = dict(size=10, color = city_color))
+	sales_ads.update_xaxes(
+		title = dict(text="Budget publicitaire ($)", font_color="grey"),
+		nticks = 5, 
+		tickfont_color = 'grey',
+		zeroline = False, 
 		fixedrange=True
-)
-ca_per_month.update_layout(
-	height = 600,
-    margin = margin,
-    hoverlabel = dict(bgcolor="white",font_size=14), 
-    hovermode = 'x unified',
-    shapes=[
-        dict(type="rect", xref="x", x0=5, x1=8, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0),
-        dict(type="rect", xref="x", x0=0, x1=2, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0)
-    ],
-	annotations = [
-		dict(text = '<b>Vacances Scolaires</b><br>Période creuse', align = "left", x=6.5, y=3.5e6, font = dict(size=14), showarrow=False),
-		dict(text = '<b>Après Fêtes</b><br>Période creuse', align = "left", x=1, y=3.5e6, font = dict(size=14), showarrow=False),
-		dict(x=11, y=4.62e6, ay=0, ax=-50,font=dict(size=14), text="<b>Fêtes<b>")
-	])
+	)
+	sales_ads.update_yaxes(
+		title = dict(text="Volume de ventes ($)", font_color="grey"),
+		nticks = 5, 
+		tickfont_color = 'grey',
+		zeroline = False,
+		fixedrange=True
+	)
+	sales_ads.update_layout(
+		height =600,
+	    hoverlabel = dict(bgcolor="white", font_size=14),
+	    margin = margin,
+		# crowded cities get an arrow, the others their name above the point
+		annotations = [
+			dict(x=x, y=y, text=city, showarrow=False, yshift=15) if offset is None else dict(x=x, y=y, text=city, ax=offset[0], ay=offset[1])
+			for x, y, city, offset in zip(df["ads_budget"], df["Sales"], df["City"], offsets)
+		] + [
+			dict(
+				text = correlation_text(factors, 'ads_budget'),
+				align = "left",
+				xref = "paper", x=0.99, xanchor="right",
+				yref = "paper", y=0.01, yanchor="bottom",
+				showarrow = False,
+				font = dict(color="#6c757d", size=13))
+		]
+	)
+	# saturating fit, when it explains the sales better than a straight line
+	ads = factors.loc['ads_budget']
+	if ads['fit_r2'] > ads['linear_r2']:
+		x, y = fit_curve(factors, 'ads_budget', df["ads_budget"])
+		sales_ads.add_trace(go.Scatter(x=x, y=y, mode="lines", line=dict(color="grey", dash="dot", width=1), hoverinfo="skip"))
+		if ads['saturation'] < df["ads_budget"].max():
+			sales_ads.add_shape(type="line", xref="x", x0=ads['saturation'], x1=ads['saturation'], yref="paper", y0=0, y1=1,
+				line=dict(color="grey", dash="dash", width=1), layer="below")
+			sales_ads.add_annotation(
+				text = f"saturation à partir de <b>{millify(ads['saturation'])} $</b>",
+				xref = "x", x=ads['saturation'], xanchor="left",
+				yref = "paper", y=0.95,
+				showarrow = False,
+				font = dict(color="#6c757d", size=13))
 
+	## 3. ANALYSE TEMPORELLE
+	## -----------------------
+	# one point per month of each year, named with its year when the report covers several years
+	sales_per_month = orders.sum_by('periods', ['Period', 'Month_num', 'Month'])['Sales'].reset_index()
+	years = sales_per_month['Period'].str[:4]
+	months = sales_per_month['Month'].astype(str)
+	sales_per_month['label'] = months + ' ' + years if years.nunique() > 1 else months
 
-## Figure 10 (line): heures d'achats des produits
-buying_hours = data.groupby('Hour').sum()['Quantity Ordered']
-# plot
-sales_per_hour = go.Figure(
-	go.Scatter(
-		x = buying_hours.index,
-		y = buying_hours,
-		fill="tozeroy",
-		hovertemplate ='<b>%{x}</b><br>%{y:.0f} commandes<extra></extra>',
-		mode='markers+lines',
-		marker_color=custom_blue,			
+	## Figure 9 (line): chiffre d'affaires mensuel
+	# quiet periods shaded, the holidays pointed at
+	quiet = [
+		(first, last, text)
+		for text, quiet_months in quiet_periods.items()
+		for first, last in month_spans(sales_per_month['Month_num'], quiet_months)]
+	holidays = sales_per_month[sales_per_month['Month_num'] == 12]
+	# plot
+	ca_per_month = go.Figure(
+		go.Scatter(
+			x = sales_per_month["label"],
+			y = sales_per_month["Sales"], 
+			fill = "tozeroy",
+			hovertemplate = "%{y:.2s} $ de CA<extra></extra>",
+			marker = dict(size=10, color=custom_blue, line=dict(width=0.5, color='black'))
+		)
+	)
+	# update
+	ca_per_month.update_xaxes(showgrid=False, tickfont_color='grey', range=[0, len(sales_per_month) - 0.9], fixedrange=True)
+	ca_per_month.update_yaxes(
+		title = dict(
+			text = "Chiffre d'Affaires mensuelle ($)",font_color="grey"),
+			nticks = 3, 
+			tickfont_color = 'grey', 
+			fixedrange=True
 	)
-)
-# update
-sales_per_hour.update_yaxes( title=dict(text="Nombre de commande", font_color="grey"), showticklabels=False, showgrid=False, fixedrange=True)
-sales_per_hour.update_xaxes(tickfont_color="grey", ticksuffix="h", showgrid=False, zeroline=False, fixedrange=True)
-sales_per_hour.update_layout(
-	height = 600, 
-    margin = margin,
-    hoverlabel = dict(bgcolor="white",font_size=14), 
-	hovermode = 'x',
-    shapes = [
-        dict(type="rect", xref="x", x0=0, x1=7, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0),
-        dict(type="rect", xref="x", x0=21, x1=23, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0)
-    ],
-	annotations = [
-		dict(x=3, y=7.5e3, text='<b>Nuit,</b><br> période creuse', font=dict(size=14), showarrow=False),
-		dict(x=12, y=14202, ax=0, text='<b>12h</b> pause déjeuner ', font=dict(size=14)),
-		dict(x=19, y=14470, ax=0, text='<b>19h</b> temps libre', font=dict(size=14)),
-
-	]
-)
+	ca_per_month.update_layout(
+		height = 600,
+	    margin = margin,
+	    hoverlabel = dict(bgcolor="white",font_size=14), 
+	    hovermode = 'x unified',
+	    shapes=[
+	        dict(type="rect", xref="x", x0=first, x1=last, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0)
+	        for first, last, text in quiet
+	    ],
+		annotations = [
+			dict(text = text, align = "left", x=(first + last) / 2, yref="paper", y=0.75, font = dict(size=14), showarrow=False)
+			for first, last, text in quiet
+		] + [
+			dict(x=position, y=sales, ay=0, ax=-50, font=dict(size=14), text="<b>Fêtes</b>")
+			for position, sales in zip(holidays.index, holidays["Sales"])
+		])
+
+
+	## Figure 10 (line): heures d'achats des produits
+	buying_hours = activity.select(by=['Hour'])
+	# plot
+	sales_per_hour = go.Figure(
+		go.Scatter(
+			x = buying_hours.index,
+			y = buying_hours,
+			fill="tozeroy",
+			hovertemplate ='<b>%{x}</b><br>%{y:.0f} commandes<extra></extra>',
+			mode='markers+lines',
+			marker_color=custom_blue,			
+		)
+	)
+	# update
+	sales_per_hour.update_yaxes( title=dict(text="Nombre de commande", font_color="grey"), showticklabels=False, showgrid=False, fixedrange=True)
+	sales_per_hour.update_xaxes(tickfont_color="grey", ticksuffix="h", showgrid=False, zeroline=False, fixedrange=True)
+	sales_per_hour.update_layout(
+		height = 600, 
+	    margin = margin,
+	    hoverlabel = dict(bgcolor="white",font_size=14), 
+		hovermode = 'x',
+	    shapes = [
+	        dict(type="rect", xref="x", x0=0, x1=7, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0),
+	        dict(type="rect", xref="x", x0=21, x1=23, yref="paper", y0=0, y1=1, fillcolor="grey", opacity=0.2, layer="below", line_width=0)
+	    ],
+		annotations = [
+			dict(x=3, yref="paper", y=0.5, text='<b>Nuit,</b><br> période creuse', font=dict(size=14), showarrow=False),
+			dict(x=12, y=buying_hours.get(12, 0), ax=0, text='<b>12h</b> pause déjeuner ', font=dict(size=14)),
+			dict(x=19, y=buying_hours.get(19, 0), ax=0, text='<b>19h</b> temps libre', font=dict(size=14)),
+
+		]
+	)
+
+	## Figure 11 (heatmap): commandes par jour de la semaine et par heure
+	weekday_hour = activity.select(by=['Weekday', 'Hour'])
+	activity_week = go.Figure(
+		go.Heatmap(
+			z = weekday_hour.to_numpy(),
+			x = weekday_hour.columns,
+			y = weekdays,
+			colorscale = [[0, "white"], [1, custom_blue]],
+			xgap = 1, ygap = 1,
+			showscale = False,
+			hovertemplate = "<b>%{y} %{x}h</b><br>%{z:.0f} commandes<extra></extra>"))
+	activity_week.update_layout(height = 400, margin = margin)
+	activity_week.update_xaxes(tickfont_color="grey", ticksuffix="h", fixedrange=True)
+	activity_week.update_yaxes(tickfont_color="grey", autorange="reversed", fixedrange=True)
+
+	## Figure 12 (heatmap): part des commandes de chaque ville par heure
+	city_hour = activity.select(by=['City', 'Hour']).sort_index()
+	with np.errstate(divide='ignore', invalid='ignore'):
+		city_share = city_hour.to_numpy() / city_hour.to_numpy().sum(axis=1, keepdims=True)
+	activity_city = go.Figure(
+		go.Heatmap(
+			z = city_share,
+			x = city_hour.columns,
+			y = city_hour.index,
+			colorscale = [[0, "white"], [1, custom_blue]],
+			xgap = 1, ygap = 1,
+			showscale = False,
+			hovertemplate = "<b>%{y} %{x}h</b><br>%{z:.1%} des commandes de la ville<extra></extra>"))
+	activity_city.update_layout(height = 400, margin = margin)
+	activity_city.update_xaxes(tickfont_color="grey", ticksuffix="h", fixedrange=True)
+	activity_city.update_yaxes(tickfont_color="grey", fixedrange=True)
+
+	# the figures are converted to json native dicts once, not at each page load
+	figures = dict(
+		parcats=parcats,
+		product_bar=product_bar,
+		scatter_plot_product=scatter_plot_product,
+		low_cost_viz=low_cost_viz,
+		high_cost_viz=high_cost_viz,
+		map_plot=map_plot,
+		city_rank=city_rank,
+		sales_income=sales_income,
+		sales_ads=sales_ads,
+		ca_per_month=ca_per_month,
+		sales_per_hour=sales_per_hour,
+		activity_week=activity_week,
+		activity_city=activity_city)
+	return {name: prepare_figure(figure) for name, figure in figures.items()}
+
 
 '''------------------------------------------------------------------------------------------- 
                                             DASH LAYOUT
@@ -510,27 +811,51 @@ def title(title, subtitle, color=None, subsize=None) :
 	), 
 	return title[0]
 
-app.layout = dbc.Container([
-	html.Div(children=[
+@memoize(layout_cache)
+def build_layout(dataset=default_dataset, period=None, cities=()):
+	raw_data = load_dataset(dataset)['raw_data']
+	report = select_report(dataset, period, cities)
+	label = report['label']
+	factors = analyse_factors(report['city_info'])
+	figures = create_figures(**report, factors=factors)
+	# the texts quote the ranking of figures 2 and 4
+	product_report = report['orders'].sum_by('products', ['Cat', 'Product', 'Price Each'])
+	ranking = rank_products(product_report)
+	low_cost = product_shares(product_report, ranking.bottom.index)
+	high_priced = product_shares(product_report, ranking.top.index)
+	n_products = product_report.index.get_level_values('Product').nunique()
+	n_categories = product_report.index.get_level_values('Cat').nunique()
+	# and the cities of figures 6 and 7, from the sales of the report
+	city_info = report['city_info'].sort_values('Sales', ascending=False).reset_index(drop=True)
+	best_city = city_info['City'].iloc[0]
+	richest = city_info.loc[city_info['income_2010'].idxmax()]
+	richest_rank = f"{richest.name + 1}e" if richest.name else "1re"
+	n_cities = len(city_info)
+	cities_text = f"{n_cities} villes américaines, dont {enumeration(city_info['City'][:3], 'ou encore')}..." if n_cities > 1 else f"une ville américaine, {best_city}."
+	# what the orders of the report cover
+	covered = period or orders_period(report['orders'])
+	scope = period_text(covered) + (f" à {enumeration(cities)}" if cities else "")
+	return dbc.Container([
+		html.Div(children=[
 	
-		dcc.Markdown('''
+			dcc.Markdown('''
 			# Analyse stratégique d'une entreprise en ligne d'électronique 
 			---
 			Dans le présent rapport, nous allons démontrer que la transformation de données brutes en informations 
 			exploitables facilite la prise de décisions stratégiques.''', className="mt-5 mb-3"),
-		dcc.Markdown('''
+			dcc.Markdown(f'''
 			## Introduction et présentation des données
 			Les données utilisées représentent les ventes de produits électroniques réalisées par un commerce en ligne 
-			fictif durant l’année 2019. (Voir le tableau 1)'''),
-		dbc.Table.from_dataframe(raw_data[:4], striped=True, bordered=False, borderless=True, hover=True, responsive=True, className="mt-3"),
-		dcc.Markdown("**Tableau 1**: présentation du jeu de données", className="text-muted mb-3"),
-		dcc.Markdown('''
+			fictif durant {scope}. (Voir le tableau 1)'''),
+			dbc.Table.from_dataframe(raw_data[:4], striped=True, bordered=False, borderless=True, hover=True, responsive=True, className="mt-3"),
+			dcc.Markdown("**Tableau 1**: présentation du jeu de données", className="text-muted mb-3"),
+			dcc.Markdown('''
 			Pour chaque commande un ensemble d'informations est collecté sur le client. Par exemple, la première ligne du tableau 
 			N° 1 nous indique que le client répertorié par l'ID **295667** a acheté un **Chargeur USB-C** à **11.95$** le **12 décembre 
 			2019 à 18:21**, et son adresse de livraison était le **277 Main St, New York City, NY 10001**. 
 			La liste ci-dessous résume les données collectées lors d'une commande.'''),
-		dbc.Alert(
-			dcc.Markdown('''
+			dbc.Alert(
+				dcc.Markdown('''
 				##### Descriptif des informations récoltées lors d'une commandes
 				---
 				- **ID**, numéro de commande unique
@@ -539,8 +864,8 @@ app.layout = dbc.Container([
 				- **Prix**, prix unitaire de chaque produit en $
 				- **Date**, date et heure de l'achat
 				- **Adresse**, adresse de livraison'''),
-			color='secondary'),
-        dcc.Markdown('''
+				color='secondary'),
+	        dcc.Markdown('''
 			Dans les sections suivantes, nous allons transformer cette masse de données en un ensemble d’informations pertinentes. 
 			Elles seront ensuite couplées à des éléments provenant de l'écosystème de l'entreprise afin d’élaborer des choix stratégiques 
 			réfléchis. La suite du présent rapport se divise en trois parties :  
@@ -550,8 +875,8 @@ app.layout = dbc.Container([
 			3. **Saisonnalité et horaires**, nous analyserons les tendances d'achat des clients afin d'y déterminer les périodes creuses et les 
 			périodes de forte affluence'''),
 
-		## 1. POSITIONNEMENT DE L'ENTREPRISE
-		dcc.Markdown('''
+			## 1. POSITIONNEMENT DE L'ENTREPRISE
+			dcc.Markdown(f'''
 			## 1. POSITIONNEMENT DE L'ENTREPRISE
 			---
 			Après une rapide présentation des produits vendus et du secteur d’activité, nous découvrirons que les produits *low cost* ont un faible intérêt 
@@ -562,45 +887,45 @@ app.layout = dbc.Container([
 			électroniques**. Il s’agit d’un secteur d’activité dynamique. Ce facteur est important pour la croissance future de l’entreprise car cela 
 			lui permet de se développer sans recourir à une baisse des prix. 
 
-			Cette société vend 19 produits différents regroupés en 5 catégories. On compte dans les produits vendus 2 modèles d’ordinateurs, 7 types 
-			d’accessoires, 3 modèles de téléphones, 4 modèles d’écrans et 2 modèles de machines à laver. (Voir la figure 1)''', className="my-5"),
+			Cette société vend {n_products} produits différents regroupés en {n_categories} catégories. On compte dans les produits vendus 
+			{catalog_text(product_report)}. (Voir la figure 1)''', className="my-5"),
 
-		# Figure 1 (parcast): 5 catégories de 19 produits
-		title("5 catégories de 19 produits", "avec les produits classés par prix décroissant"),
-		dcc.Graph(figure=parcats, config=config_dash),
-		dcc.Markdown("**Figure 1**: découverte des produits", className="text-muted mb-5"),
-		dcc.Markdown('''
+			# Figure 1 (parcast): catégories et produits
+			title(f"{n_categories} catégories de {n_products} produits", "avec les produits classés par prix décroissant"),
+			dcc.Graph(figure=figures['parcats'], config=config_dash),
+			dcc.Markdown("**Figure 1**: découverte des produits", className="text-muted mb-5"),
+			dcc.Markdown('''
 			**Elle se positionne comme un vendeur généraliste** proposant des produits allant du low cost (vente d’accessoires) au haut de gamme 
 			(produits tels que le MacBook Pro)
 
 			Il est important de faire la distinction entre les produits haut de gamme, ciblant les consommateurs aux revenus élevés et 
 			les produits *high priced*, une sous catégorie créée par nos soins afin de distinguer les produits du catalogue avec un prix élevé.'''),
-		dcc.Markdown('''
+			dcc.Markdown(f'''
 			### Analyse des ventes
-			En analysant les ventes de l’année 2019, nous observons que les produits n’ont pas tous la même influence sur le chiffre d’affaires : 
-			59% des bénéfices sont réalisés par seulement 4 de nos 19 produits. De l’autre côté du classement, les 5 produits les moins profitables 
-			représentent moins de 3.1% des bénéfices. (Voir la figure 2)''', 
-			className='my-5'), 
-
-		# Figure 2 (horizontal plot): classement des produits
-		title("Classement des produits","selon leur importance pour le chiffre d'affaire"),
-		dcc.Graph(figure=product_bar, config=config_dash),
-		dcc.Markdown("**Figure 2**: Classement des produits", className="text-muted"),
-		dcc.Markdown("""
+			En analysant les ventes de {period_text(covered)}, nous observons que les produits n’ont pas tous la même influence sur le chiffre d’affaires : 
+			{percent_labels(ranking.top_share)} des bénéfices sont réalisés par seulement {len(ranking.top)} de nos {ranking.size} produits. De l’autre côté du classement, les {len(ranking.bottom)} produits les moins profitables 
+			représentent {percent_labels(ranking.bottom_share, decimals=1)} des bénéfices. (Voir la figure 2)''', 
+				className='my-5'), 
+
+			# Figure 2 (horizontal plot): classement des produits
+			title("Classement des produits","selon leur importance pour le chiffre d'affaire"),
+			dcc.Graph(figure=figures['product_bar'], config=config_dash),
+			dcc.Markdown("**Figure 2**: Classement des produits", className="text-muted"),
+			dcc.Markdown(f"""
 			On remarque une forte variation de l’importance de certaines marchandises sur le chiffre d’affaires. En effet, les produits *high priced*
 			occupent une part plus importante que les produits d’entrée de gamme qui n’ont que très peu d’impact sur le CA.
 
-			Continuons notre analyse en examinant la corrélation entre le prix de vente d'un produit et son chiffre d’affaires en 2019. (Voir la figure 3)""",
-			className="my-5"),
+			Continuons notre analyse en examinant la corrélation entre le prix de vente d'un produit et son chiffre d’affaires en {label}. (Voir la figure 3)""",
+				className="my-5"),
 
-		# Figure 3 (scatter): relation prix volume de ventes
-		title("Volume de ventes des produits selon leur prix","la superficie des bulles correspond au nombre de ventes"),
-		dcc.Graph(figure=scatter_plot_product, config=config_dash),
-		dcc.Markdown("**Figure 3**: relation entre le prix et le volume des ventes", className="text-muted mb-5"),
-		dcc.Markdown('''
+			# Figure 3 (scatter): relation prix volume de ventes
+			title("Volume de ventes des produits selon leur prix","la superficie des bulles correspond au nombre de ventes"),
+			dcc.Graph(figure=figures['scatter_plot_product'], config=config_dash),
+			dcc.Markdown("**Figure 3**: relation entre le prix et le volume des ventes", className="text-muted mb-5"),
+			dcc.Markdown(f'''
 			Des tendances intéressantes ressortent de ce graphique :
-			- **Les produits avec un prix élevé ont tendance à avoir un volume de ventes important**. La bulle bleue en haut à droite de la figure 3 correspond 
-			au Macbook Pro, un ordinateur haut de gamme dont la profitabilité est la plus élevée parmi tous les produits du catalogue. De l’autre côté de la 
+			- **Les produits avec un prix élevé ont tendance à avoir un volume de ventes important**. La bulle bleue la plus haute de la figure 3 correspond
+			au {ranking.top.index[0]}, un produit haut de gamme dont la profitabilité est la plus élevée parmi tous les produits du catalogue. De l’autre côté de la 
 			figure, le groupe de bulles orange correspond aux accessoires low cost dont le prix est bas et dont les bénéfices sont réduits. 
 
 			- **La catégorie des machines à laver ramène peu de bénéfices**. S'agissant de produits lourds et volumineux, leur livraison est délicate. Ainsi, 
@@ -616,38 +941,39 @@ app.layout = dbc.Container([
 
 			Comparons le nombre de ventes et l’influence sur le chiffre d’affaires pour les produits low cost et *high priced*. 
 			(Voir la figure 4)''',
-			className="my-5"),
-
-		# Figure 4 : Comparaison high priced low cost
-		dbc.Row([
-			dbc.Col(title("Accessoires low cost","Casque sans file, Chargeur USB-C, Chargeur lumineux, Piles AA & AAA", 
-				color={"color":custom_orange}, subsize={"font-size":"0.8rem"}
-			)),
-			dbc.Col(title("Produits high priced", "Macbook Pro, iPhone XR, Samsung Galaxy n10, Dell XPS 13", 
-				color={"color":custom_blue}, subsize={"font-size":"0.8rem"}
-			)),
-		]),
-		dbc.Row([
-			dbc.Col(dcc.Graph(figure=low_cost_viz, config=config_dash)),
-			dbc.Col(dcc.Graph(figure=high_cost_viz, config=config_dash))
-		]),	
-		dcc.Markdown("**Figure 4**: Comparaison du chiffre d'affaire et du nombre de ventes des produits high priced et low cost", className="text-muted mb-5"),
-		dcc.Markdown("""
+				className="my-5"),
+
+			# Figure 4 : Comparaison high priced low cost
+			dbc.Row([
+				dbc.Col(title("Accessoires low cost", ", ".join(ranking.bottom.index), 
+					color={"color":custom_orange}, subsize={"font-size":"0.8rem"}
+				)),
+				dbc.Col(title("Produits high priced", ", ".join(ranking.top.index), 
+					color={"color":custom_blue}, subsize={"font-size":"0.8rem"}
+				)),
+			]),
+			dbc.Row([
+				dbc.Col(dcc.Graph(figure=figures['low_cost_viz'], config=config_dash)),
+				dbc.Col(dcc.Graph(figure=figures['high_cost_viz'], config=config_dash))
+			]),	
+			dcc.Markdown("**Figure 4**: Comparaison du chiffre d'affaire et du nombre de ventes des produits high priced et low cost", className="text-muted mb-5"),
+			dcc.Markdown(f"""
 			Deux informations sont à retenir de cette figure :
-			- **Les produits *high priced* sont très intéressants**. Très importants pour le chiffre d’affaires (58%), le temps alloué à la préparation des 
-			commandes de ces produits reste relativement bas, environ 10%. Il s’agit de produits nécessitant peu de main d’œuvre et dont la profitabilité 
+			- **Les produits *high priced* sont très intéressants**. Très importants pour le chiffre d’affaires ({percent_labels(high_priced['Sales'])}), le temps alloué à la préparation des 
+			commandes de ces produits reste relativement bas, environ {percent_labels(high_priced['Quantity Ordered'])}. Il s’agit de produits nécessitant peu de main d’œuvre et dont la profitabilité 
 			est élevée. Diversifier le catalogue des produits *high priced* en 2020 semblerait intéressant.
 
-			- **Les accessoires low-cost ont peu d'intérêt**. Les chiffres parlent d’eux-mêmes, 60% des ventes ne représentent que 3% du chiffre d’affaires. Ces 
+			- **Les accessoires low-cost ont peu d'intérêt**. Les chiffres parlent d’eux-mêmes, {percent_labels(low_cost['Quantity Ordered'])} des ventes ne représentent que {percent_labels(low_cost['Sales'], decimals=1)} du chiffre d’affaires. Ces 
 			produits représentent un temps de travail considérable en termes de préparation de commandes, mais ne génèrent que peu de bénéfices. Leur 
-			renouvellement dans le catalogue de 2020 est discutable. 
-
-			Néanmoins, il est important de vérifier la proportion de commandes composées de plus de deux produits. En effet, 
-			si le nombre de produits achetés par commande est élevé, il est probable qu’une partie des clients venus acheter un accessoire finissent 
-			par repartir avec d’autres produits. Dans ce cas, arrêter la vente d'accessoires low-cost en 2020 pourrait impacter les ventes des autres 
+			renouvellement dans le catalogue de 2020 est discutable."""),
+			# the orders are summed without their ID: this share was measured once, on every order of 2019
+			*([] if covered != default_label or cities else [dcc.Markdown("""
+			Néanmoins, il est important de vérifier la proportion de commandes composées de plus de deux produits. En effet,
+			si le nombre de produits achetés par commande est élevé, il est probable qu’une partie des clients venus acheter un accessoire finissent
+			par repartir avec d’autres produits. Dans ce cas, arrêter la vente d'accessoires low-cost en 2020 pourrait impacter les ventes des autres
 			catégories. **Pour cette étude seulement 2.7% des commandes sont composées de plusieurs produits dont au moins un acccessoire. Ainsi
-			la vente d'accessoires low-cost impacte légèrement les ventes des autres catégories**."""), 
-		dcc.Markdown("""
+			la vente d'accessoires low-cost impacte légèrement les ventes des autres catégories**.""")]), 
+			dcc.Markdown("""
 			### Analyse de l'environnement
 			L’analyse de l’environnement confirme la validité de notre proposition de réorienter l’offre. **Le secteur du commerce en ligne d’accessoires fait face 
 			à une forte concurrence** avec le développement du dropshipping, non négligeable dans le segment des accessoires, et l’arrivée d’acteurs comme Alibaba 
@@ -661,50 +987,50 @@ app.layout = dbc.Container([
 
 			Concernant la vente de machine à laver, il peut être intéressant de considérer une stratégie de sortie progressive, compte tenu de la 
 			faible dynamique de ce secteur sur le moyen et long terme.""", 
-			className="mt-5"),
-		dbc.Alert(
-			dcc.Markdown('''
+				className="mt-5"),
+			dbc.Alert(
+				dcc.Markdown(f'''
 				### Recommandation stratégique
 				---
-				En analysant les ventes de 2019 ainsi que l’environnement macroéconomique on voit qu’il est beaucoup plus rentable de s’orienter vers des produits 
+				En analysant les ventes de {label} ainsi que l’environnement macroéconomique on voit qu’il est beaucoup plus rentable de s’orienter vers des produits 
 				haut de gamme et d’abandonner les produits low cost. Voici nos trois recommandations afin de changer de positionnement :
 				
 				- **Arrêter la vente de produits low-cost**. Soumis à une forte concurrence, ces produits représentent un temps de travail considérable en termes de 
-				préparation de commandes pour une profitabilité faible (60% des ventes pour seulement 3.1% du chiffre d’affaires en 2019). Leur suppression du 
+				préparation de commandes pour une profitabilité faible ({percent_labels(low_cost['Quantity Ordered'])} des ventes pour seulement {percent_labels(low_cost['Sales'], decimals=1)} du chiffre d’affaires en {label}). Leur suppression du 
 				catalogue permettrait également de réduire les coûts logistiques. 
 				
 				- **Diversifier la vente des produits haut de gamme**. Avec des marges plus importantes et une concurrence moindre, ces produits nécessitent peu de 
-				temps de travail pour une rentabilité élevée (seulement 10% des ventes pour un total de 58% du chiffre d’affaires en 2019).
+				temps de travail pour une rentabilité élevée (seulement {percent_labels(high_priced['Quantity Ordered'])} des ventes pour un total de {percent_labels(high_priced['Sales'])} du chiffre d’affaires en {label}).
 
 				- **Arrêter la vente de machines à laver**. Ce sont des produits avec une faible influence sur le chiffre d’affaires. Leur livraison est en outre 
 				complexe en raison du poids et de la taille des produits.
 
 				L’objectif visé par la recomposition de l’offre est de changer de groupe stratégique en passant du statut de vendeur généraliste au statut 
 				de vendeur de produits électroniques haut de gamme.'''),
-			color='secondary', className="my-5"),
-		# 2. CIBLAGE MARKETING
-		dcc.Markdown('''
+				color='secondary', className="my-5"),
+			# 2. CIBLAGE MARKETING
+			dcc.Markdown(f'''
 			## 2. CIBLAGE MARKETING
 			---
-			Le service de livraison de ce commerce en ligne est disponible dans 9 villes américaines, dont New York, Los Angeles ou encore San Francisco... 
-			A l'aide des figures ci-dessous, on observe que San Francisco est la ville qui a réalisé le plus important volume de ventes en 2019.'''),
-		# Figure 5 (map): carte des lieux de ventes
-		dcc.Graph(figure=map_plot, config={**config_dash, **{'staticPlot': True}}),
-		dcc.Markdown("**Figure 5**: cartographie des lieux de vente", className="text-muted mb-5"),
-		# Figure 6 (horizontal bar): classement des lieux de ventes
-		title("Classement des villes","selon leur importance pour le chiffre d'affaire en 2019"),
-		dcc.Graph(figure=city_rank, config=config_dash),
-    	dcc.Markdown("**Figure 6**: classement des villes selon leur volume de ventes", className="text-muted"),
-		dcc.Markdown('''
-			Maintenant que nous savons que San Francisco constitue le marché le plus lucratif, il nous faut en comprendre les raisons, afin d'améliorer notre 
+			Les ventes de ce rapport sont réalisées dans {cities_text}
+			A l'aide des figures ci-dessous, on observe que {best_city} est la ville qui a réalisé le plus important volume de ventes en {label}.'''),
+			# Figure 5 (map): carte des lieux de ventes
+			dcc.Graph(figure=figures['map_plot'], config={**config_dash, **{'staticPlot': True}}),
+			dcc.Markdown("**Figure 5**: cartographie des lieux de vente", className="text-muted mb-5"),
+			# Figure 6 (horizontal bar): classement des lieux de ventes
+			title("Classement des villes",f"selon leur importance pour le chiffre d'affaire en {label}"),
+			dcc.Graph(figure=figures['city_rank'], config=config_dash),
+	    	dcc.Markdown("**Figure 6**: classement des villes selon leur volume de ventes", className="text-muted"),
+			dcc.Markdown(f'''
+			Maintenant que nous savons que {best_city} constitue le marché le plus lucratif, il nous faut en comprendre les raisons, afin d'améliorer notre 
 			stratégie marketing. 
 
 			De manière générale, **comprendre les facteurs de réussite d'un lieu est un élément essentiel pour développer le chiffre d'affaires 
 			sur le long terme.** Cette compréhension est nécessaire pour cibler de nouveaux marchés ou pour adapter notre stratégie à des lieux avec 
 			un faible volume des ventes.''', 
-			className= "my-5"),
-		dcc.Markdown('''
-			#### **Qu’est ce qui fait de San Francisco une ville aussi performante ?**
+				className= "my-5"),
+			dcc.Markdown(f'''
+			#### **Qu’est ce qui fait de {best_city} une ville aussi performante ?**
 
 			Nous pouvons nous faire une idée des facteurs de réussite d’une ville en nous appuyant sur la corrélation entre notre indicateur de performance 
 			(le chiffre d’affaires annuel par ville) et des facteurs externes tels que le nombre d’habitants ou le taux de travailleurs dans le secteur 
@@ -719,77 +1045,121 @@ app.layout = dbc.Container([
 			pas des produits de première nécessité, de ce fait nous supposons que ce sont des biens recherchés par des personnes ayant un niveau de vie 
 			moyen ou élevé. Puisque le salaire moyen est un bon indicateur du niveau de vie, nous supposons qu’il existe une forte corrélation entre le 
 			salaire moyen au sein d’une ville et le volume de ventes qui y est réalisé. Cependant la figure 7 nous montre le contraire :''',
-			className="mb-5"),
-		# Figure 7 (scatter): relation volume de ventes salaire moyen
-		title("Aucune corrélation avec le salaire moyen","relation entre le volume des ventes et le salaire moyen"),
-		dcc.Graph(figure=sales_income, config=config_dash),	
-		dcc.Markdown("**Figure 7**: relation entre le salaire moyen et le volume de ventes", className="text-muted mt-4"),
-		dcc.Markdown('''
-			Par exemple, la ville de Seattle avec le salaire moyen le plus élevé de 39.3k $ compte parmi les villes avec le volume de ventes le plus bas, 
-			2.7 M $. Nous pouvons en tirer la conclusion que le salaire moyen constitue un mauvais indicateur pour évaluer le volume des ventes de cette 
+				className="mb-5"),
+			# Figure 7 (scatter): relation volume de ventes salaire moyen
+			title(f"{factors.loc['income_2010', 'strength']} avec le salaire moyen","relation entre le volume des ventes et le salaire moyen"),
+			dcc.Graph(figure=figures['sales_income'], config=config_dash),	
+			dcc.Markdown("**Figure 7**: relation entre le salaire moyen et le volume de ventes", className="text-muted mt-4"),
+			dcc.Markdown(f'''
+			Par exemple, la ville de {richest['City']} avec le salaire moyen le plus élevé de {millify(richest['income_2010'])} $ est classée
+			{richest_rank} sur {n_cities} en volume de ventes, {millify(richest['Sales'])} $. Nous pouvons en tirer la conclusion que le salaire moyen constitue un mauvais indicateur pour évaluer le volume des ventes de cette 
 			entreprise.
 
 			En s'appuyant sur la figure 8, nous constatons que le budget alloué à la publicité en 2019 par ville est étroitement lié au volume des ventes. 
 			Il semblerait que le volume des ventes augmente au fur et à mesure que les produits gagnent en visibilité. Nous remarquons cependant que les 
 			chiffres commencent à stagner lorsque le budget devient trop élevé.''', 
-			className="mt-5 mb-5"),
-		# Figure 8 (scatter): relation volume des ventes budget pub
-		title("Forte corrélation avec le budget publicitaire","relation entre le volume des ventes et le budget publicitaire"),
-		dcc.Graph(figure=sales_ads, config=config_dash),
-		dcc.Markdown("**Figure 8**: relation entre le volume de ventes et le budget publicitaire", className="text-muted mb-5 mt-3"),
-		dcc.Markdown('''
+				className="mt-5 mb-5"),
+			# Figure 8 (scatter): relation volume des ventes budget pub
+			title(f"{factors.loc['ads_budget', 'strength']} avec le budget publicitaire","relation entre le volume des ventes et le budget publicitaire"),
+			dcc.Graph(figure=figures['sales_ads'], config=config_dash),
+			dcc.Markdown("**Figure 8**: relation entre le volume de ventes et le budget publicitaire", className="text-muted mb-5 mt-3"),
+			dcc.Markdown(f'''
 			Augmenter la visibilité de nos produits à l'aide de campagnes publicitaires paraît comme une solution intéressante pour augmenter les ventes. 
 			En effet, une augmentation des dépenses de quelques milliers de dollars permettrait d’amener plusieurs millions supplémentaires en chiffre d’affaires. 
 			Il est donc extrêmement intéressant d’augmenter les charges publicitaires en ciblant les villes se trouvant sous un certain seuil de profitabilité. 
 			A travers ce ciblage publicitaire, l’enjeu va être de se développer au niveau régional afin de devenir un acteur plus important et d’installer 
 			progressivement une image de marque attrayante, de consolider la clientèle.
 
-			Pour mesurer l’efficacité de notre stratégie publicitaire, il est important de déterminer nos objectifs. Pour cela, nous allons utiliser San Francisco 
+			Pour mesurer l’efficacité de notre stratégie publicitaire, il est important de déterminer nos objectifs. Pour cela, nous allons utiliser {best_city}
 			comme ville de référence afin de mesurer l’évolution des ventes dans les villes cibles. L’utilisation d’une ville de référence pour définir un objectif 
 			de développement permet de mesurer efficacement le retour sur investissement qu’apporte la publicité dans nos villes cibles.'''),
-		dbc.Alert(
-			dcc.Markdown('''
+			dbc.Alert(
+				dcc.Markdown('''
 				### Recommandation stratégique
 				---
 				**Augmenter les dépenses publicitaires dans les zones ayant un faible volume de ventes** afin d’amener plus de rentabilité 
 				et de se positionner comme un acteur régional dans le secteur d'activité'''),
-			color='secondary', className="my-5"),
-		# 3. SAISONNALITÉ ET HORAIRES
-		dcc.Markdown('''
+				color='secondary', className="my-5"),
+			# 3. SAISONNALITÉ ET HORAIRES
+			dcc.Markdown(f'''
 			## 3. SAISONNALITÉ ET HORAIRES
 			---
-			**Une meilleure compréhension de l'évolution mensuelle du chiffre d'affaire durant l'année 2019 nous serait utile pour une meilleure gestion 
+			**Une meilleure compréhension de l'évolution mensuelle du chiffre d'affaire durant {period_text(covered)} nous serait utile pour une meilleure gestion 
 			du stock**. La figure 9 souligne la présence d'un pic des ventes en décembre. Durant cette période de fêtes, le chiffre d'affaires atteint un 
 			maximum parce que beaucoup de produits électroniques sont achetés en guise de cadeau. Nous remarquons aussi deux périodes creuses durant l'année. 
 			La première est située après les fêtes de fin d'année. En effet, les gens ont tendance à économiser pendant les premiers mois de l'année afin de 
 			pallier les dépenses de fin d'années. La deuxième a lieu pendant la période des vacances scolaires. Durant cet intervalle, la plupart des dépenses 
 			sont utilisées pour les vacances et les frais dans les autres secteurs sont réduits.''',
-			className="mb-5"),
-		# Figure 9 (line): evolution du ca mensuelle
-		title("Evolution temporelle du volume des ventes","regroupement mensuel pour l’année 2019"),
-		dcc.Graph(figure=ca_per_month, config=config_dash),
-		dcc.Markdown("**Figure 9**: évolution du chiffre d'affaires durant l'année 2019", className="text-muted mt-3"),
-		dcc.Markdown('''
+				className="mb-5"),
+			# Figure 9 (line): evolution du ca mensuelle
+			title("Evolution temporelle du volume des ventes",f"regroupement mensuel pour {label}"),
+			dcc.Graph(figure=figures['ca_per_month'], config=config_dash),
+			dcc.Markdown(f"**Figure 9**: évolution du chiffre d'affaires, {label}", className="text-muted mt-3"),
+			dcc.Markdown('''
 			Afin d'avoir du stock disponible toute l'année, il faut prévoir un nombre de produits plus important pour la période de Noël.
 			
 			En étudiant l'heure d'achat de nos produits à l'aide de la figure 11, nous constatons que nos clients ont tendance à passer une 
 			commande pendant la pause déjeuner et leur temps libre avant le dîner. On en déduit que le meilleur moment pour afficher de la publicité est 
 			à 12h et à 19h.''',
-			className="my-5"),
-		# Figure 10 (line): Ventes par heure
-		title("Heures d'achat des produits","regroupement horraire pour l’année 2019"),
-		dcc.Graph(figure=sales_per_hour, config=config_dash),
-		dcc.Markdown ("**Figure 10**: nombre de ventes par heures", className="text-muted"),
-		dbc.Alert(
-			dcc.Markdown('''
+				className="my-5"),
+			# Figure 10 (line): Ventes par heure
+			title("Heures d'achat des produits",f"regroupement horraire pour {label}"),
+			dcc.Graph(figure=figures['sales_per_hour'], config=config_dash),
+			dcc.Markdown ("**Figure 10**: nombre de ventes par heures", className="text-muted"),
+			# Figure 11 (heatmap): commandes par jour et heure
+			title("Commandes par jour et par heure", f"nombre de ventes, {label}"),
+			dcc.Graph(figure=figures['activity_week'], config=config_dash),
+			dcc.Markdown ("**Figure 11**: nombre de ventes par jour de la semaine et par heure", className="text-muted"),
+			# Figure 12 (heatmap): horaires de chaque ville
+			title("Horaires d'achat par ville", "part des commandes de la ville réalisée à chaque heure"),
+			dcc.Graph(figure=figures['activity_city'], config=config_dash),
+			dcc.Markdown ("**Figure 12**: répartition horaire des ventes de chaque ville", className="text-muted"),
+			dbc.Alert(
+				dcc.Markdown('''
 				### Recommandation stratégique
 				---
 				- **Augmenter les stocks pour Noël**, afin d'éviter l'indisponibilité de certains produits.
 				- **Favoriser l’affichage de la publicité pour midi et 19h**, un affichage personnalisé peut être réalisé pour chaque ville et 
 				nécessite une investigation au cas par cas.'''),
-			color='secondary', className="my-5"),
-	])
-], fluid=True, className='container', style={"background-color":"white"})
+				color='secondary', className="my-5"),
+		])
+	], fluid=True, className='container', style={"background-color":"white"})
+
+app.layout = html.Div([
+	dcc.Location(id='url', refresh=False),
+	html.Div(id='report')
+])
+
+def report_message(message, color):
+	return dbc.Container(dbc.Alert(message, color=color, className="mt-5"), fluid=True, className='container')
+
+@app.callback(Output('report', 'children'), [Input('url', 'search')])
+def serve_report(search):
+	"""
+		query string: dataset (one of datasets), period and city (repeatable), see select_report.
+		An invalid period or city shows the default report under a warning, an empty selection a message
+	"""
+	args = parse_qs((search or '').lstrip('?'))
+	dataset = args.get('dataset', [default_dataset])[0]
+	if dataset not in datasets:
+		dataset = default_dataset
+	period = args.get('period', [None])[0]
+	try:
+		return build_layout(dataset, period, tuple(args.get('city', [])))
+	except ReportError as error:
+		if error.empty:
+			return report_message(f"{error}.", 'info')
+		return html.Div([
+			report_message(f"{error}, le rapport complet est affiché.", 'warning'),
+			build_layout(dataset, None, ())])
+
+def memory_objects():
+	""" what the worker keeps in memory, see shared.memory """
+	datasets = {f'dataset {key[0] if key else default_dataset}': tables for key, tables in dataset_cache.entries.items()}
+	return dict(datasets, layout_cache=layout_cache)
+
+if memory_endpoint:
+	enable_memory_endpoint(server, memory_objects, budgets=[layout_cache], trace=memory_trace)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
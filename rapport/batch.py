@@ -0,0 +1,114 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                       BATCH REPORTS
+   -------------------------------------------------------------------------------------------
+   Render the report of every (dataset, period, cities) combination as a static html page,
+   from the rapport folder:
+
+		python batch.py --dataset data --period all --period 2019-01:2019-06 --city all --city "San Francisco,Los Angeles" -o reports
+
+   The datasets are read and summed once (app.load_dataset) before the process pool starts:
+   the workers are forked from this process and share these tables, a report only filters
+   them and builds its figures.
+'''
+import os
+import re
+import sys
+import html
+import time
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+
+import app
+
+# figures of the report with their number and caption
+captions = [
+	(1, 'parcats', "découverte des produits"),
+	(2, 'product_bar', "classement des produits"),
+	(3, 'scatter_plot_product', "relation entre le prix et le volume des ventes"),
+	(4, 'low_cost_viz', "chiffre d'affaires et nombre de ventes des accessoires low cost"),
+	(4, 'high_cost_viz', "chiffre d'affaires et nombre de ventes des produits high priced"),
+	(5, 'map_plot', "cartographie des lieux de vente"),
+	(6, 'city_rank', "classement des villes selon leur volume de ventes"),
+	(7, 'sales_income', "relation entre le salaire moyen et le volume de ventes"),
+	(8, 'sales_ads', "relation entre le volume de ventes et le budget publicitaire"),
+	(9, 'ca_per_month', "évolution du chiffre d'affaires"),
+	(10, 'sales_per_hour', "nombre de ventes par heures"),
+	(11, 'activity_week', "nombre de ventes par jour de la semaine et par heure"),
+	(12, 'activity_city', "répartition horaire des ventes de chaque ville"),
+]
+
+
+def report_name(dataset, period, cities):
+	name = '_'.join([os.path.basename(os.path.normpath(dataset)), period or 'all', '-'.join(cities) or 'all'])
+	return re.sub(r'[^\w.-]+', '-', name)
+
+
+def render_report(job):
+	""" job: (dataset, period, cities, output file), return the output file """
+	dataset, period, cities, output = job
+	report = app.select_report(dataset, period, cities)
+	label = report['label']
+	figures = app.create_figures(**report)
+	parts = [f"<h1>Analyse des ventes, {html.escape(label)}</h1>"]
+	for i, (number, name, caption) in enumerate(captions):
+		parts.append(pio.to_html(figures[name], include_plotlyjs='cdn' if i == 0 else False, full_html=False, validate=False))
+		parts.append(f"<p><b>Figure {number}</b>: {html.escape(caption)}</p>")
+	with open(output, 'w') as f:
+		f.write('<html><head><meta charset="utf-8"></head><body>\n' + '\n'.join(parts) + '\n</body></html>')
+	return output
+
+
+def render_reports(datasets, periods, cities, output, max_workers=None):
+	"""
+		* datasets: dataset folders (list)
+		* periods: periods of select_report, None for every order (list)
+		* cities: tuples of cities, () for every city (list)
+
+		return the written files and the failed jobs with their error: a failed report (invalid period
+		or city, no order, error of a figure) does not stop the others
+	"""
+	os.makedirs(output, exist_ok=True)
+	jobs = [(dataset, period, city_list, os.path.join(output, report_name(dataset, period, city_list) + '.html'))
+		for dataset, period, city_list in itertools.product(datasets, periods, cities)]
+	# loaded in this process, inherited by the forked workers
+	for dataset in datasets:
+		app.load_dataset(dataset)
+	methods = multiprocessing.get_all_start_methods()
+	context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+	paths, failures = [], []
+	with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+		futures = [pool.submit(render_report, job) for job in jobs]
+		for done, (job, future) in enumerate(zip(jobs, futures), start=1):
+			try:
+				paths.append(future.result())
+				print(f"{done}/{len(jobs)} {paths[-1]}", flush=True)
+			except Exception as error:
+				failures.append((job, error))
+				print(f"{done}/{len(jobs)} failed {job[-1]}: {error}", file=sys.stderr, flush=True)
+	return paths, failures
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description="render the report for many datasets, periods and cities")
+	parser.add_argument('--dataset', action='append', help="dataset folder, repeatable (default: %s)" % app.default_dataset)
+	parser.add_argument('--period', action='append', help="all, YYYY, YYYY-MM or first:last, repeatable (default: all)")
+	parser.add_argument('--city', action='append', help="all or comma separated cities, repeatable (default: all)")
+	parser.add_argument('-o', '--output', default='reports')
+	parser.add_argument('-j', '--workers', type=int, default=None, help="processes (default: number of cpus)")
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	paths, failures = render_reports(
+		datasets = args.dataset or [app.default_dataset],
+		periods = [None if period == 'all' else period for period in args.period or ['all']],
+		cities = [() if city == 'all' else tuple(c.strip() for c in city.split(',')) for city in args.city or ['all']],
+		output = args.output,
+		max_workers = args.workers)
+	print(f"{len(paths)} reports in {time.perf_counter() - start:.1f}s" + (f", {len(failures)} failed" if failures else ""))
+	if failures:
+		sys.exit(1)
@@ -0,0 +1,142 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                     CITY SUCCESS FACTORS
+   -------------------------------------------------------------------------------------------
+   Relation between the sales of the cities and every external factor of city_info.csv
+   (income, ads budget, population...), all the factors at once:
+
+		* pearson and spearman (rank) correlations
+		* bootstrap confidence intervals of both, a resample is a vector of weights per city and
+		  the statistics of all the resamples are products of matrices
+		* saturating fit  sales = c + a * (1 - exp(-(factor - min) / b)), b is searched on a grid and
+		  a, c are solved in closed form for every (b, factor) pair
+
+   The figures 7 and 8 of the report, their annotations and their titles come from analyse_factors.
+'''
+import numpy as np
+import pandas as pd
+
+
+def pearson(y, X):
+	""" correlation of y (..., n) with every column of X (..., n, factors), batched over the leading axes """
+	y = y - y.mean(axis=-1, keepdims=True)
+	X = X - X.mean(axis=-2, keepdims=True)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return (y[..., None, :] @ X)[..., 0, :] / (np.sqrt((y ** 2).sum(axis=-1))[..., None] * np.sqrt((X ** 2).sum(axis=-2)))
+
+
+def bootstrap(y, X, n_boot=1000, seed=0):
+	""" pearson correlations of n_boot resamples of the cities, (n_boot, factors) """
+	rng = np.random.default_rng(seed)
+	n = len(y)
+	# share of each city in each resample, (n_boot, n)
+	W = rng.multinomial(n, np.full(n, 1 / n), size=n_boot) / n
+	y = y - y.mean()
+	X = X - X.mean(axis=0)
+	mean_y = W @ y
+	mean_X = W @ X
+	cov = W @ (X * y[:, None]) - mean_X * mean_y[:, None]
+	var_X = W @ X ** 2 - mean_X ** 2
+	var_y = W @ y ** 2 - mean_y ** 2
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return cov / np.sqrt(var_X * var_y[:, None])
+
+
+def saturation_fit(y, X, n_scales=60):
+	"""
+		best fit of y = c + a * (1 - exp(-(x - min(x)) / b)) for every column of X
+
+		return a, b, c and r2 per factor
+	"""
+	# scales relative to the range of each factor, (scales, 1, factors)
+	scales = np.geomspace(0.02, 10, n_scales)[:, None, None] * np.ptp(X, axis=0)
+	with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+		G = 1 - np.exp(-(X - X.min(axis=0))[None] / scales)
+	r = pearson(np.broadcast_to(y, (n_scales, len(y))), G)
+	best = np.nanargmax(np.nan_to_num(r ** 2, nan=-1), axis=0)
+	factors = np.arange(X.shape[1])
+	g = G[best, :, factors].T
+	r = r[best, factors]
+	# least squares of y on (1, g)
+	a = r * y.std() / g.std(axis=0)
+	c = y.mean() - a * g.mean(axis=0)
+	return a, scales[best, 0, factors], c, r ** 2
+
+
+def strength(low, high, rho):
+	""" conclusion of the report from the rank correlation and its interval """
+	significant = (low > 0) | (high < 0)
+	return np.select(
+		[np.isnan(rho), significant & (np.abs(rho) >= 0.7), significant],
+		["Pas assez de villes", "Forte corrélation", "Corrélation modérée"],
+		"Aucune corrélation")
+
+
+def analyse_factors(city_info, target='Sales', factors=None, n_boot=1000, level=0.95, seed=0):
+	"""
+		* city_info: one row per city (dataframe)
+		* target: column explained by the factors (str, default='Sales')
+		* factors: columns tested (list, default=None, every numeric column but the target)
+		* level: level of the bootstrap intervals (float, default=0.95)
+
+		return one row per factor: n, pearson, spearman, their bootstrap intervals (*_low, *_high),
+		linear_r2, the saturating fit (fit_origin, fit_a, fit_b, fit_c, fit_r2), saturation (factor
+		value reaching 90% of the fitted gain) and strength (conclusion)
+	"""
+	if factors is None:
+		factors = city_info.select_dtypes('number').columns.drop(target)
+	factors = list(factors)
+	y = city_info[target].to_numpy(dtype=float)
+	X = city_info[factors].to_numpy(dtype=float)
+	result = pd.DataFrame(index=pd.Index(factors, name='factor'))
+	result['n'] = len(y)
+	if len(y) < 3:
+		nan = np.full(len(factors), np.nan)
+		for column in ['pearson', 'spearman', 'pearson_low', 'pearson_high', 'spearman_low', 'spearman_high',
+				'linear_r2', 'fit_origin', 'fit_a', 'fit_b', 'fit_c', 'fit_r2', 'saturation']:
+			result[column] = nan
+		result['strength'] = strength(nan, nan, nan)
+		return result
+
+	# spearman is the pearson correlation of the ranks
+	y_rank = pd.Series(y).rank().to_numpy()
+	X_rank = pd.DataFrame(X).rank().to_numpy()
+	result['pearson'] = pearson(y, X)
+	result['spearman'] = pearson(y_rank, X_rank)
+	q = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+	# the ranks of the full sample are resampled, not recomputed in each resample
+	for name, (y_values, X_values) in [('pearson', (y, X)), ('spearman', (y_rank, X_rank))]:
+		low, high = np.nanpercentile(bootstrap(y_values, X_values, n_boot, seed), q, axis=0)
+		result[f'{name}_low'] = low
+		result[f'{name}_high'] = high
+	result['linear_r2'] = result['pearson'] ** 2
+	result['fit_origin'] = X.min(axis=0)
+	result['fit_a'], result['fit_b'], result['fit_c'], result['fit_r2'] = saturation_fit(y, X)
+	result['saturation'] = result['fit_origin'] + result['fit_b'] * np.log(10)
+	result['strength'] = strength(result['spearman_low'], result['spearman_high'], result['spearman'])
+	return result
+
+
+def fit_curve(result, factor, x, n_points=100):
+	""" points of the saturating fit of a factor over the range of x """
+	row = result.loc[factor]
+	grid = np.linspace(row['fit_origin'], np.max(x), n_points)
+	return grid, row['fit_c'] + row['fit_a'] * (1 - np.exp(-(grid - row['fit_origin']) / row['fit_b']))
+
+
+def label_offsets(x, min_gap=0.05):
+	"""
+		arrows (ax, ay) of the labels of points, None for a label written on its point:
+		the points closer than min_gap (share of the x range) to their neighbour get alternating arrows
+	"""
+	x = np.asarray(x, dtype=float)
+	order = np.argsort(x)
+	gaps = np.diff(x[order]) / (np.ptp(x) or 1)
+	crowded = np.zeros(len(x), dtype=bool)
+	crowded[order[1:]] |= gaps < min_gap
+	crowded[order[:-1]] |= gaps < min_gap
+	arrows = [(30, -20), (0, -40), (-30, -20)]
+	offsets = [None] * len(x)
+	for i, position in enumerate(order[crowded[order]]):
+		offsets[position] = arrows[i % len(arrows)]
+	return offsets
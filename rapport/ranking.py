@@ -0,0 +1,57 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                          RANKING
+   -------------------------------------------------------------------------------------------
+   Best and worst items of any breakdown of the report (products, cities, categories) with
+   their share of the total. Only the n best and n worst are sorted (argpartition then a sort
+   of n values): the highlights and the annotations of the figures come from the ranking and
+   stay right, and fast, whatever the size of the catalog.
+'''
+import numpy as np
+import pandas as pd
+
+
+def top_positions(values, n):
+	""" positions of the n highest values, highest first """
+	n = min(n, len(values))
+	if n <= 0:
+		return np.empty(0, dtype=int)
+	candidates = np.arange(len(values)) if n == len(values) else np.argpartition(-values, n - 1)[:n]
+	return candidates[np.argsort(-values[candidates], kind='stable')]
+
+
+class Ranking:
+	"""
+	>> INPUTS <<
+	---------------------------------------------------------------------------------------------
+		* values: value per item, the index holds the items (series)
+		* n_top: number of best items (int, default=5)
+		* n_bottom: number of worst items (int, default=5)
+
+	top and bottom: value, share of the total and cumulative share per item, from the best (top)
+	or the worst (bottom) item
+	"""
+	def __init__(self, values, n_top=5, n_bottom=5):
+		array = values.to_numpy(dtype=float)
+		self.total = array.sum()
+		self.size = len(array)
+		self.top = self.table(values, top_positions(array, n_top))
+		self.bottom = self.table(values, top_positions(-array, n_bottom))
+
+	def table(self, values, positions):
+		table = pd.DataFrame({'value': values.iloc[positions]})
+		table['share'] = table['value'] / self.total
+		table['cumulative_share'] = table['share'].cumsum()
+		return table
+
+	@property
+	def top_share(self):
+		return self.top['share'].sum()
+
+	@property
+	def bottom_share(self):
+		return self.bottom['share'].sum()
+
+	def highlight(self, items, top, bottom, other):
+		""" color of each item: top for the best items, bottom for the worst, other for the rest """
+		return np.select([np.isin(items, self.bottom.index), np.isin(items, self.top.index)], [bottom, top], other)
@@ -0,0 +1,96 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                        STAR SCHEMA
+   -------------------------------------------------------------------------------------------
+   The summed orders split in small dimension tables and a fact table of integer keys:
+
+		* products: Product, Cat, Price Each
+		* cities: City, lat, long
+		* periods: Period, Month_num, Month
+		* facts: period_id, Hour, city_id, product_id, Timestamp, Sales, Quantity Ordered
+
+   The strings and coordinates are stored once per product / city / month instead of once per
+   row, a sum per product or city is a bincount of the integer keys and the attributes are only
+   joined into the summed result (sum_by). Timestamp is the hour of the facts in the month of their
+   period (nanoseconds since the epoch, int64): the start of the month plus Hour.
+'''
+import numpy as np
+import pandas as pd
+
+
+class StarSchema:
+	"""
+	>> INPUTS <<
+	---------------------------------------------------------------------------------------------
+		* orders: orders summed per order_keys (see app.sum_orders), dataframe
+	"""
+	dimensions = {
+		'products': ['Product', 'Cat', 'Price Each'],
+		'cities': ['City', 'lat', 'long'],
+		'periods': ['Period', 'Month_num', 'Month'],
+	}
+	keys = {'products': 'product_id', 'cities': 'city_id', 'periods': 'period_id'}
+	measures = ['Sales', 'Quantity Ordered']
+	fact_keys = ['period_id', 'Hour', 'city_id', 'product_id']
+
+	def __init__(self, orders=None):
+		self.tables = {name: pd.DataFrame(columns=attributes) for name, attributes in self.dimensions.items()}
+		self.facts = None
+		if orders is not None:
+			self.add(orders)
+
+	def encode(self, name, orders):
+		""" ids of the (attributes) of orders in a dimension table, the new ones are appended to it """
+		attributes = self.dimensions[name]
+		rows = pd.MultiIndex.from_frame(orders[attributes])
+		unique = rows.unique()
+		known = pd.MultiIndex.from_frame(self.tables[name]) if len(self.tables[name]) else unique[:0]
+		new = unique[known.get_indexer(unique) == -1]
+		if len(new):
+			new = new.to_frame(index=False)
+			# an empty table has no column types, the first rows give them
+			self.tables[name] = pd.concat([self.tables[name], new], ignore_index=True) if len(self.tables[name]) else new
+			known = pd.MultiIndex.from_frame(self.tables[name])
+		return known.get_indexer(rows).astype('int32')
+
+	def add(self, orders):
+		""" add summed orders (see app.sum_orders) """
+		facts = pd.DataFrame({self.keys[name]: self.encode(name, orders) for name in self.dimensions})
+		facts['Hour'] = orders['Hour'].to_numpy().astype('int8')
+		for measure in self.measures:
+			facts[measure] = orders[measure].to_numpy()
+		if self.facts is not None:
+			facts = pd.concat([self.facts, facts], ignore_index=True)
+		facts = facts.groupby(self.fact_keys, sort=False)[self.measures].sum().reset_index()
+		# the group keys come back as int64
+		facts = facts.astype({**dict.fromkeys(self.keys.values(), 'int32'), 'Hour': 'int8'})
+		facts.insert(len(self.fact_keys), 'Timestamp', self.timestamps(facts))
+		self.facts = facts
+		return self
+
+	def timestamps(self, facts):
+		""" start of the month of the period of the facts plus their Hour, in nanoseconds (int64 array) """
+		starts = pd.to_datetime(self.tables['periods']['Period']).to_numpy().view('int64')
+		return starts[facts['period_id'].to_numpy()] + facts['Hour'].to_numpy().astype('int64') * 3600 * 10**9
+
+	def restrict(self, name, mask):
+		""" schema of the facts whose dimension row is in mask (boolean array over the dimension table) """
+		restricted = StarSchema()
+		restricted.tables = dict(self.tables)
+		restricted.facts = self.facts[np.asarray(mask, dtype=bool)[self.facts[self.keys[name]].to_numpy()]]
+		return restricted
+
+	def sum_by(self, name, attributes=None):
+		"""
+			* name: dimension summed on (str)
+			* attributes: columns of the dimension grouped on, every dimension row with facts if None (list)
+
+			return the measures summed per attributes, like facts.join(dimension).groupby(attributes).sum()
+		"""
+		table = self.tables[name]
+		codes = self.facts[self.keys[name]].to_numpy()
+		summed = table.assign(**{
+			measure: np.bincount(codes, weights=self.facts[measure], minlength=len(table)).astype(self.facts[measure].dtype)
+			for measure in self.measures})
+		summed = summed[np.bincount(codes, minlength=len(table)) > 0]
+		return summed.groupby(attributes or self.dimensions[name])[self.measures].sum()
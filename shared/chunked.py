@@ -0,0 +1,119 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                    CHUNKED AGGREGATION
+   -------------------------------------------------------------------------------------------
+   Sums of a csv file larger than the memory of a worker: the file is read chunk_size rows at
+   a time, each chunk is reduced to its sums per key and merged into the running sums, then
+   dropped. The peak memory is one chunk plus the result, whatever the size of the file.
+
+   Several aggregates are filled in the same pass over the file (aggregate_chunks), anything
+   with an add(chunk) method can be one of them (report ActivityTensor).
+
+        orders = PartialAggregate(['City', 'Cat'], ['Sales'])
+        aggregate_chunks(read_chunks('clean_data.csv'), [orders])
+        orders.result()
+'''
+import numpy as np
+import pandas as pd
+
+
+class PartialAggregate:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * keys: columns grouped on (list)
+        * values: columns summed (list)
+        * transform: function applied to each chunk before it is grouped, to add derived keys
+          (function, default=None)
+
+    two partial aggregates of the same keys and values merge into the aggregate of both sources
+    """
+    def __init__(self, keys, values, transform=None):
+        self.keys = list(keys)
+        self.values = list(values)
+        self.transform = transform
+        self.sums = None
+        self.rows = 0
+
+    def reduce(self, chunk):
+        """ sums per key of one chunk """
+        if self.transform is not None:
+            chunk = self.transform(chunk)
+        return chunk.groupby(self.keys, sort=False, observed=True)[self.values].sum()
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+        return self.merge_sums(self.reduce(chunk))
+
+    def merge(self, other):
+        """ add the sums of another partial aggregate (of an other chunk, file or process) """
+        self.rows += other.rows
+        return self.merge_sums(other.sums)
+
+    def merge_sums(self, sums):
+        if sums is not None:
+            if self.sums is None:
+                self.sums = sums
+            else:
+                # the keys of both sides only: the merge is bounded by the result size
+                self.sums = pd.concat([self.sums, sums]).groupby(level=self.keys, sort=False).sum()
+        return self
+
+    def encode(self):
+        """
+            compact copy of the sums sent between processes: every key is dictionary encoded,
+            codes: (rows, keys) int32 array, categories: values of each key, values: {column: array}
+        """
+        sums = self.sums if self.sums is not None else pd.DataFrame(
+            columns=self.values, index=pd.MultiIndex.from_arrays([[]] * len(self.keys), names=self.keys))
+        index = sums.index if isinstance(sums.index, pd.MultiIndex) else pd.MultiIndex.from_arrays([sums.index])
+        return dict(
+            codes=np.column_stack([codes.astype('int32') for codes in index.codes]).reshape(len(sums), len(self.keys)),
+            categories=list(index.levels),
+            values={column: sums[column].to_numpy() for column in self.values},
+            rows=self.rows)
+
+    def merge_encoded(self, parts):
+        """
+            add encoded partial aggregates (see encode): the categories of all the parts are
+            united, the codes of each part are translated to these shared categories and the
+            sums are grouped on the integer codes
+        """
+        self.rows += sum(part['rows'] for part in parts)
+        parts = [part for part in parts if len(part['codes'])]
+        if not parts:
+            return self
+        keys = range(len(self.keys))
+        # categories in order of appearance, file after file
+        categories = [pd.Index(pd.unique(np.concatenate([np.asarray(part['categories'][i]) for part in parts]))) for i in keys]
+        codes = np.concatenate([
+            np.column_stack([categories[i].get_indexer(part['categories'][i])[part['codes'][:, i]] for i in keys])
+            for part in parts])
+        values = pd.DataFrame({column: np.concatenate([part['values'][column] for part in parts]) for column in self.values})
+        sums = values.groupby([codes[:, i] for i in keys], sort=False).sum()
+        groups = sums.index if isinstance(sums.index, pd.MultiIndex) else pd.MultiIndex.from_arrays([sums.index])
+        sums.index = pd.MultiIndex(
+            levels=categories, codes=[groups.get_level_values(i) for i in keys], names=self.keys)
+        if len(self.keys) == 1:
+            sums.index = sums.index.get_level_values(0)
+        return self.merge_sums(sums)
+
+    def result(self, sort=True):
+        """ dataframe of the sums, one row per key, the keys as columns """
+        if self.sums is None:
+            return pd.DataFrame(columns=self.keys + self.values)
+        sums = self.sums.sort_index() if sort else self.sums
+        return sums.reset_index()
+
+
+def read_chunks(path, chunk_size=100_000, **read_csv):
+    """ dataframes of chunk_size rows of a csv file, read_csv: arguments of pd.read_csv """
+    return pd.read_csv(path, chunksize=chunk_size, **read_csv)
+
+
+def aggregate_chunks(chunks, aggregates):
+    """ add every chunk to every aggregate (objects with an add method), one pass over the chunks """
+    for chunk in chunks:
+        for aggregate in aggregates:
+            aggregate.add(chunk)
+    return aggregates
@@ -0,0 +1,245 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                  SYNTHETIC DATA GENERATOR
+   -------------------------------------------------------------------------------------------
+   Vectorized and seeded version of dashboard/generate_data.ipynb, without the need of an
+   existing clean_data.csv. Two kinds of datasets, of any size, written chunk by chunk:
+
+   * summary: shape of dashboard/sales_summary.csv, one row per day x city x category
+   * orders: shape of rapport/data/clean_data.csv, one row per ordered product
+
+   usage (from the root of the project):
+        python -m shared.generate_data summary --start 2019-01-01 --end 2019-12-31 -o dashboard/sales_summary.csv
+        python -m shared.generate_data orders --rows 10000000 --start 2017-01-01 --end 2019-12-31 -o orders.parquet
+        python -m shared.generate_data summary --cities 200 --start 2010-01-01 --end 2019-12-31 -o big_summary.csv
+
+   The output format follows the extension: .csv or .parquet (needs pyarrow).
+   The same seed and parameters (chunk size included) always give the same file.
+'''
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+## CATALOG
+# product, category, unit price, share of the orders (2019 data)
+PRODUCTS = [
+    ('Macbook Pro', 'Ordinateur', 1700.0, 4724),
+    ('Dell XPS 13', 'Ordinateur', 999.99, 4128),
+    ('iPhone XR', 'Smartphone', 700.0, 6842),
+    ('Samsung Galaxy n10', 'Smartphone', 600.0, 5525),
+    ('Xiaomi Mi9', 'Smartphone', 400.0, 2065),
+    ('Lave linge LG', 'Machine à laver', 600.0, 666),
+    ('Sécheur LG', 'Machine à laver', 600.0, 646),
+    ('Moniteur 4K 27 pouces', 'TV & Moniteur', 389.99, 6230),
+    ('Moniteur 34 pouces', 'TV & Moniteur', 379.99, 6181),
+    ('Écran plat', 'TV & Moniteur', 300.0, 4800),
+    ('Moniteur FHD 27 pouces', 'TV & Moniteur', 149.99, 7507),
+    ('Moniteur 20 pouces', 'TV & Moniteur', 109.99, 4101),
+    ('Airpods', 'Accessoire', 150.0, 15549),
+    ('Casques Bose SoundSport', 'Accessoire', 99.99, 13325),
+    ('Chargeur lumineux', 'Accessoire', 14.95, 21658),
+    ('Casque sans file', 'Accessoire', 11.99, 18882),
+    ('Chargeur USB-C', 'Accessoire', 11.95, 21903),
+    ('Piles AA', 'Accessoire', 3.84, 20577),
+    ('Piles AAA', 'Accessoire', 2.99, 20641),
+]
+CATEGORIES = ['Accessoire', 'Machine à laver', 'Ordinateur', 'Smartphone', 'TV & Moniteur']
+
+## CITIES
+# city, latitude, longitude, share of the orders (2019 data)
+CITIES = [
+    ('Atlanta', 33.749, -84.388, 14881),
+    ('Austin', 30.267, -97.743, 9905),
+    ('Boston', 42.360, -71.059, 19934),
+    ('Dallas', 32.777, -96.797, 14820),
+    ('Los Angeles', 34.052, -118.244, 29605),
+    ('New York', 40.713, -74.006, 24876),
+    ('Portland', 45.523, -122.677, 12465),
+    ('San Francisco', 37.775, -122.419, 44732),
+    ('Seattle', 47.606, -122.332, 14732),
+]
+
+## SEASONALITY
+# monthly revenue (millions $, 2019) and share of the orders per hour of the day
+MONTH_WEIGHTS = np.array([1.82, 2.20, 2.81, 3.39, 3.15, 2.58, 2.65, 2.24, 2.10, 3.74, 3.20, 4.61])
+HOUR_WEIGHTS = np.array([
+    3.9, 2.4, 1.2, 0.8, 0.8, 1.3, 2.5, 4.0, 6.3, 8.7, 10.9, 12.4,
+    12.6, 12.1, 10.9, 10.2, 10.4, 10.9, 12.3, 12.9, 12.2, 10.9, 8.8, 6.3])
+MONTH_NAMES = ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet',
+               'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+
+## TARGETS (see dashboard/generate_data.ipynb)
+sales_coef = 1.15
+profit_coef = 0.08
+min_rate, max_rate = 0.4, 2
+
+
+def product_table(n_products=len(PRODUCTS)):
+    """ the catalog, products beyond the 19 real ones are numbered copies of them """
+    rows = []
+    for i in range(n_products):
+        name, cat, price, weight = PRODUCTS[i % len(PRODUCTS)]
+        copy = i // len(PRODUCTS)
+        rows.append((f'{name} #{copy + 1}' if copy else name, cat, price, weight))
+    return pd.DataFrame(rows, columns=['Product', 'Cat', 'Price Each', 'weight'])
+
+
+def city_table(n_cities=len(CITIES)):
+    """ the cities, cities beyond the 9 real ones are numbered copies moved around the original """
+    rows = []
+    for i in range(n_cities):
+        name, lat, long, weight = CITIES[i % len(CITIES)]
+        copy = i // len(CITIES)
+        rows.append((f'{name} {copy + 1}' if copy else name, lat + copy * 0.1, long + copy * 0.1, weight))
+    return pd.DataFrame(rows, columns=['City', 'lat', 'long', 'weight'])
+
+
+def day_weights(days):
+    """ probability of each day, following the monthly seasonality """
+    weights = MONTH_WEIGHTS[days.month - 1] / np.asarray(days.days_in_month)
+    return weights / weights.sum()
+
+
+def chunk_rng(seed, kind, chunk):
+    # one independent stream per chunk: the output doesn't depend on the chunk order
+    return np.random.default_rng([seed, kind, chunk])
+
+
+def generate_orders(n_rows, start, end, n_cities=len(CITIES), n_products=len(PRODUCTS),
+                    seed=42, chunk_size=1_000_000, multi_rate=0.03, first_id=100000):
+    """ yield the orders by chunk of chunk_size rows (DataFrame like rapport/data/clean_data.csv) """
+    products = product_table(n_products)
+    cities = city_table(n_cities)
+    days = pd.date_range(start, end, freq='D')
+    p_days = day_weights(days)
+    p_products = (products['weight'] / products['weight'].sum()).to_numpy()
+    p_cities = (cities['weight'] / cities['weight'].sum()).to_numpy()
+    p_hours = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+    # cheap products are often bought by several
+    extra_quantity = np.where(products['Price Each'] < 20, 0.3, 0.01)
+    cat_codes = pd.Categorical(products['Cat'], categories=CATEGORIES).codes
+    day_values = days.values.astype('datetime64[m]')
+
+    for chunk, offset in enumerate(range(0, n_rows, chunk_size)):
+        n = min(chunk_size, n_rows - offset)
+        rng = chunk_rng(seed, 0, chunk)
+        product = rng.choice(len(products), n, p=p_products)
+        city = rng.choice(len(cities), n, p=p_cities)
+        minutes = rng.choice(24, n, p=p_hours) * 60 + rng.integers(0, 60, n)
+        date = day_values[rng.choice(len(days), n, p=p_days)] + minutes.astype('timedelta64[m]')
+        quantity = 1 + rng.poisson(extra_quantity[product])
+        # a few orders hold several products: same id, date and city as the previous row
+        new_order = rng.random(n) >= multi_rate
+        new_order[0] = True
+        last = np.maximum.accumulate(np.where(new_order, np.arange(n), 0))
+        city, date = city[last], date[last]
+        order_id = first_id + offset + np.cumsum(new_order) - 1
+        price = products['Price Each'].to_numpy()[product]
+        date_index = pd.DatetimeIndex(date)
+
+        yield pd.DataFrame({
+            'Order ID': order_id,
+            'Product': pd.Categorical.from_codes(product, products['Product']),
+            'Quantity Ordered': quantity,
+            'Price Each': price,
+            'Order Date': np.datetime_as_string(date, unit='m'),
+            'Month': pd.Categorical.from_codes(date_index.month - 1, MONTH_NAMES),
+            'Month_num': date_index.month,
+            'Day': date_index.day,
+            'Hour': date_index.hour,
+            'Sales': quantity * price,
+            'City': pd.Categorical.from_codes(city, cities['City']),
+            'lat': cities['lat'].to_numpy()[city],
+            'long': cities['long'].to_numpy()[city],
+            'Cat': pd.Categorical.from_codes(cat_codes[product], CATEGORIES),
+        })
+
+
+def generate_summary(start, end, n_cities=len(CITIES), seed=42, chunk_days=365,
+                     daily_sales=94500.0, dashboard_date=datetime.date(2019, 5, 23)):
+    """ yield the daily sales per city and category by chunk of chunk_days days (DataFrame like dashboard/sales_summary.csv) """
+    products = product_table()
+    cities = city_table(n_cities)
+    days = pd.date_range(start, end, freq='D')
+    # expected revenue of a day per city x category
+    revenue = products['Price Each'] * products['weight']
+    cat_share = (revenue.groupby(products['Cat']).sum() / revenue.sum()).reindex(CATEGORIES).to_numpy()
+    # daily_sales is the revenue of the 9 real cities, each extra city adds its share
+    city_share = (cities['weight'] / sum(city[-1] for city in CITIES)).to_numpy()
+    expected = daily_sales * np.outer(city_share, cat_share).ravel()
+    day_factor = day_weights(days) * len(days)
+    n_cells = len(cities) * len(CATEGORIES)
+    dashboard_date = np.datetime64(dashboard_date)
+
+    for chunk, offset in enumerate(range(0, len(days), chunk_days)):
+        chunk_days_index = days[offset:offset + chunk_days]
+        n = len(chunk_days_index) * n_cells
+        rng = chunk_rng(seed, 1, chunk)
+        date = np.repeat(chunk_days_index.values, n_cells)
+        cell = np.tile(np.arange(n_cells), len(chunk_days_index))
+        factor = np.repeat(day_factor[offset:offset + chunk_days], n_cells)
+        # gamma noise with a mean of 1
+        sales_2019 = expected[cell] * factor * rng.gamma(4, 1 / 4, n)
+        sales_target = sales_2019 * sales_coef
+        profit_target = sales_target * profit_coef
+        # the current year is only known up to the dashboard date
+        known = date <= dashboard_date
+        sales_2020 = np.where(known, sales_target * rng.uniform(min_rate, max_rate, n), 0)
+        profit_2020 = np.where(known, profit_target * rng.uniform(min_rate, max_rate, n), 0)
+
+        yield pd.DataFrame({
+            'Date': date,
+            'City': pd.Categorical.from_codes(cell // len(CATEGORIES), cities['City']),
+            'Cat': pd.Categorical.from_codes(cell % len(CATEGORIES), CATEGORIES),
+            'sales_2019': sales_2019,
+            'sales_target': sales_target,
+            'sales_2020': sales_2020,
+            'profit_target': profit_target,
+            'profit_2020': profit_2020,
+        })
+
+
+def write_chunks(chunks, output):
+    """ write the chunks one after the other, only one chunk is in memory at a time """
+    n_rows = 0
+    if output.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output, table.schema)
+            writer.write_table(table)
+            n_rows += len(chunk)
+        if writer is not None:
+            writer.close()
+    else:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            n_rows += len(chunk)
+    return n_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="synthetic sales datasets")
+    parser.add_argument('kind', choices=['summary', 'orders'])
+    parser.add_argument('-o', '--output', required=True, help=".csv or .parquet file")
+    parser.add_argument('--start', default='2019-01-01')
+    parser.add_argument('--end', default='2019-12-31')
+    parser.add_argument('--cities', type=int, default=len(CITIES))
+    parser.add_argument('--products', type=int, default=len(PRODUCTS), help="orders only")
+    parser.add_argument('--rows', type=int, default=185000, help="orders only")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help="rows per chunk, orders only")
+    parser.add_argument('--chunk-days', type=int, default=365, help="days per chunk, summary only")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.kind == 'orders':
+        chunks = generate_orders(args.rows, args.start, args.end, args.cities, args.products, args.seed, args.chunk_size)
+    else:
+        chunks = generate_summary(args.start, args.end, args.cities, args.seed, args.chunk_days)
+    n_rows = write_chunks(chunks, args.output)
+    print(f"{n_rows} rows written to {args.output}")
@@ -0,0 +1,90 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                   COMPRESSION AND ETAGS
+   -------------------------------------------------------------------------------------------
+   create_server: flask server configured for Flask-Compress (brotli, gzip as fallback),
+   pass it to dash.Dash(server=..., compress=True).
+
+   enable_etags: a content hash ETag on the GET responses of the layout and dependencies.
+   Identical responses get the same ETag, a request sent with a matching If-None-Match is
+   answered with an empty 304, and a reverse proxy can serve the cached copy.
+   The callbacks are POST requests, which browsers and proxies neither cache nor revalidate:
+   their responses get the ETag of their body, with no 304 and no caching, so a client or a
+   proxy can tell identical outputs apart without comparing the bodies.
+'''
+import hashlib
+
+import flask
+
+# dash GET routes whose responses only depend on the loaded data
+DASH_PATHS = ('/_dash-layout', '/_dash-dependencies')
+# dash POST routes of the callbacks
+CALLBACK_PATHS = ('/_dash-update-component',)
+
+
+def create_server(import_name, br_level=4, gzip_level=6, min_size=500):
+    server = flask.Flask(import_name)
+    # read by Flask-Compress when dash registers it, must be set before dash.Dash()
+    server.config.update(
+        COMPRESS_ALGORITHM=['br', 'gzip'],
+        COMPRESS_BR_LEVEL=br_level,
+        COMPRESS_LEVEL=gzip_level,
+        COMPRESS_MIN_SIZE=min_size,
+    )
+    return server
+
+
+def content_etag(body, accept_encoding=''):
+    """ hash of the body and of the Accept-Encoding: each encoding of a response has its own tag """
+    digest = hashlib.blake2b(body, digest_size=16)
+    digest.update(b'\0' + accept_encoding.replace(' ', '').lower().encode())
+    return digest.hexdigest()
+
+
+def etag_requested(etag):
+    """
+        If-None-Match contains etag. Flask-Compress adds the encoding to the ETags it sends
+        (":br", ":gzip"), the suffix can be dropped since the tag already depends on the
+        Accept-Encoding of the request
+    """
+    requested = flask.request.if_none_match
+    if requested.star_tag:
+        return True
+    return any(tag.split(':')[0] == etag for tag in requested.as_set(include_weak=True))
+
+
+def enable_etags(server, paths=DASH_PATHS, callback_paths=CALLBACK_PATHS, max_age=0):
+    """
+        * paths: GET routes that get an ETag and a 304 (the routes of a dash app by default)
+        * callback_paths: POST routes that only get an ETag (the callbacks of a dash app by default)
+        * max_age: seconds a browser or proxy may reuse a response without asking (int, default=0, always revalidate)
+    """
+    # registered after Flask-Compress, so it runs before the compression and hashes the raw json
+    @server.after_request
+    def add_etag(response):
+        method = flask.request.method
+        tagged = {'GET': paths, 'HEAD': paths, 'POST': callback_paths}.get(method, ())
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.is_streamed
+                or not flask.request.path.endswith(tuple(tagged))):
+            return response
+        etag = content_etag(response.get_data(), flask.request.headers.get('Accept-Encoding', ''))
+        if method == 'POST':
+            # a POST is never answered with a 304, nor stored
+            response.set_etag(etag)
+            response.vary.add('Accept-Encoding')
+            response.cache_control.no_store = True
+            return response
+        if etag_requested(etag):
+            not_modified = flask.Response(status=304)
+            not_modified.set_etag(etag)
+            not_modified.vary.add('Accept-Encoding')
+            return not_modified
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.cache_control.no_cache = max_age == 0
+        return response
+    return add_etag
@@ -0,0 +1,69 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                    MULTI-FILE INGESTION
+   -------------------------------------------------------------------------------------------
+   Orders arrive as many csv files (one per month and per store). Each file is read and
+   aggregated by a worker process (chunk by chunk, see chunked), the worker only sends back its
+   partial aggregates, the keys dictionary encoded (PartialAggregate.encode). The parent unites
+   the categories of all the files and merges the parts on integer codes, in the order of the
+   files: the result is the same as one pass over the files one after the other.
+
+        ingest(glob.glob('orders/*.csv'), make_aggregates)
+
+   make_aggregates returns new empty aggregates, a PartialAggregate or any object with
+   add(chunk) and merge(other) methods. It must be a module level function (sent to the workers).
+
+   The parallelism is per file: a dataset made of a single file (one clean_data.csv) is read
+   in this process, chunk after chunk, only the split files (orders/*.csv) are read in parallel.
+
+   The workers are forked only from a process with a single thread. A web server calls ingest
+   from a request thread: a fork would copy the locks held by the other threads, never released
+   in the child, the workers are then started by a forkserver (or spawned) and import the
+   module of make_aggregates.
+'''
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from shared.chunked import PartialAggregate, read_chunks, aggregate_chunks
+
+
+def pool_context():
+    """ fork in a single threaded process, forkserver (or spawn) otherwise """
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def ingest_file(job):
+    """ job: (path, make_aggregates, chunk_size, read_csv), return the encoded aggregates of the file """
+    path, make_aggregates, chunk_size, read_csv = job
+    aggregates = aggregate_chunks(read_chunks(path, chunk_size, **read_csv), make_aggregates())
+    return [aggregate.encode() if isinstance(aggregate, PartialAggregate) else aggregate for aggregate in aggregates]
+
+
+def ingest(paths, make_aggregates, chunk_size=100_000, max_workers=None, **read_csv):
+    """
+        * paths: csv files (list)
+        * make_aggregates: function returning the empty aggregates filled by each file (function)
+        * max_workers: processes (int, default=None, number of cpus). With a single file or
+          max_workers=1 the files are read here, one after the other
+
+        return the aggregates of all the files
+    """
+    jobs = [(path, make_aggregates, chunk_size, read_csv) for path in paths]
+    if len(jobs) <= 1 or max_workers == 1:
+        parts = [ingest_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=pool_context()) as pool:
+            parts = list(pool.map(ingest_file, jobs))
+
+    aggregates = make_aggregates()
+    for position, aggregate in enumerate(aggregates):
+        if isinstance(aggregate, PartialAggregate):
+            aggregate.merge_encoded([part[position] for part in parts])
+        else:
+            for part in parts:
+                aggregate.merge(part[position])
+    return aggregates
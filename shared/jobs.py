@@ -0,0 +1,315 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                     BACKGROUND JOBS
+   -------------------------------------------------------------------------------------------
+   Long callbacks run on a local pool of threads instead of the request thread, no broker:
+
+        * JobQueue: jobs keyed by their inputs. A job already queued, running or just finished
+          with the same key is shared by every caller instead of computed twice.
+        * Job: progress (done / total, message) and cancellation, checked by the job itself at
+          each job.progress(): a running job stops at its next step, a queued one never starts.
+        * background_callback: dash callback running its function as a job. The browser polls
+          the job (dcc.Interval) until the outputs are ready, a change of the inputs cancels the
+          job it was waiting for (unless another browser waits for it too).
+
+   The jobs live in the memory of the worker. A poll for a job this worker does not know (the
+   poll reached another gunicorn worker, the job was forgotten after a reload of the data)
+   submits the job again from the current inputs: no sticky session is needed, and with a
+   result cache shared by the workers the second worker reads what the first one computed.
+   The id of the job submitted again is kept by the browser (store <name>_current), the next
+   polls and the release of the job after a change of the inputs use it.
+'''
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """ raised by job.progress() in a cancelled job """
+
+
+'''----- JOB -----'''
+
+class Job:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * key: inputs of the job, identical jobs have the same key (hashable)
+        * function: called as function(job, *args), reports its progress with job.progress()
+        * args: arguments of the function (tuple)
+
+    state: queued, running, done, failed or cancelled
+    """
+    finished_states = ('done', 'failed', 'cancelled')
+
+    def __init__(self, key, function, args=()):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.function = function
+        self.args = args
+        self.state = 'queued'
+        self.done = 0
+        self.total = None
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        # callers waiting for the result, the job is only cancelled when none is left
+        self.waiters = 0
+        self.cancel_event = threading.Event()
+        self.finished_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def is_finished(self):
+        return self.state in self.finished_states
+
+    def progress(self, done, total=None, message=None):
+        """ report the progress of the job, raise JobCancelled if it was cancelled meanwhile """
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+    def percent(self):
+        if self.state == 'done':
+            return 100
+        return 100 * self.done / self.total if self.total else 0
+
+    def run(self):
+        if self.cancelled:
+            return self.finish('cancelled')
+        self.state, self.started = 'running', time.time()
+        try:
+            self.result = self.function(self, *self.args)
+        except JobCancelled:
+            return self.finish('cancelled')
+        except Exception as error:
+            self.error = f'{type(error).__name__}: {error}'
+            return self.finish('failed')
+        self.finish('done')
+
+    def finish(self, state):
+        self.state, self.finished = state, time.time()
+        # nobody waits for a finished job anymore, its result stays readable for keep seconds
+        self.waiters = 0
+        self.finished_event.set()
+
+    def wait(self, timeout=None):
+        """ True if the job finished within timeout seconds """
+        return self.finished_event.wait(timeout)
+
+    def status(self):
+        duration = None if self.started is None else (self.finished or time.time()) - self.started
+        return dict(id=self.id, state=self.state, done=self.done, total=self.total, percent=self.percent(),
+            message=self.message, error=self.error, waiters=self.waiters, duration=duration)
+
+
+'''----- QUEUE -----'''
+
+class JobQueue:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * max_workers: jobs running at the same time (int, default=2)
+        * keep: seconds a finished job (and its result) is kept for the callers still polling it
+          and for the identical jobs submitted meanwhile (float, default=60)
+    """
+    def __init__(self, max_workers=2, keep=60):
+        self.max_workers = max_workers
+        self.keep = keep
+        self.jobs = {}
+        self.by_key = {}
+        self.lock = threading.RLock()
+        # the threads are started with the first job, not at import time
+        self.pool = None
+
+    def submit(self, function, *args, key=None):
+        """ a new job, or the queued, running or recently done job with the same key """
+        key = (function.__name__, args) if key is None else key
+        with self.lock:
+            self.purge()
+            job = self.find(key)
+            if job is None:
+                job = Job(key, function, args)
+                self.jobs[job.id] = self.by_key[key] = job
+                if self.pool is None:
+                    self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                self.pool.submit(job.run)
+            if not job.is_finished:
+                job.waiters += 1
+            return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def find(self, key):
+        """ the queued, running or done job of a key, None if there is none or it failed or was cancelled """
+        job = self.by_key.get(key)
+        if job is None or job.state in ('failed', 'cancelled') or job.cancelled:
+            return None
+        return job
+
+    def release(self, job_id):
+        """ a caller stops waiting for a job, the job is cancelled when nobody waits for it anymore """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job.waiters = max(job.waiters - 1, 0)
+            if job.waiters == 0 and not job.is_finished:
+                job.cancel_event.set()
+            return job
+
+    def cancel(self, job_id):
+        """ cancel a job whoever waits for it """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and not job.is_finished:
+                job.cancel_event.set()
+            return job
+
+    def invalidate(self):
+        """
+            after a reload of the data: the finished jobs and their results are forgotten, the
+            running and queued ones finish for the callers polling them but a new submission of
+            their key starts a new job
+        """
+        with self.lock:
+            for job in [job for job in self.jobs.values() if job.is_finished]:
+                del self.jobs[job.id]
+            self.by_key.clear()
+
+    def purge(self):
+        """ forget the jobs finished for more than keep seconds """
+        limit = time.time() - self.keep
+        with self.lock:
+            for job in [job for job in self.jobs.values() if job.is_finished and job.finished < limit]:
+                del self.jobs[job.id]
+                if self.by_key.get(job.key) is job:
+                    del self.by_key[job.key]
+
+    def stats(self):
+        with self.lock:
+            states = [job.state for job in self.jobs.values()]
+        return dict(max_workers=self.max_workers, jobs=len(states),
+            **{state: states.count(state) for state in ('queued', 'running', 'done', 'failed', 'cancelled')})
+
+
+def enable_jobs_endpoint(server, queue):
+    """
+        /_jobs: statistics of the queue and status of every job
+        /_jobs/<job_id>: status of a job, DELETE cancels it
+    """
+    import flask
+
+    @server.route('/_jobs')
+    def jobs():
+        with queue.lock:
+            statuses = [job.status() for job in queue.jobs.values()]
+        return flask.jsonify(dict(queue.stats(), jobs=statuses))
+
+    @server.route('/_jobs/<job_id>', methods=['GET', 'DELETE'])
+    def job_status(job_id):
+        job = queue.cancel(job_id) if flask.request.method == 'DELETE' else queue.get(job_id)
+        if job is None:
+            flask.abort(404)
+        return job.status()
+
+    return jobs, job_status
+
+
+'''----- DASH -----'''
+
+def job_components(name, interval=500):
+    """
+        stores of the job ids and poll interval of a background callback, to put in the layout:
+        <name>_job is the job submitted by a change of the inputs, <name>_current the job the
+        poll submitted again in its place
+    """
+    import dash_core_components as dcc
+    return [dcc.Store(id=f'{name}_job'), dcc.Store(id=f'{name}_current'),
+        dcc.Interval(id=f'{name}_poll', interval=interval, disabled=True)]
+
+
+def current_job_id(data, current):
+    """ id of the job followed for the job of the store data, the one submitted again in its place if any """
+    if current and data and current.get('for') == data['id']:
+        return current['id']
+    return data['id'] if data else None
+
+
+def background_callback(app, queue, name, outputs, inputs, state=(), progress=None, error=None, wait=0.2):
+    """
+        * name: prefix of the job components of the layout (see job_components)
+        * outputs, inputs, state: of the callback (lists of dash.dependencies)
+        * progress: output set to the percent of the job while it runs, 0 once it is over (Output)
+        * error: output set to the error of a failed job, None otherwise (Output)
+        * wait: seconds a poll waits for the job before answering, a quick job is served by the
+          first poll (float, default=0.2)
+
+        decorator of function(job, *values) returning the outputs: a first callback submits the
+        job (a change of the inputs releases the previous one), a second one polls it. A poll for
+        a job unknown here or cancelled submits it again from the current inputs and returns the
+        id of the new job to the <name>_current store
+    """
+    from dash import no_update
+    from dash.dependencies import Output, Input, State
+    from dash.exceptions import PreventUpdate
+    store, current, poll = f'{name}_job', f'{name}_current', f'{name}_poll'
+
+    def job_key(values):
+        return (name, repr(list(values)))
+
+    def decorator(function):
+        @app.callback(Output(store, 'data'), list(inputs), list(state) + [State(store, 'data'), State(current, 'data')])
+        def submit(*values):
+            *values, previous, previous_current = values
+            key = job_key(values)
+            previous = queue.get(current_job_id(previous, previous_current))
+            if previous is not None and previous.key == key and not previous.cancelled:
+                raise PreventUpdate
+            job = queue.submit(function, *values, key=key)
+            if previous is not None:
+                queue.release(previous.id)
+            return {'id': job.id}
+
+        extra_outputs = [output for output in (progress, error) if output is not None]
+        poll_outputs = list(outputs) + extra_outputs + [Output(poll, 'disabled'), Output(current, 'data')]
+        # the current inputs, to submit again a job this worker does not know
+        poll_state = [State(dependency.component_id, dependency.component_property) for dependency in list(inputs) + list(state)]
+
+        @app.callback(poll_outputs, [Input(store, 'data'), Input(poll, 'n_intervals')], poll_state + [State(current, 'data')])
+        def update(data, n_intervals, *values):
+            *values, followed = values
+            if not data:
+                raise PreventUpdate
+            job_id = current_job_id(data, followed)
+            job = queue.get(job_id)
+            if job is None or job.state == 'cancelled':
+                # the job of the same inputs already here, or a new one: waited for like a submitted one
+                job = queue.submit(function, *values, key=job_key(values))
+            replaced = {'id': job.id, 'for': data['id']} if job.id != job_id else no_update
+            job.wait(wait)
+            running = not job.is_finished
+            if job.state == 'done':
+                results = list(job.result) if len(outputs) > 1 else [job.result]
+            else:
+                results = [no_update] * len(outputs)
+            if progress is not None:
+                results.append(job.percent() if running else 0)
+            if error is not None:
+                results.append(job.error if job.state == 'failed' else None)
+            return results + [not running, replaced]
+
+        function.submit, function.update = submit, update
+        return function
+    return decorator
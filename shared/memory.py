@@ -0,0 +1,244 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                     MEMORY ACCOUNTING
+   -------------------------------------------------------------------------------------------
+   What the memory of a worker is made of:
+
+        * memory_report: bytes of every object an app keeps (datasets, aggregates, caches,
+          figures), a dataframe detailed per column and index, and the RSS of the process
+        * BudgetCache: dict-like LRU cache measuring its entries, the oldest entries are evicted
+          when it goes over its budget of bytes or entries
+        * track_requests: peak of the python allocations (tracemalloc) during each request of a
+          flask server, per path. tracemalloc slows the app down, keep it for diagnosis.
+
+   The apps serve the report on /_memory when MEMORY_ENDPOINT=1 (see enable_memory_endpoint).
+'''
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+'''----- SIZES -----'''
+
+def deep_bytes(obj, seen=None):
+    """ bytes of an object and of everything it references, each object counted once """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True, index=True).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=True, index=True))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        # the buffer of a view belongs to its base array, counted once for all its views
+        base = obj
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base is obj:
+            size = sys.getsizeof(obj)
+        else:
+            size = sys.getsizeof(obj) + (0 if id(base) in seen else base.nbytes)
+            seen.add(id(base))
+        if obj.dtype == object:
+            size += sum(deep_bytes(item, seen) for item in obj.ravel().tolist())
+        return size
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_bytes(key, seen) + deep_bytes(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_bytes(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += deep_bytes(vars(obj), seen)
+    return size
+
+
+def frame_detail(frame):
+    """ bytes of the index and of each column of a dataframe """
+    usage = frame.memory_usage(deep=True, index=True)
+    return {str(name): int(size) for name, size in usage.items()}
+
+
+def process_rss():
+    """ resident memory of the process in bytes, None where /proc is missing """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def memory_report(objects):
+    """
+        * objects: {name: object} kept by the app, None for an object not loaded yet (dict)
+
+        return the RSS of the process and, per object: its type, bytes, the detail per column of a
+        dataframe and the statistics of a BudgetCache
+    """
+    entries = {}
+    for name, obj in objects.items():
+        entry = dict(type=type(obj).__name__, bytes=0 if obj is None else deep_bytes(obj))
+        if isinstance(obj, pd.DataFrame):
+            entry['columns'] = frame_detail(obj)
+        elif isinstance(obj, BudgetCache):
+            entry.update(obj.stats())
+        elif isinstance(obj, dict):
+            entry['items'] = {str(key): deep_bytes(value) for key, value in obj.items()}
+        entries[name] = entry
+    return dict(rss=process_rss(), objects=entries, total=sum(entry['bytes'] for entry in entries.values()))
+
+
+'''----- CACHE -----'''
+
+class BudgetCache:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * max_bytes: budget of the entries in bytes (int, default=None, no limit)
+        * max_entries: number of entries kept (int, default=None, no limit)
+
+    dict-like cache (get, [], in, len, clear), the least recently used entries are evicted first
+    """
+    def __init__(self, max_bytes=None, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def __getitem__(self, key):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        size = deep_bytes(value)
+        with self.lock:
+            self.pop(key)
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.bytes += size
+            self.evict()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def pop(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.sizes.pop(key)
+                return self.entries.pop(key)
+
+    def evict(self, max_bytes=None):
+        """ drop the oldest entries until the cache fits its budgets (or max_bytes) """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self.lock:
+            # the newest entry is kept even when it is over the budget on its own
+            while len(self.entries) > 1 and (
+                    (max_bytes is not None and self.bytes > max_bytes)
+                    or (self.max_entries is not None and len(self.entries) > self.max_entries)):
+                self.pop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return dict(entries=len(self.entries), max_bytes=self.max_bytes, max_entries=self.max_entries,
+            hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+
+def memoize(cache):
+    """ decorator caching the results of a function in a BudgetCache, per positional arguments """
+    def decorator(function):
+        def wrapper(*args):
+            result = cache.get(args, KeyError)
+            if result is KeyError:
+                result = function(*args)
+                cache[args] = result
+            return result
+        wrapper.__name__, wrapper.__doc__ = function.__name__, function.__doc__
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+'''----- REQUESTS -----'''
+
+def track_requests(server):
+    """
+        peak of the python allocations of each request of a flask server (tracemalloc), per path:
+        count, last and max peak in bytes. With concurrent requests the peak of a request includes
+        the allocations of the others.
+    """
+    peaks = {}
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    @server.before_request
+    def reset_peak():
+        import flask
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        flask.g.memory_start = tracemalloc.get_traced_memory()[0]
+
+    @server.after_request
+    def record_peak(response):
+        import flask
+        current, peak = tracemalloc.get_traced_memory()
+        start = flask.g.get('memory_start', current)
+        stats = peaks.setdefault(flask.request.path, dict(count=0, last=0, max=0))
+        stats['count'] += 1
+        stats['last'] = max(peak - start, 0)
+        stats['max'] = max(stats['max'], stats['last'])
+        return response
+
+    return peaks
+
+
+def enable_memory_endpoint(server, objects, budgets=(), trace=False):
+    """
+        /_memory: memory_report of the objects (function returning {name: object}) and the request peaks
+        /_memory?evict=<bytes>: evict the budgets (BudgetCache list) down to this size first
+    """
+    import flask
+    peaks = track_requests(server) if trace else None
+
+    @server.route('/_memory')
+    def memory():
+        evict = flask.request.args.get('evict', type=int)
+        if evict is not None:
+            for cache in budgets:
+                cache.evict(evict)
+        report = memory_report(objects())
+        report['time'] = time.time()
+        if peaks is not None:
+            report['requests'] = peaks
+        return flask.jsonify(report)
+
+    return memory
@@ -0,0 +1,132 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                   MONTH PARTITIONED DATASET
+   -------------------------------------------------------------------------------------------
+   A table stored as one parquet file per month (root/year=YYYY/month=MM/part-0.parquet) and a
+   metadata file (root/_partitions.json) with the row count, min and max of every column of
+   each partition. A query reads only the partitions whose metadata can match it: a view of
+   one month reads one file, whatever the number of years stored. Needs pyarrow.
+
+   build a dataset from a csv file (from the root of the project):
+        python -m shared.partitions dashboard/sales_summary.csv dashboard/sales --date Date
+'''
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+METADATA = '_partitions.json'
+
+
+def json_value(value):
+    """ min / max of a column as a json value, dates as iso strings """
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def write_partitions(frame, root, date_column):
+    """ write frame as one parquet file per month of date_column, return the metadata """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    dates = pd.to_datetime(frame[date_column])
+    partitions = []
+    for (year, month), part in frame.groupby([dates.dt.year, dates.dt.month], sort=True):
+        path = f'year={year}/month={month:02d}/part-0.parquet'
+        os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(part, preserve_index=False), os.path.join(root, path))
+        partitions.append(dict(
+            key=f'{year}-{month:02d}',
+            path=path,
+            rows=len(part),
+            min={column: json_value(part[column].min()) for column in part.columns},
+            max={column: json_value(part[column].max()) for column in part.columns}))
+    metadata = dict(date_column=date_column, columns=list(frame.columns), partitions=partitions)
+    with open(os.path.join(root, METADATA), 'w') as f:
+        json.dump(metadata, f, indent=1)
+    return metadata
+
+
+class PartitionedDataset:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * root: folder written by write_partitions (str)
+
+    queries:
+        * ranges: [start, end) periods of the date column (list of (timestamp, timestamp)), None
+          keeps every date, an empty list none
+        * where: values kept per column ({column: value or list of values})
+    """
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, METADATA)) as f:
+            self.metadata = json.load(f)
+        self.date_column = self.metadata['date_column']
+        self.columns = self.metadata['columns']
+
+    @staticmethod
+    def is_dataset(path):
+        return os.path.isfile(os.path.join(path, METADATA))
+
+    @property
+    def rows(self):
+        return sum(partition['rows'] for partition in self.metadata['partitions'])
+
+    def prune(self, ranges=None, where=None):
+        """ partitions whose min / max can match the query """
+        kept = []
+        for partition in self.metadata['partitions']:
+            low, high = partition['min'], partition['max']
+            if ranges is not None:
+                first, last = pd.Timestamp(low[self.date_column]), pd.Timestamp(high[self.date_column])
+                if not any(pd.Timestamp(start) <= last and first < pd.Timestamp(end) for start, end in ranges):
+                    continue
+            values = {column: [v] if np.isscalar(v) else list(v) for column, v in (where or {}).items()}
+            if any(not any(low[column] <= value <= high[column] for value in column_values)
+                    for column, column_values in values.items()):
+                continue
+            kept.append(partition)
+        return kept
+
+    def iter_partitions(self, columns=None, ranges=None, where=None):
+        """ one dataframe per kept partition, restricted to the rows of the query """
+        import pyarrow.parquet as pq
+        needed = None if columns is None else list(dict.fromkeys(
+            list(columns) + ([self.date_column] if ranges is not None else []) + list(where or {})))
+        for partition in self.prune(ranges, where):
+            frame = pq.read_table(os.path.join(self.root, partition['path']), columns=needed).to_pandas()
+            mask = np.ones(len(frame), dtype=bool)
+            if ranges is not None:
+                dates = pd.to_datetime(frame[self.date_column])
+                mask &= np.logical_or.reduce([(dates >= start) & (dates < end) for start, end in ranges])
+            for column, values in (where or {}).items():
+                mask &= frame[column].isin([values] if np.isscalar(values) else values).to_numpy()
+            frame = frame[mask] if not mask.all() else frame
+            yield frame if columns is None else frame[list(columns)]
+
+    def read(self, columns=None, ranges=None, where=None):
+        frames = list(self.iter_partitions(columns, ranges, where))
+        if not frames:
+            return self.sample(columns).iloc[:0]
+        return pd.concat(frames, ignore_index=True)
+
+    def sample(self, columns=None):
+        """ first row of the dataset, for its column types """
+        import pyarrow.parquet as pq
+        partition = self.metadata['partitions'][0]
+        table = pq.read_table(os.path.join(self.root, partition['path']), columns=None if columns is None else list(columns))
+        return table.slice(0, 1).to_pandas()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="write a csv file as a month partitioned parquet dataset")
+    parser.add_argument('source', help="csv file")
+    parser.add_argument('root', help="folder of the dataset")
+    parser.add_argument('--date', required=True, help="date column of the partitions")
+    args = parser.parse_args()
+
+    metadata = write_partitions(pd.read_csv(args.source, parse_dates=[args.date]), args.root, args.date)
+    print(f"{len(metadata['partitions'])} partitions, {sum(p['rows'] for p in metadata['partitions'])} rows in {args.root}")
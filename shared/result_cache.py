@@ -0,0 +1,363 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                    SHARED RESULT CACHE
+   -------------------------------------------------------------------------------------------
+   Results (callback outputs, aggregates) shared by every worker of a host through a folder,
+   one json file per key: a result computed by one gunicorn worker is read by the others
+   instead of being computed again.
+
+        * atomic writes: a result is written to a temporary file then renamed, a reader never
+          sees half a file
+        * get_or_compute: one worker computes a missing result, the others wait for its file
+          (a lock file per key, removed once the result is written)
+        * eviction: the results older than ttl seconds are not read, the least recently read
+          are deleted when the folder goes over max_bytes
+        * version: the results live in a folder per version of the data and of the code (see
+          content_version), the folders of the other versions are deleted once no worker used
+          them for stale seconds (the workers still on the old data keep their results)
+
+   The files are json, never pickles: reading one builds dicts, lists, numpy arrays and pandas
+   frames, and the instances of the classes given to the cache, it never runs code. The folder
+   must belong to the user running the app and be writable by that user only, the cache
+   refuses it otherwise (PermissionError): nobody else can put a result in it.
+'''
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # no file locks (windows): the workers may compute the same result at the same time
+    fcntl = None
+
+SUFFIX = '.json'
+# files of a worker being written or computed, left behind by a worker killed meanwhile
+TEMPORARY_SUFFIXES = ('.tmp', '.lock')
+
+
+def content_version(*paths):
+    """ version of files (data, source of the modules computing the results): hash of their content """
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                digest.update(block)
+        # the end of each file, two files are not the same as their concatenation
+        digest.update(b'\0' + str(os.path.getsize(path)).encode())
+    return digest.hexdigest()
+
+
+def check_folder(folder):
+    """ raise PermissionError if the folder belongs to another user or others can write to it """
+    stat = os.stat(folder)
+    if hasattr(os, 'getuid') and stat.st_uid != os.getuid():
+        raise PermissionError(f'{folder} belongs to another user, the shared cache needs its own folder')
+    if hasattr(os, 'getuid') and stat.st_mode & 0o022:
+        raise PermissionError(f'{folder} can be written by other users, the shared cache needs a private folder (mode 700)')
+
+
+'''----- ENCODING -----'''
+
+def encode(value, classes=()):
+    """
+        value -> json native types, the other types are tagged ({'$tag': ...}):
+        tuples, dicts with keys other than strings, numpy arrays and scalars, pandas indexes,
+        series and frames, and the instances of classes (their attributes)
+
+        raise TypeError for any other type: the result is then not shared
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [encode(item, classes) for item in value]
+    if isinstance(value, tuple):
+        return {'$tuple': [encode(item, classes) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith('$') for key in value):
+            return {key: encode(item, classes) for key, item in value.items()}
+        return {'$dict': [[encode(key, classes), encode(item, classes)] for key, item in value.items()]}
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'O':
+            return {'$objects': encode(value.ravel().tolist(), classes), 'shape': list(value.shape)}
+        if value.dtype.kind not in 'biufcmMU':
+            raise TypeError(f'dtype {value.dtype} is not shared')
+        return {'$array': value.dtype.str, 'shape': list(value.shape), 'data': base64.b64encode(value.tobytes()).decode('ascii')}
+    if isinstance(value, np.generic):
+        return {'$scalar': encode(np.asarray(value), classes)}
+    if isinstance(value, pd.MultiIndex):
+        return {'$multiindex': [encode(level, classes) for level in value.levels],
+            'codes': [encode(codes, classes) for codes in value.codes], 'names': encode(list(value.names), classes)}
+    if isinstance(value, pd.Index):
+        return {'$index': encode(value.to_numpy(), classes), 'name': encode(value.name, classes), 'freq': getattr(value, 'freqstr', None)}
+    if isinstance(value, pd.Series):
+        return {'$series': encode(value.to_numpy(), classes), 'index': encode(value.index, classes), 'name': encode(value.name, classes)}
+    if isinstance(value, pd.DataFrame):
+        return {'$frame': [encode(value.iloc[:, i].to_numpy(), classes) for i in range(value.shape[1])],
+            'index': encode(value.index, classes), 'columns': encode(value.columns, classes)}
+    if type(value) in classes:
+        return {'$object': type(value).__name__, 'state': encode(vars(value), classes)}
+    raise TypeError(f'{type(value).__name__} is not shared')
+
+
+def decoder(classes=()):
+    """ object_hook of json.load rebuilding the tagged values of encode, only of the given classes """
+    names = {cls.__name__: cls for cls in classes}
+
+    def decode(obj):
+        tag = next(iter(obj), '')
+        if not tag.startswith('$'):
+            return obj
+        if tag == '$tuple':
+            return tuple(obj[tag])
+        if tag == '$dict':
+            return {key: item for key, item in obj[tag]}
+        if tag == '$objects':
+            array = np.empty(len(obj[tag]), dtype=object)
+            array[:] = obj[tag]
+            return array.reshape(obj['shape'])
+        if tag == '$array':
+            return np.frombuffer(base64.b64decode(obj['data']), dtype=np.dtype(obj[tag])).reshape(obj['shape']).copy()
+        if tag == '$scalar':
+            return obj[tag][()]
+        if tag == '$multiindex':
+            return pd.MultiIndex(levels=obj[tag], codes=obj['codes'], names=obj['names'])
+        if tag == '$index':
+            if obj['freq'] is not None:
+                return pd.DatetimeIndex(obj[tag], name=obj['name'], freq=obj['freq'])
+            return pd.Index(obj[tag], name=obj['name'])
+        if tag == '$series':
+            return pd.Series(obj[tag], index=obj['index'], name=obj['name'])
+        if tag == '$frame':
+            frame = pd.DataFrame(dict(enumerate(obj[tag])), index=obj['index'])
+            frame.columns = obj['columns']
+            return frame
+        if tag == '$object':
+            value = object.__new__(names[obj[tag]])
+            value.__dict__.update(obj['state'])
+            return value
+        raise ValueError(f'unknown tag {tag}')
+
+    return decode
+
+
+'''----- CACHE -----'''
+
+class SharedCache:
+    """
+    >> INPUTS <<
+    ---------------------------------------------------------------------------------------------
+        * directory: folder of the cache, shared by the workers, created with mode 700 (str)
+        * version: version of the data and code the results are computed on (str, default='0')
+        * ttl: seconds a result is valid (float, default=None, until the data changes)
+        * max_bytes: size of the folder, the least recently read results are deleted above it
+          (int, default=None, no limit)
+        * classes: classes whose instances can be shared, besides the json, numpy and pandas
+          types (tuple, default=())
+        * stale: seconds after its last use the folder of another version is deleted
+          (float, default=3600)
+    """
+    def __init__(self, directory, version='0', ttl=None, max_bytes=None, classes=(), stale=3600):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.classes = tuple(classes)
+        self.decode = decoder(self.classes)
+        self.stale = stale
+        self.hits = self.misses = self.writes = self.evictions = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            os.chmod(directory, 0o700)
+        check_folder(directory)
+        self.set_version(version)
+
+    def set_version(self, version):
+        """ the results of the other versions of the data are deleted once they are stale """
+        self.version = str(version)
+        self.folder = os.path.join(self.directory, self.version)
+        os.makedirs(self.folder, mode=0o700, exist_ok=True)
+        self.remove_stale_versions()
+
+    def last_use(self, folder):
+        """ last time a worker read or wrote a result of the folder """
+        times = [os.stat(folder).st_mtime]
+        for entry in os.scandir(folder):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            times += [stat.st_atime, stat.st_mtime]
+        return max(times)
+
+    def remove_stale_versions(self):
+        limit = time.time() - self.stale
+        for entry in os.scandir(self.directory):
+            if entry.name == self.version or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if self.last_use(entry.path) < limit:
+                    self.remove_folder(entry.path)
+            except OSError:
+                # deleted meanwhile by another worker
+                pass
+
+    @staticmethod
+    def remove_folder(folder):
+        for entry in os.scandir(folder):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(folder)
+        except OSError:
+            # written meanwhile by a worker still on this version
+            pass
+
+    def path(self, key):
+        return os.path.join(self.folder, hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest() + SUFFIX)
+
+    def get(self, key, default=None):
+        path = self.path(key)
+        try:
+            if self.ttl is not None and time.time() - os.stat(path).st_mtime > self.ttl:
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f, object_hook=self.decode)
+        except (OSError, ValueError, KeyError, TypeError):
+            # missing, expired, or not written by this cache
+            self.misses += 1
+            return default
+        self.hits += 1
+        # the access time orders the eviction, the modification time the ttl
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """ write the result to a temporary file of the folder, then rename it over the key """
+        try:
+            encoded = json.dumps(encode(value, self.classes), separators=(',', ':'))
+        except (TypeError, ValueError):
+            # a type the cache does not share: the result is computed by every worker
+            return
+        try:
+            os.makedirs(self.folder, mode=0o700, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        except OSError:
+            # folder deleted by a new version or disk full: the result is just not shared
+            return
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                f.write(encoded)
+            os.replace(temporary, self.path(key))
+        except BaseException as error:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            if isinstance(error, OSError):
+                return
+            raise
+        self.writes += 1
+        if self.max_bytes is not None:
+            self.evict()
+
+    def lock(self, path):
+        """ open and lock the lock file of path, the file it holds is the one at path (not removed meanwhile) """
+        while True:
+            lock = open(path, 'w')
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.fstat(lock.fileno()).st_ino == os.stat(path).st_ino:
+                    return lock
+            except OSError:
+                pass
+            # removed by the worker which held it: lock the new file
+            lock.close()
+
+    def get_or_compute(self, key, function, *args):
+        """ the cached result, or function(*args) computed by one worker while the others wait """
+        value = self.get(key, KeyError)
+        if value is not KeyError:
+            return value
+        if fcntl is None:
+            value = function(*args)
+            self.set(key, value)
+            return value
+        os.makedirs(self.folder, mode=0o700, exist_ok=True)
+        lock_path = self.path(key)[:-len(SUFFIX)] + '.lock'
+        lock = self.lock(lock_path)
+        try:
+            # computed by another worker while this one waited for the lock
+            value = self.get(key, KeyError)
+            if value is KeyError:
+                value = function(*args)
+                self.set(key, value)
+        finally:
+            # removed while locked: the waiting workers lock a new file and read the result
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+            lock.close()
+        return value
+
+    def entries(self):
+        """ (access time, modification time, bytes, path) of the results of the current version """
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """
+            delete the expired results, then the least recently read ones down to max_bytes, the
+            temporary and lock files older than stale seconds and the stale versions
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        entries = sorted(self.entries())
+        size = sum(entry[2] for entry in entries)
+        for _, modified, bytes_, path in entries:
+            expired = self.ttl is not None and now - modified > self.ttl
+            if not expired and (max_bytes is None or size <= max_bytes):
+                continue
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except OSError:
+                pass
+            size -= bytes_
+        for entry in os.scandir(self.folder):
+            try:
+                if entry.name.endswith(TEMPORARY_SUFFIXES) and now - entry.stat().st_mtime > self.stale:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+        self.remove_stale_versions()
+
+    def clear(self):
+        """ delete the results and the temporary files of the current version """
+        for entry in os.scandir(self.folder):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        entries = self.entries()
+        return dict(directory=self.directory, version=self.version, entries=len(entries),
+            bytes=sum(entry[2] for entry in entries), max_bytes=self.max_bytes, ttl=self.ttl,
+            hits=self.hits, misses=self.misses, writes=self.writes, evictions=self.evictions)
@@ -0,0 +1,88 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                      FIGURE SERIALIZER
+   -------------------------------------------------------------------------------------------
+   Plotly's json encoder tries a chain of encoders on every numpy / pandas object of a figure,
+   then decodes and re-encodes the whole payload to replace NaN values. A figure prepared here
+   only holds json native types, each array being converted in one call (ndarray.tolist) or
+   sent as a base64 typed array built straight from the numpy buffer, so the C json encoder
+   does all the work.
+
+   Typed arrays ({"dtype": "f8", "bdata": "..."}) are only understood by plotly.js >= 2.28
+   (dash >= 2.15), keep typed=False with older front ends.
+'''
+import base64
+
+import numpy as np
+
+# dtypes decoded by plotly.js, the other numeric dtypes are cast to the nearest one
+TYPED_DTYPES = {'f8', 'f4', 'i4', 'u4', 'i2', 'u2', 'i1', 'u1'}
+
+
+def typed_array(array):
+    """ numeric numpy array -> plotly.js typed array spec """
+    if array.dtype.kind == 'b':
+        array = array.astype('u1')
+    elif array.dtype.kind in 'iu' and array.dtype.itemsize == 8:
+        info = np.iinfo('i4')
+        fits = array.size == 0 or (array.min() >= info.min and array.max() <= info.max)
+        array = array.astype('i4' if fits else 'f8')
+    dtype = array.dtype.newbyteorder('<')
+    array = np.ascontiguousarray(array, dtype=dtype)
+    spec = {
+        'dtype': f'{dtype.kind}{dtype.itemsize}',
+        'bdata': base64.b64encode(array.data).decode('ascii')
+    }
+    if array.ndim > 1:
+        spec['shape'] = ','.join(str(n) for n in array.shape)
+    return spec
+
+
+def encode_array(array, typed=False):
+    """ numpy array -> list of json native values (or typed array spec) """
+    kind = array.dtype.kind
+    if typed and kind in 'biuf' and np.isfinite(array).all():
+        spec = typed_array(array)
+        if spec['dtype'] in TYPED_DTYPES:
+            return spec
+    if kind == 'f' and not np.isfinite(array).all():
+        # NaN and inf are not valid json
+        return np.where(np.isfinite(array), array, None).tolist()
+    if kind == 'O' and array.size and hasattr(array.flat[0], 'isoformat'):
+        # plotly stores the dates of a validated figure as datetime objects
+        try:
+            array = array.astype('datetime64[us]')
+            kind = 'M'
+        except (TypeError, ValueError):
+            return [value.isoformat() for value in array.tolist()]
+    if kind == 'M':
+        return np.datetime_as_string(array, unit='auto').tolist()
+    return array.tolist()
+
+
+def prepare_figure(obj, typed=False):
+    """
+        convert a figure (plotly figure, dict, list...) into json native types,
+        arrays and pandas objects are converted as a whole, never element by element
+    """
+    if isinstance(obj, dict):
+        return {key: prepare_figure(value, typed) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [prepare_figure(value, typed) for value in obj]
+    if isinstance(obj, float):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, (str, int, type(None))):
+        return obj
+    if isinstance(obj, np.ndarray):
+        return encode_array(obj, typed)
+    if isinstance(obj, np.generic):
+        return prepare_figure(obj.item(), typed)
+    if hasattr(obj, 'to_plotly_json'):
+        # plotly figure or graph object
+        return prepare_figure(obj.to_plotly_json(), typed)
+    if hasattr(obj, 'to_numpy'):
+        # pandas Series / Index
+        return encode_array(obj.to_numpy(), typed)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    return obj
@@ -0,0 +1,65 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                   STYLING AND FORMATTING
+   -------------------------------------------------------------------------------------------
+   Colors and labels of the figures computed for a whole column at once, used by the
+   dashboard and the report instead of a python function applied to every row:
+
+        * threshold_colors: one color above a threshold, another one below (red_or_green)
+        * palette_codes, palette_colors: position or color of categories in a palette
+        * millify: 1234567 -> '1.2M'
+        * percent_labels: 0.583 -> '58%'
+
+   NaN and inf are labelled '-' (missing), not formatted.
+
+   Every function accepts a scalar, a list, an array or a series and returns a numpy array,
+   millify and percent_labels return a str for a scalar.
+'''
+import numpy as np
+import pandas as pd
+
+
+def threshold_colors(values, threshold, above, below):
+    """ above where values >= threshold, below elsewhere (NaN included) """
+    return np.where(np.asarray(values, dtype=float) >= threshold, above, below).astype(object)
+
+
+def palette_codes(values, palette):
+    """ position of each value in the keys of palette, -1 for a value out of the palette """
+    return pd.Index(list(palette)).get_indexer(np.asarray(values))
+
+
+def palette_colors(values, palette, default='grey'):
+    """ color of each value in palette (dict: value -> color), default for the other values """
+    colors = np.append(np.array(list(palette.values()), dtype=object), default)
+    # -1 (out of the palette) picks the default appended last
+    return colors[palette_codes(values, palette)]
+
+
+def millify(values, missing='-'):
+    """
+        1234 -> '1.2K', 1234567 -> '1.2M', values up to 999 are written as they are (an int stays
+        an int), missing for NaN and inf
+    """
+    # object array: the ints of a list mixing ints and floats are not turned into floats
+    original = np.asarray(values, dtype=object)
+    numbers = original.astype(float)
+    finite = np.isfinite(numbers)
+    big = finite & (numbers > 1e6 - 1)
+    thousands = finite & ~big & (numbers > 999)
+    plain = finite & (numbers <= 999)
+    labels = np.full(original.shape, missing, dtype=object)
+    labels[big] = np.char.mod('%.1fM', numbers[big] / 1e6)
+    labels[thousands] = np.char.mod('%.1fK', numbers[thousands] / 1e3)
+    labels[plain] = np.char.mod('%s', original[plain])
+    return labels[()] if labels.ndim == 0 else labels
+
+
+def percent_labels(values, scale=100, decimals=0, missing='-'):
+    """ values * scale rounded to decimals, with a '%' sign: 0.583 -> '58%', missing for NaN and inf """
+    rounded = np.round(np.asarray(values, dtype=float) * scale, decimals)
+    finite = np.isfinite(rounded)
+    labels = np.full(rounded.shape, missing, dtype=object)
+    # %.0f of -0.4 is '-0'
+    labels[finite] = np.char.mod(f'%.{decimals}f%%', rounded[finite] + 0.0)
+    return labels[()] if labels.ndim == 0 else labels
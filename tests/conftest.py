@@ -0,0 +1,113 @@
+'''
+   unit tests of the dashboard, the report and their shared modules, from the root of the project:
+        python -m pytest tests
+'''
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the apps import their modules by name (figure_template, metrics...) and the shared package from the root
+for folder in (os.path.join(ROOT, 'rapport'), os.path.join(ROOT, 'dashboard'), ROOT):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+
+
+@pytest.fixture(scope='session')
+def orders_csv(tmp_path_factory):
+    """ clean_data.csv of 30 000 generated orders over 2018 and 2019 """
+    from shared.generate_data import generate_orders, write_chunks
+    path = str(tmp_path_factory.mktemp('orders') / 'clean_data.csv')
+    write_chunks(generate_orders(30_000, '2018-01-01', '2019-12-31', seed=7, chunk_size=10_000), path)
+    return path
+
+
+@pytest.fixture(scope='session')
+def orders(orders_csv):
+    """ the generated orders as the report reads them, never modified by a test """
+    return pd.read_csv(orders_csv)
+
+
+@pytest.fixture(scope='session')
+def summed_orders(orders):
+    """ the orders summed per keys of the report, as rapport/app.py sum_orders """
+    from shared.chunked import PartialAggregate
+    keys = ['Period', 'Month_num', 'Month', 'Hour', 'City', 'lat', 'long', 'Cat', 'Product', 'Price Each']
+    period = lambda data: data.assign(Period=data['Order Date'].str[:7])
+    return PartialAggregate(keys, ['Sales', 'Quantity Ordered'], period).add(orders).result(sort=False)
+
+
+@pytest.fixture(scope='session')
+def order_files(orders, tmp_path_factory):
+    """ the generated orders split as orders/*.csv, one file per month """
+    folder = tmp_path_factory.mktemp('split')
+    paths = []
+    for period, rows in orders.groupby(orders['Order Date'].str[:7]):
+        paths.append(str(folder / f'{period}.csv'))
+        rows.to_csv(paths[-1], index=False)
+    return paths
+
+
+@pytest.fixture(scope='session')
+def sales():
+    """ dashboard/sales_summary.csv, never modified by a test """
+    return pd.read_csv(os.path.join(ROOT, 'dashboard', 'sales_summary.csv'), parse_dates=['Date'])
+
+
+@pytest.fixture(scope='session')
+def sales_dataset(sales, tmp_path_factory):
+    """ folder of sales_summary.csv written as one parquet partition per month, needs pyarrow """
+    pytest.importorskip('pyarrow')
+    from shared.partitions import write_partitions
+    root = str(tmp_path_factory.mktemp('sales_dataset'))
+    write_partitions(sales, root, 'Date')
+    return root
+
+
+@pytest.fixture(scope='session')
+def city_info():
+    """ rapport/data/city_info.csv, one row per city, never modified by a test """
+    return pd.read_csv(os.path.join(ROOT, 'rapport', 'data', 'city_info.csv'))
+
+
+@pytest.fixture(scope='session')
+def dashboard_app():
+    """ dashboard/app.py loaded as dashboard_app, without the warm up, skipped without the fr_FR locale """
+    import importlib.util
+    import locale
+    os.environ['WARM_UP'] = '0'
+    spec = importlib.util.spec_from_file_location('dashboard_app', os.path.join(ROOT, 'dashboard', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['dashboard_app'] = module
+    try:
+        spec.loader.exec_module(module)
+    except locale.Error:
+        del sys.modules['dashboard_app']
+        pytest.skip('the dashboard needs the fr_FR locale')
+    return module
+
+
+@pytest.fixture(scope='session')
+def rapport_app():
+    """ rapport/app.py loaded as rapport_app, from its folder: the mapbox token is read at import """
+    import importlib.util
+    pytest.importorskip('dash_bootstrap_components')
+    spec = importlib.util.spec_from_file_location('rapport_app', os.path.join(ROOT, 'rapport', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['rapport_app'] = module
+    cwd = os.getcwd()
+    os.chdir(os.path.join(ROOT, 'rapport'))
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+@pytest.fixture
+def client(dashboard_app, monkeypatch):
+    """ test client of the dashboard server, run from its folder: the data paths are relative """
+    monkeypatch.chdir(os.path.join(ROOT, 'dashboard'))
+    return dashboard_app.server.test_client()
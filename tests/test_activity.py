@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from activity import ActivityTensor
+
+
+def with_dates(orders):
+    orders = orders.copy()
+    dates = pd.to_datetime(orders['Order Date'])
+    orders['Period'] = dates.dt.strftime('%Y-%m')
+    orders['Weekday'] = dates.dt.weekday
+    orders['Hour'] = dates.dt.hour
+    return orders
+
+
+def test_weekday_hour_heatmap(orders):
+    tensor = ActivityTensor(orders)
+    expected = with_dates(orders).pivot_table('Quantity Ordered', 'Weekday', 'Hour', aggfunc='sum', fill_value=0)
+    heatmap = tensor.select()
+    assert heatmap.shape == (7, 24)
+    assert np.allclose(heatmap.loc[expected.index, expected.columns], expected)
+    assert tensor.select(measure='orders').to_numpy().sum() == len(orders)
+
+
+def test_keep_labels_or_masks(orders):
+    tensor = ActivityTensor(orders)
+    dated = with_dates(orders)
+    rows = dated[(dated['Period'] == '2019-03') & dated['City'].isin(['Boston', 'Austin'])]
+    by_city = tensor.select({'Period': ['2019-03'], 'City': ['Boston', 'Austin']}, by=['City'])
+    assert np.allclose(by_city.sort_index(), rows.groupby('City')['Quantity Ordered'].sum().sort_index())
+    mask = tensor.labels['Period'].str.startswith('2019')
+    by_hour = tensor.select({'Period': mask}, measure='orders', by=['Hour'])
+    assert np.array_equal(by_hour.to_numpy(), np.bincount(dated.loc[dated['Period'] >= '2019', 'Hour'], minlength=24))
+
+
+def test_axes_are_ordered_as_asked(orders):
+    tensor = ActivityTensor(orders)
+    pd.testing.assert_frame_equal(tensor.select(by=['Hour', 'Weekday']), tensor.select().T)
+
+
+def test_add_in_chunks_is_the_same_as_at_once(orders):
+    tensor = ActivityTensor()
+    # the second chunk brings new months and cities to the axes
+    first = orders[orders['Order Date'] < '2018-07']
+    tensor.add(first[first['City'] != 'Boston']).add(orders.drop(first[first['City'] != 'Boston'].index))
+    whole = ActivityTensor(orders)
+    for measure in ActivityTensor.measures:
+        a = tensor.select(measure=measure, by=['Period', 'City'])
+        b = whole.select(measure=measure, by=['Period', 'City'])
+        pd.testing.assert_frame_equal(a.loc[b.index, b.columns], b)
+
+
+def test_subset_keeps_the_original(orders):
+    tensor = ActivityTensor(orders)
+    total = tensor.select().to_numpy().sum()
+    subset = tensor.subset({'Cat': [tensor.labels['Cat'][0]]})
+    assert list(subset.labels['Cat']) == [tensor.labels['Cat'][0]]
+    assert subset.select().to_numpy().sum() == tensor.select({'Cat': [tensor.labels['Cat'][0]]}).to_numpy().sum()
+    assert tensor.select().to_numpy().sum() == total and len(tensor.labels['Cat']) > 1
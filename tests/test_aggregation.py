@@ -0,0 +1,66 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregation import Cube, aggregate
+from metrics import registry, metrics, columns
+
+
+def month_sums(sales, month, by):
+    rows = sales[sales['Date'].dt.month == month]
+    return rows.groupby(by)[columns()].sum()
+
+
+def test_month_by_city_and_category(sales):
+    cube = Cube(sales)
+    cells = cube.month(3)
+    for dimension in ('City', 'Cat'):
+        expected = month_sums(sales, 3, dimension)
+        pd.testing.assert_frame_equal(cube.by(cells, dimension), expected, check_names=False)
+
+
+def test_filters_keep_only_their_values(sales):
+    cube = Cube(sales)
+    cells = cube.month(5, {'City': ['Boston', 'Austin'], 'Cat': 'Smartphone'})
+    rows = sales[sales['City'].isin(['Boston', 'Austin']) & (sales['Cat'] == 'Smartphone')]
+    by_city = cube.by(cells, 'City')
+    pd.testing.assert_frame_equal(by_city.loc[['Austin', 'Boston']], month_sums(rows, 5, 'City'), check_names=False)
+    # the other cities are still listed, with zeros: the bars of the chart keep their place
+    assert len(by_city) == sales['City'].nunique() and by_city.drop(['Austin', 'Boston']).eq(0).all().all()
+
+
+def test_ratio(sales):
+    cube = Cube(sales)
+    cells = cube.month(2)
+    metric = metrics['profit_2020']
+    ratio = cube.ratio(cells, metric)
+    assert ratio.shape == (len(cube.labels['City']), len(cube.labels['Cat']))
+    boston, phones = cube.labels['City'].get_loc('Boston'), cube.labels['Cat'].get_loc('Smartphone')
+    rows = sales[(sales['Date'].dt.month == 2) & (sales['City'] == 'Boston') & (sales['Cat'] == 'Smartphone')]
+    assert np.isclose(ratio[boston, phones], rows[metric.key].sum() / rows[metric.target].sum())
+
+
+def test_a_missing_cell_is_zero_not_missing(sales):
+    # a city without any washing machine sold in a day still has its cell
+    cube = Cube(sales.drop(sales.index[(sales['City'] == 'Austin') & (sales['Cat'] == 'Machine à laver')]))
+    austin, machines = cube.labels['City'].get_loc('Austin'), cube.labels['Cat'].get_loc('Machine à laver')
+    assert (cube.values[:, austin, machines] == 0).all()
+    assert cube.values.shape[-1] == len(columns(registry))
+
+
+def test_aggregate(sales):
+    aggregates = aggregate(sales, datetime.date(2019, 5, 23))
+    pd.testing.assert_frame_equal(aggregates['by_month'], sales.groupby(sales['Date'].dt.month.rename('month'))[columns()].sum())
+    to_date = sales[sales['Date'] <= '2019-05-23']
+    assert np.isclose(aggregates['to_date_by_month'].loc[5, 'sales_2020'], to_date.loc[to_date['Date'].dt.month == 5, 'sales_2020'].sum())
+    assert (aggregates['to_date_by_month'].loc[6:] == 0).all().all()
+    assert list(aggregates['monthly'].index) == list(pd.date_range('2019-01-01', periods=12, freq='MS'))
+
+
+def test_series_of_the_filtered_cells(sales):
+    cube = Cube(sales)
+    series = cube.series({'Cat': ['Ordinateur', 'Smartphone']})
+    rows = sales[sales['Cat'].isin(['Ordinateur', 'Smartphone'])]
+    pd.testing.assert_frame_equal(series, rows.groupby('Date')[columns()].sum(), check_names=False, check_freq=False)
+    assert np.allclose(cube.series().sum(), sales[columns()].sum())
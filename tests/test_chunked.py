@@ -0,0 +1,65 @@
+import pandas as pd
+
+from shared.chunked import PartialAggregate, read_chunks, aggregate_chunks
+
+KEYS = ['City', 'Cat']
+VALUES = ['Sales', 'Quantity Ordered']
+
+
+def expected(orders, keys=KEYS, values=VALUES):
+    return orders.groupby(keys)[values].sum().reset_index()
+
+
+def chunks(orders, size):
+    return [orders.iloc[start:start + size] for start in range(0, len(orders), size)]
+
+
+def test_chunks_sum_like_one_group_by(orders):
+    sums = PartialAggregate(KEYS, VALUES)
+    aggregate_chunks(chunks(orders, 4096), [sums])
+    pd.testing.assert_frame_equal(sums.result(), expected(orders))
+    assert sums.rows == len(orders)
+
+
+def test_read_chunks_of_a_csv(orders, orders_csv):
+    sums = PartialAggregate(KEYS, VALUES)
+    aggregate_chunks(read_chunks(orders_csv, chunk_size=7000), [sums])
+    pd.testing.assert_frame_equal(sums.result(), expected(orders))
+
+
+def test_merge_of_two_sources(orders):
+    first, second = orders.iloc[:10_000], orders.iloc[10_000:]
+    left = PartialAggregate(KEYS, VALUES).add(first)
+    left.merge(PartialAggregate(KEYS, VALUES).add(second))
+    pd.testing.assert_frame_equal(left.result(), expected(orders))
+    assert left.rows == len(orders)
+
+
+def test_transform_adds_keys(orders):
+    period = lambda chunk: chunk.assign(Period=chunk['Order Date'].str[:7])
+    sums = PartialAggregate(['Period'], ['Sales'], transform=period)
+    aggregate_chunks(chunks(orders, 5000), [sums])
+    pd.testing.assert_frame_equal(sums.result(), expected(period(orders), ['Period'], ['Sales']))
+
+
+def test_empty_result():
+    sums = PartialAggregate(KEYS, ['Sales'])
+    assert list(sums.result().columns) == KEYS + ['Sales']
+    assert sums.result().empty
+
+
+def test_merge_encoded_parts_with_other_categories(orders):
+    # the parts do not know the same cities: the codes are translated to the united categories
+    first, second = orders.iloc[:10_000], orders.iloc[10_000:]
+    second = second[second['City'] != first['City'].iloc[0]]
+    parts = [PartialAggregate(KEYS, VALUES).add(rows).encode() for rows in (second, first)]
+    parts.append(PartialAggregate(KEYS, VALUES).encode())
+    merged = PartialAggregate(KEYS, VALUES).merge_encoded(parts)
+    pd.testing.assert_frame_equal(merged.result(), expected(pd.concat([first, second])), check_dtype=False)
+    assert merged.rows == len(first) + len(second)
+
+
+def test_merge_encoded_of_a_single_key(orders):
+    sums = PartialAggregate(['City'], ['Sales']).add(orders)
+    merged = PartialAggregate(['City'], ['Sales']).merge_encoded([sums.encode()])
+    pd.testing.assert_frame_equal(merged.result(), sums.result())
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from city_factors import pearson, bootstrap, saturation_fit, analyse_factors, fit_curve, label_offsets
+
+FACTORS = ['pop_2019', 'income_2010', 'ads_budget']
+
+
+def values(city_info):
+    return city_info['Sales'].to_numpy(dtype=float), city_info[FACTORS].to_numpy(dtype=float)
+
+
+def test_pearson_of_every_factor(city_info):
+    y, X = values(city_info)
+    expected = [np.corrcoef(y, x)[0, 1] for x in X.T]
+    assert np.allclose(pearson(y, X), expected)
+
+
+def test_bootstrap_resamples_are_weighted_cities(city_info):
+    y, X = values(city_info)
+    r = bootstrap(y, X, n_boot=5, seed=3)
+    # the same draws, as repeated cities
+    counts = np.random.default_rng(3).multinomial(len(y), np.full(len(y), 1 / len(y)), size=5)
+    for boot, count in zip(r, counts):
+        expected = [np.corrcoef(np.repeat(y, count), np.repeat(x, count))[0, 1] for x in X.T]
+        assert np.allclose(boot, expected)
+
+
+def test_bootstrap_is_seeded(city_info):
+    y, X = values(city_info)
+    assert np.array_equal(bootstrap(y, X, 50, seed=1), bootstrap(y, X, 50, seed=1))
+    assert not np.array_equal(bootstrap(y, X, 50, seed=1), bootstrap(y, X, 50, seed=2))
+
+
+def test_saturation_fit_finds_a_saturating_curve():
+    x = np.linspace(0, 100, 30)
+    b = 100 * np.geomspace(0.02, 10, 60)[25]
+    y = 5 + 3 * (1 - np.exp(-x / b))
+    a, scale, c, r2 = saturation_fit(y, np.column_stack([x, x ** 2]))
+    assert np.isclose(a[0], 3) and np.isclose(scale[0], b) and np.isclose(c[0], 5) and np.isclose(r2[0], 1)
+    assert r2[1] < 1
+
+
+def test_analyse_factors(city_info):
+    result = analyse_factors(city_info, n_boot=200)
+    assert list(result.index) == FACTORS
+    assert (result['n'] == len(city_info)).all()
+    y, X = values(city_info)
+    assert np.allclose(result['pearson'], pearson(y, X))
+    assert (result['pearson_low'] <= result['pearson_high']).all()
+    assert (result['spearman_low'] <= result['spearman']).all() and (result['spearman'] <= result['spearman_high']).all()
+    assert (result['fit_r2'] >= result['linear_r2'] - 1e-9).all()
+    assert set(result['strength']) <= {'Forte corrélation', 'Corrélation modérée', 'Aucune corrélation'}
+    grid, curve = fit_curve(result, 'ads_budget', city_info['ads_budget'])
+    assert grid[0] == city_info['ads_budget'].min() and grid[-1] == city_info['ads_budget'].max()
+    assert np.all(np.diff(curve) * np.sign(result.loc['ads_budget', 'fit_a']) >= 0)
+
+
+def test_analyse_factors_of_two_cities(city_info):
+    result = analyse_factors(city_info.iloc[:2], factors=FACTORS)
+    assert result['pearson'].isna().all() and (result['strength'] == 'Pas assez de villes').all()
+
+
+def test_label_offsets_of_crowded_points():
+    offsets = label_offsets([0, 50, 51, 100])
+    assert offsets[0] is None and offsets[3] is None
+    assert offsets[1] is not None and offsets[2] is not None and offsets[1] != offsets[2]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from downsampling import lttb, min_max
+
+
+@pytest.fixture
+def daily(sales):
+    """ daily sales of 2019, 365 points """
+    series = sales.groupby('Date')['sales_2019'].sum()
+    return series.index.to_numpy(), series.to_numpy()
+
+
+def test_lttb_keeps_n_out_sorted_points_with_both_ends(daily):
+    x, y = daily
+    kept = lttb(x, y, 100)
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_a_peak(daily):
+    x, y = daily
+    y = y.copy()
+    y[200] = 10 * y.max()
+    assert 200 in lttb(x, y, 50)
+
+
+def test_lttb_of_dates_like_numbers(daily):
+    x, y = daily
+    assert np.array_equal(lttb(x, y, 80), lttb(np.arange(len(x)), y, 80))
+
+
+def test_nothing_to_reduce(daily):
+    x, y = daily
+    assert np.array_equal(lttb(x[:10], y[:10], 10), np.arange(10))
+    assert np.array_equal(lttb(x, y, 2), np.arange(len(x)))
+    assert np.array_equal(min_max(y[:10], 20), np.arange(10))
+
+
+def test_min_max_keeps_every_extreme(daily):
+    _, y = daily
+    kept = min_max(y, 60)
+    assert len(kept) <= 60
+    assert kept[0] == 0 and kept[-1] == len(y) - 1
+    assert (np.diff(kept) > 0).all()
+    assert np.argmax(y) in kept and np.argmin(y) in kept
@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from export import iter_chunks, rechunk, csv_chunks, parquet_chunks, content_disposition
+
+COLUMNS = ['Date', 'City', 'Cat', 'sales_2020', 'sales_target']
+
+
+@pytest.fixture
+def rows(sales):
+    """ positions of the rows of March, shuffled """
+    rows = np.flatnonzero(sales['Date'].dt.month == 3)
+    return np.random.default_rng(0).permutation(rows)
+
+
+def expected(sales, rows):
+    return sales.iloc[np.sort(rows)][COLUMNS].reset_index(drop=True)
+
+
+def test_chunks_follow_the_rows_in_order(sales, rows):
+    chunks = list(iter_chunks(sales, rows, COLUMNS, 100))
+    assert [len(chunk) for chunk in chunks[:-1]] == [100] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= 100
+    pd.testing.assert_frame_equal(pd.concat(chunks).reset_index(drop=True), expected(sales, rows))
+
+
+def test_rechunk_cuts_every_frame(sales):
+    chunks = list(rechunk([sales.iloc[:250], sales.iloc[250:300]], 100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50, 50]
+    pd.testing.assert_frame_equal(pd.concat(chunks), sales.iloc[:300])
+
+
+def test_csv_is_the_header_then_one_piece_per_chunk(sales, rows):
+    pieces = list(csv_chunks(iter_chunks(sales, rows, COLUMNS, 100), COLUMNS))
+    assert pieces[0] == (','.join(COLUMNS) + '\n').encode()
+    assert len(pieces) == 1 + -(-len(rows) // 100)
+    data = pd.read_csv(io.BytesIO(b''.join(pieces)), parse_dates=['Date'])
+    pd.testing.assert_frame_equal(data, expected(sales, rows))
+
+
+def test_csv_of_no_rows_is_the_header():
+    assert b''.join(csv_chunks([], COLUMNS)) == (','.join(COLUMNS) + '\n').encode()
+
+
+def test_parquet_has_one_row_group_per_chunk(sales, rows):
+    pq = pytest.importorskip('pyarrow.parquet')
+    pieces = list(parquet_chunks(iter_chunks(sales, rows, COLUMNS, 100), COLUMNS, sales.iloc[:1]))
+    parquet = pq.ParquetFile(io.BytesIO(b''.join(pieces)))
+    assert parquet.num_row_groups == -(-len(rows) // 100)
+    pd.testing.assert_frame_equal(parquet.read().to_pandas(), expected(sales, rows), check_dtype=False)
+
+
+def test_export_route_streams_the_view(client, sales):
+    response = client.get('/_export?metric=sales_2020&month=3&City=Boston&format=csv')
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'text/csv'
+    data = pd.read_csv(io.BytesIO(response.get_data()), parse_dates=['Date'])
+    rows = np.flatnonzero((sales['Date'].dt.month == 3) & (sales['City'] == 'Boston'))
+    pd.testing.assert_frame_equal(data, expected(sales, rows))
+
+
+def test_export_route_reads_the_partitions_of_the_view(client, dashboard_app, sales, sales_dataset, monkeypatch):
+    monkeypatch.setattr(dashboard_app, 'sales_path', sales_dataset)
+    response = client.get('/_export?metric=sales_2020&month=3&City=Boston&format=csv')
+    data = pd.read_csv(io.BytesIO(response.get_data()), parse_dates=['Date'])
+    rows = np.flatnonzero((sales['Date'].dt.month == 3) & (sales['City'] == 'Boston'))
+    pd.testing.assert_frame_equal(data, expected(sales, rows))
+
+
+def test_content_disposition_of_any_name():
+    header = content_disposition('sales_2020_Mar_TV & Moniteur.csv')
+    assert header.startswith('attachment; filename="sales_2020_Mar_TV_Moniteur.csv"')
+    assert "filename*=UTF-8''sales_2020_Mar_TV%20%26%20Moniteur.csv" in header
+
+
+@pytest.mark.parametrize('query', ['metric=unknown', 'format=xlsx', 'month=13', 'month=0', 'month=march', 'City=Nowhere', 'Cat=Machine'])
+def test_export_route_rejects_unknown_values(client, query):
+    assert client.get('/_export?' + query).status_code == 400
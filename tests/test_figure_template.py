@@ -0,0 +1,41 @@
+import plotly.graph_objects as go
+
+from figure_template import FigureTemplate, merge
+
+
+def make_template():
+    figure = go.Figure(go.Bar(orientation='h', marker=dict(color='grey'), name='target'))
+    figure.add_trace(go.Bar(orientation='h', name='actual'))
+    figure.update_layout(annotations=[dict(text='title', x=0), dict(text='', x=1, font=dict(size=20))], height=300)
+    return FigureTemplate(figure)
+
+
+def test_fill_adds_the_data_of_a_request():
+    template = make_template()
+    figure = template.fill(
+        traces=[dict(x=[1, 2], y=['a', 'b'])],
+        layout=dict(annotations=[dict(text='May'), dict(text='58%', font=dict(color='red'))]))
+    assert figure['data'][0]['x'] == [1, 2] and figure['data'][0]['marker'] == {'color': 'grey'}
+    assert figure['data'][1]['name'] == 'actual' and 'x' not in figure['data'][1]
+    # the annotations are merged item by item, their static properties are kept
+    assert figure['layout']['annotations'][0] == dict(text='May', x=0)
+    assert figure['layout']['annotations'][1]['font'] == dict(size=20, color='red')
+    assert figure['layout']['height'] == 300
+
+
+def test_the_template_is_never_modified():
+    template = make_template()
+    template.fill(traces=[dict(x=[1], marker=dict(color='red'))], layout=dict(annotations=[dict(text='a'), dict(text='b')]))
+    assert 'x' not in template.data[0] and template.data[0]['marker'] == {'color': 'grey'}
+    assert [a['text'] for a in template.layout['annotations']] == ['title', '']
+    # without a layout update the frozen layout is shared, not copied
+    assert template.fill()['layout'] is template.layout
+
+
+def test_merge():
+    static = {'a': {'b': 1, 'c': [1, 2]}, 'd': [{'e': 1}, {'e': 2}]}
+    merged = merge(static, {'a': {'b': 2}, 'd': [{'f': 1}, {}], 'g': 3})
+    assert merged == {'a': {'b': 2, 'c': [1, 2]}, 'd': [{'e': 1, 'f': 1}, {'e': 2}], 'g': 3}
+    assert merged['a']['c'] is static['a']['c']
+    # a list of another length replaces the static one
+    assert merge([1, 2], [3]) == [3]
@@ -0,0 +1,56 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from shared.generate_data import generate_orders, generate_summary, write_chunks, sales_coef, profit_coef, CATEGORIES
+
+CLEAN_DATA_COLUMNS = ['Order ID', 'Product', 'Quantity Ordered', 'Price Each', 'Order Date', 'Month', 'Month_num',
+    'Day', 'Hour', 'Sales', 'City', 'lat', 'long', 'Cat']
+
+
+def test_orders_like_clean_data(orders):
+    assert list(orders.columns) == CLEAN_DATA_COLUMNS and len(orders) == 30_000
+    np.testing.assert_allclose(orders['Sales'], orders['Quantity Ordered'] * orders['Price Each'])
+    dates = pd.to_datetime(orders['Order Date'])
+    assert dates.min() >= pd.Timestamp('2018-01-01') and dates.max() < pd.Timestamp('2020-01-01')
+    assert (dates.dt.month == orders['Month_num']).all() and (dates.dt.hour == orders['Hour']).all()
+    assert set(orders['Cat']) <= set(CATEGORIES)
+
+
+def test_an_order_of_several_products_has_one_date_and_city(orders):
+    grouped = orders.groupby('Order ID')
+    assert (grouped['Order Date'].nunique() == 1).all() and (grouped['City'].nunique() == 1).all()
+    assert (grouped.size() > 1).any()
+
+
+def test_seeded():
+    first = pd.concat(generate_orders(5000, '2019-01-01', '2019-03-31', seed=1, chunk_size=2000))
+    again = pd.concat(generate_orders(5000, '2019-01-01', '2019-03-31', seed=1, chunk_size=2000))
+    other = pd.concat(generate_orders(5000, '2019-01-01', '2019-03-31', seed=2, chunk_size=2000))
+    pd.testing.assert_frame_equal(first, again)
+    assert not first['Order Date'].equals(other['Order Date'])
+
+
+def test_more_cities_and_products():
+    orders = pd.concat(generate_orders(5000, '2019-01-01', '2019-01-31', n_cities=20, n_products=40))
+    assert orders['City'].nunique() == 20 and orders['Product'].nunique() == 40
+
+
+def test_summary_targets():
+    summary = pd.concat(generate_summary('2019-01-01', '2019-12-31', chunk_days=100))
+    assert len(summary) == 365 * 9 * len(CATEGORIES)
+    np.testing.assert_allclose(summary['sales_target'], summary['sales_2019'] * sales_coef)
+    np.testing.assert_allclose(summary['profit_target'], summary['sales_target'] * profit_coef)
+    # the current year is only known up to the dashboard date
+    future = summary['Date'].dt.date > datetime.date(2019, 5, 23)
+    assert (summary.loc[future, ['sales_2020', 'profit_2020']] == 0).all().all()
+    assert (summary.loc[~future, 'sales_2020'] > 0).all()
+
+
+def test_write_chunks_csv(tmp_path):
+    path = str(tmp_path / 'summary.csv')
+    rows = write_chunks(generate_summary('2019-01-01', '2019-02-28', chunk_days=20), path)
+    written = pd.read_csv(path)
+    assert rows == len(written) == 59 * 9 * len(CATEGORIES)
+    assert list(written.columns) == ['Date', 'City', 'Cat', 'sales_2019', 'sales_target', 'sales_2020', 'profit_target', 'profit_2020']
@@ -0,0 +1,42 @@
+import flask
+
+from shared.http_cache import create_server, enable_etags
+
+
+def make_client():
+    server = create_server(__name__)
+    enable_etags(server)
+    bodies = {'layout': 'layout', 'outputs': 'outputs'}
+
+    @server.route('/_dash-layout')
+    def layout():
+        return flask.jsonify(bodies['layout'])
+
+    @server.route('/_dash-update-component', methods=['POST'])
+    def update():
+        return flask.jsonify(bodies['outputs'])
+
+    return server.test_client(), bodies
+
+
+def test_layout_is_revalidated():
+    client, bodies = make_client()
+    response = client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and 'Accept-Encoding' in response.headers['Vary']
+    assert client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+    # the same body for another encoding, or another body: a new tag
+    assert client.get('/_dash-layout', headers={'Accept-Encoding': 'br', 'If-None-Match': etag}).status_code == 200
+    bodies['layout'] = 'new layout'
+    assert client.get('/_dash-layout', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 200
+
+
+def test_callbacks_are_tagged_on_their_body():
+    client, bodies = make_client()
+    first = client.post('/_dash-update-component')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-store'
+    again = client.post('/_dash-update-component', headers={'If-None-Match': etag})
+    assert again.status_code == 200 and again.headers['ETag'] == etag
+    bodies['outputs'] = 'other outputs'
+    assert client.post('/_dash-update-component').headers['ETag'] != etag
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from shared.chunked import PartialAggregate
+from shared.ingest import ingest, pool_context
+from activity import ActivityTensor
+
+
+def make_aggregates():
+    return [PartialAggregate(['City', 'Cat'], ['Sales', 'Quantity Ordered']), ActivityTensor()]
+
+
+def check(aggregates, orders):
+    sums, tensor = aggregates
+    expected = orders.groupby(['City', 'Cat'])[['Sales', 'Quantity Ordered']].sum().reset_index()
+    pd.testing.assert_frame_equal(sums.result(), expected, check_dtype=False)
+    assert sums.rows == len(orders)
+    whole = ActivityTensor(orders)
+    for measure in ActivityTensor.measures:
+        b = whole.select(measure=measure, by=['Period', 'City'])
+        pd.testing.assert_frame_equal(tensor.select(measure=measure, by=['Period', 'City']).loc[b.index, b.columns], b)
+
+
+def test_ingest_in_parallel(orders, order_files):
+    check(ingest(order_files, make_aggregates, chunk_size=1000, max_workers=2), orders)
+
+
+def test_ingest_here(orders, order_files):
+    check(ingest(order_files, make_aggregates, max_workers=1), orders)
+
+
+def test_merge_of_activity_tensors(orders):
+    # the second tensor brings new months to the axes
+    tensor = ActivityTensor(orders.iloc[:5000]).merge(ActivityTensor(orders.iloc[5000:]))
+    whole = ActivityTensor(orders)
+    pd.testing.assert_frame_equal(tensor.select(by=['Period', 'Cat']).sort_index(), whole.select(by=['Period', 'Cat']).sort_index())
+
+
+def test_no_fork_from_a_thread(orders, order_files):
+    # a web server ingests from a request thread, the workers are not forked
+    with ThreadPoolExecutor(1) as threads:
+        assert threads.submit(pool_context).result().get_start_method() != 'fork'
+        assert threading.active_count() > 1 and pool_context().get_start_method() != 'fork'
+        check(threads.submit(ingest, order_files, make_aggregates, max_workers=2).result(), orders)
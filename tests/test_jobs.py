@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from shared.jobs import JobQueue, JobCancelled, background_callback
+
+pytest.importorskip('dash')
+from dash import no_update
+from dash.dependencies import Output, Input
+
+
+def double(job, value):
+    job.progress(1, 1)
+    return value * 2
+
+
+def fail(job, value):
+    return value / 0
+
+
+def blocked(job, event):
+    """ runs until event is set, checking its cancellation """
+    while not event.wait(0.01):
+        job.progress(0, 1)
+    return 'done'
+
+
+def test_identical_jobs_are_shared():
+    queue = JobQueue()
+    event = threading.Event()
+    first = queue.submit(blocked, event)
+    second = queue.submit(blocked, event)
+    assert first is second and first.waiters == 2
+    event.set()
+    assert first.wait(5) and first.state == 'done' and first.result == 'done'
+    # a finished job has no waiter left, a new caller reads its result
+    assert first.waiters == 0
+    assert queue.submit(blocked, event) is first and first.waiters == 0
+
+
+def test_failed_job_reports_its_error_and_is_submitted_again():
+    queue = JobQueue()
+    job = queue.submit(fail, 1)
+    assert job.wait(5) and job.state == 'failed'
+    assert job.error == 'ZeroDivisionError: division by zero'
+    assert queue.find(job.key) is None
+    again = queue.submit(fail, 1)
+    assert again is not job
+    again.wait(5)
+
+
+def test_release_cancels_the_job_nobody_waits_for():
+    queue = JobQueue()
+    event = threading.Event()
+    job = queue.submit(blocked, event)
+    queue.submit(blocked, event)
+    queue.release(job.id)
+    assert not job.cancelled
+    queue.release(job.id)
+    assert job.wait(5) and job.state == 'cancelled'
+    with pytest.raises(JobCancelled):
+        job.progress(1)
+    assert queue.release('unknown') is None
+
+
+def test_invalidate_keeps_the_running_jobs():
+    queue = JobQueue()
+    event = threading.Event()
+    done = queue.submit(double, 1)
+    done.wait(5)
+    running = queue.submit(blocked, event)
+    queue.invalidate()
+    assert queue.get(done.id) is None
+    assert queue.get(running.id) is running and queue.find(running.key) is None
+    assert queue.submit(blocked, event) is not running
+    event.set()
+
+
+class FakeApp:
+    """ records the callbacks instead of registering them in dash """
+    def callback(self, *dependencies):
+        return lambda function: function
+
+
+def make_callback(queue, function):
+    return background_callback(FakeApp(), queue, 'view', [Output('figure', 'figure')], [Input('value', 'value')],
+        error=Output('view_error', 'children'), wait=5)(function)
+
+
+def test_poll_returns_the_outputs_of_the_job():
+    queue = JobQueue()
+    function = make_callback(queue, double)
+    data = function.submit(21, None, None)
+    figure, error, disabled, current = function.update(data, 1, 21, None)
+    assert (figure, error, disabled, current) == (42, None, True, no_update)
+
+
+def test_poll_of_an_unknown_job_submits_it_again():
+    queue = JobQueue()
+    function = make_callback(queue, double)
+    # the job was submitted by another worker, or forgotten after a reload
+    figure, error, disabled, current = function.update({'id': 'unknown'}, 1, 21, None)
+    assert (figure, error, disabled) == (42, None, True)
+    assert len(queue.jobs) == 1
+    # the browser keeps the id of the new job
+    job, = queue.jobs.values()
+    assert current == {'id': job.id, 'for': 'unknown'}
+
+
+def test_poll_of_a_failed_job_shows_its_error():
+    queue = JobQueue()
+    function = make_callback(queue, fail)
+    data = function.submit(1, None, None)
+    figure, error, disabled, current = function.update(data, 1, 1, None)
+    assert (figure, error, disabled) == (no_update, 'ZeroDivisionError: division by zero', True)
+
+
+def test_job_submitted_again_by_the_poll_is_followed_and_released():
+    queue = JobQueue()
+    function = background_callback(FakeApp(), queue, 'view', [Output('figure', 'figure')], [Input('value', 'value')],
+        wait=0)(blocked)
+    event = threading.Event()
+    # another browser waits for the same inputs on this worker
+    other = queue.submit(blocked, event, key=('view', repr([event])))
+    # the job of this browser is unknown here: the poll follows the running job and waits for it
+    *_, current = function.update({'id': 'unknown'}, 1, event, None)
+    assert current == {'id': other.id, 'for': 'unknown'} and other.waiters == 2
+    # the next polls use it without counting this browser twice
+    *_, followed = function.update({'id': 'unknown'}, 2, event, current)
+    assert followed is no_update and other.waiters == 2
+    # a change of the inputs releases the job followed, the other browser still waits for it
+    changed = threading.Event()
+    function.submit(changed, {'id': 'unknown'}, current)
+    assert other.waiters == 1 and not other.cancelled
+    queue.release(other.id)
+    assert other.cancelled
+    event.set()
+    changed.set()
@@ -0,0 +1,14 @@
+from metrics import Metric, registry, metrics, columns
+
+
+def test_registry():
+    assert list(metrics) == [metric.key for metric in registry]
+    assert columns() == ['sales_2020', 'sales_target', 'profit_2020', 'profit_target']
+
+
+def test_format_and_unit_of_the_values():
+    metric = Metric('units', 'units_target', 'Unités', 'Unités', 'Unités', 'units_2019', unit='', format=',d')
+    assert metric.hovertemplate('x') == '%{x:,d}'
+    assert metric.axis() == dict(tickformat=',d', ticksuffix='')
+    assert metrics['sales_2020'].hovertemplate('y') == '%{y:.2s} $'
+    assert metrics['sales_2020'].axis() == dict(tickformat='.2s', ticksuffix=' $')
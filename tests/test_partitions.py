@@ -0,0 +1,79 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+from shared.partitions import PartitionedDataset, METADATA
+
+
+@pytest.fixture
+def metadata_dataset(tmp_path):
+    """ dataset of the metadata only (no parquet file): enough to prune """
+    partitions = [dict(key=f'2019-{month:02d}', path=f'year=2019/month={month:02d}/part-0.parquet', rows=10,
+        min={'Date': f'2019-{month:02d}-01T00:00:00', 'City': city}, max={'Date': f'2019-{month:02d}-28T00:00:00', 'City': city})
+        for month, city in [(1, 'Austin'), (2, 'Boston'), (3, 'Austin')]]
+    with open(tmp_path / METADATA, 'w') as f:
+        json.dump(dict(date_column='Date', columns=['Date', 'City'], partitions=partitions), f)
+    return PartitionedDataset(str(tmp_path))
+
+
+def keys(partitions):
+    return [partition['key'] for partition in partitions]
+
+
+def test_prune_on_ranges(metadata_dataset):
+    assert keys(metadata_dataset.prune()) == ['2019-01', '2019-02', '2019-03']
+    assert keys(metadata_dataset.prune([('2019-02-01', '2019-03-01')])) == ['2019-02']
+    # end excluded
+    assert keys(metadata_dataset.prune([('2019-01-15', '2019-02-01'), ('2019-03-10', '2019-04-01')])) == ['2019-01', '2019-03']
+
+
+def test_prune_on_empty_ranges(metadata_dataset):
+    # a month absent from the data has no range: no partition is read, not all of them
+    assert metadata_dataset.prune(ranges=[]) == []
+    assert metadata_dataset.prune(ranges=[], where={'City': 'Austin'}) == []
+
+
+def test_prune_on_values(metadata_dataset):
+    assert keys(metadata_dataset.prune(where={'City': 'Boston'})) == ['2019-02']
+    assert keys(metadata_dataset.prune(where={'City': ['Austin', 'Nowhere']})) == ['2019-01', '2019-03']
+    assert metadata_dataset.prune(where={'City': 'Nowhere'}) == []
+
+
+def test_write_and_read(sales, sales_dataset):
+    dataset = PartitionedDataset(sales_dataset)
+    assert PartitionedDataset.is_dataset(sales_dataset) and not PartitionedDataset.is_dataset(sales_dataset + '.csv')
+    assert keys(dataset.prune()) == [f'2019-{month:02d}' for month in range(1, 13)]
+    assert dataset.rows == len(sales)
+    pd.testing.assert_frame_equal(dataset.read(), sales, check_dtype=False)
+
+    ranges = [(pd.Timestamp('2019-02-10'), pd.Timestamp('2019-03-05'))]
+    assert keys(dataset.prune(ranges)) == ['2019-02', '2019-03']
+    read = dataset.read(['City', 'sales_2020'], ranges, {'City': 'Boston'})
+    mask = (sales['Date'] >= ranges[0][0]) & (sales['Date'] < ranges[0][1]) & (sales['City'] == 'Boston')
+    pd.testing.assert_frame_equal(read, sales.loc[mask, ['City', 'sales_2020']].reset_index(drop=True), check_dtype=False)
+
+
+def test_read_nothing_keeps_the_columns(sales_dataset):
+    read = PartitionedDataset(sales_dataset).read(['Date', 'sales_2020'], ranges=[])
+    assert read.empty and list(read.columns) == ['Date', 'sales_2020']
+
+
+def test_filtered_views_read_the_partitions_of_their_month(dashboard_app, sales_dataset, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(dashboard_app.__file__))
+    filters = {'City': 'Boston', 'Cat': ['Smartphone', 'Ordinateur']}
+    expected = dashboard_app.view_aggregates(3, filters)
+    monkeypatch.setattr(dashboard_app, 'sales_path', sales_dataset)
+    # neither the whole dataset nor the row index are read
+    monkeypatch.setattr(dashboard_app, 'read_sales', None)
+    monkeypatch.setattr(dashboard_app, 'sales', None)
+    monkeypatch.setattr(dashboard_app, 'row_index', None)
+    pruned = []
+    prune = PartitionedDataset.prune
+    monkeypatch.setattr(PartitionedDataset, 'prune', lambda self, *args: pruned.append(prune(self, *args)) or pruned[-1])
+    view = dashboard_app.view_aggregates(3, filters)
+    assert [keys(partitions) for partitions in pruned] == [['2019-03']]
+    for name in ('month', 'to_date'):
+        pd.testing.assert_series_equal(view[name], expected[name], check_names=False)
+    pd.testing.assert_frame_equal(view['monthly'], expected['monthly'], check_names=False, check_freq=False)
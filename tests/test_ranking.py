@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking import Ranking, top_positions
+
+
+@pytest.fixture
+def product_sales(orders):
+    return orders.groupby('Product')['Sales'].sum()
+
+
+def test_top_positions_highest_first():
+    values = np.array([3.0, 9.0, 1.0, 7.0, 5.0])
+    assert list(top_positions(values, 2)) == [1, 3]
+    assert list(top_positions(values, 10)) == [1, 3, 4, 0, 2]
+    assert len(top_positions(values, 0)) == 0
+
+
+def test_top_and_bottom_like_a_full_sort(product_sales):
+    ranking = Ranking(product_sales, n_top=4, n_bottom=5)
+    ordered = product_sales.sort_values(ascending=False)
+    assert list(ranking.top.index) == list(ordered.index[:4])
+    assert list(ranking.bottom.index) == list(ordered.index[::-1][:5])
+    assert ranking.size == len(product_sales) and np.isclose(ranking.total, product_sales.sum())
+
+
+def test_shares(product_sales):
+    ranking = Ranking(product_sales, n_top=3, n_bottom=3)
+    total = product_sales.sum()
+    top = product_sales.sort_values(ascending=False)[:3]
+    np.testing.assert_allclose(ranking.top['share'], top / total)
+    np.testing.assert_allclose(ranking.top['cumulative_share'], top.cumsum() / total)
+    assert np.isclose(ranking.top_share, top.sum() / total)
+    assert np.isclose(ranking.bottom_share, product_sales.sort_values()[:3].sum() / total)
+
+
+def test_ties_keep_the_order_of_the_items():
+    values = pd.Series([2.0, 5.0, 5.0, 1.0, 5.0], index=list('abcde'))
+    assert list(Ranking(values, n_top=3, n_bottom=1).top.index) == ['b', 'c', 'e']
+
+
+def test_fewer_items_than_asked():
+    values = pd.Series([2.0, 1.0], index=['a', 'b'])
+    ranking = Ranking(values, n_top=5, n_bottom=5)
+    assert list(ranking.top.index) == ['a', 'b'] and list(ranking.bottom.index) == ['b', 'a']
+
+
+def test_highlight(product_sales):
+    ranking = Ranking(product_sales, n_top=2, n_bottom=2)
+    colors = ranking.highlight(product_sales.index, 'green', 'red', 'grey')
+    ordered = product_sales.rank(ascending=False)
+    expected = np.where(ordered <= 2, 'green', np.where(ordered > len(product_sales) - 2, 'red', 'grey'))
+    assert list(colors) == list(expected)
@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope='module')
+def dataset(orders_csv, tmp_path_factory):
+    """ dataset folder of the report with the generated orders of 2018 and 2019 """
+    folder = tmp_path_factory.mktemp('report_dataset')
+    shutil.copy(orders_csv, folder / 'clean_data.csv')
+    for name in ('raw_data.csv', 'city_info.csv'):
+        shutil.copy(os.path.join(ROOT, 'rapport', 'data', name), folder / name)
+    return str(folder)
+
+
+def test_one_point_per_month_of_each_year(rapport_app, dataset, orders):
+    figures = rapport_app.create_figures(**rapport_app.select_report(dataset, '2018:2019'))
+    monthly = figures['ca_per_month']
+    expected = orders.groupby(orders['Order Date'].str[:7])['Sales'].sum()
+    assert len(monthly['data'][0]['x']) == 24 and monthly['data'][0]['x'][0].endswith(' 2018')
+    np.testing.assert_allclose(monthly['data'][0]['y'], expected.to_numpy())
+    # the quiet months of both years are shaded, both Decembers pointed at
+    assert len(monthly['layout']['shapes']) == 4
+    assert [annotation['x'] for annotation in monthly['layout']['annotations'] if annotation['text'] == '<b>Fêtes</b>'] == [11, 23]
+
+
+def test_city_factors_use_the_sales_of_the_period(rapport_app, dataset, orders):
+    report = rapport_app.select_report(dataset, '2018')
+    sales = orders[orders['Order Date'] < '2019'].groupby('City')['Sales'].sum()
+    city_info = report['city_info'].set_index('City')
+    np.testing.assert_allclose(city_info['Sales'], sales[city_info.index])
+    figures = rapport_app.create_figures(**report)
+    np.testing.assert_allclose(figures['sales_income']['data'][0]['y'], sales[city_info.index])
+
+
+def test_ranges_and_annotations_follow_the_data(rapport_app, dataset):
+    report = rapport_app.select_report(dataset, '2019-03', ['Boston'])
+    figures = rapport_app.create_figures(**report)
+    products = report['orders'].sum_by('products', ['Product', 'Price Each'])['Sales'].reset_index()
+    scatter = figures['scatter_plot_product']['layout']
+    assert scatter['yaxis']['range'][1] == pytest.approx(1.1 * products['Sales'].max())
+    best = products.loc[products['Sales'].idxmax()]
+    assert scatter['annotations'][0]['text'].startswith(f"<b>{best['Product']}</b>")
+    assert scatter['annotations'][0]['y'] == pytest.approx(best['Sales'])
+
+
+def test_texts_of_a_filtered_report(rapport_app, dataset):
+    text = str(rapport_app.build_layout(dataset, '2018', ('Boston', 'Seattle')).to_plotly_json())
+    assert "durant l'année 2018 à Boston et Seattle" in text
+    city_info = rapport_app.select_report(dataset, '2018', ['Boston', 'Seattle'])['city_info']
+    best = city_info.loc[city_info['Sales'].idxmax(), 'City']
+    assert "2 villes américaines" in text and f"on observe que {best} est la ville" in text
+    # the share of the orders with several products was only measured on 2019
+    assert '2.7%' not in text
+    full = str(rapport_app.build_layout(dataset).to_plotly_json())
+    assert "durant la période 2018 - 2019" in full and '2.7%' not in full
@@ -0,0 +1,133 @@
+import os
+import time
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.result_cache import SharedCache, content_version
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def test_round_trip_of_the_shared_types(directory):
+    cache = SharedCache(directory, 'v1', classes=(Point,))
+    dates = pd.date_range('2019-01-01', periods=3, freq='MS', name='Date')
+    value = dict(
+        figure={'data': [{'x': [1, 2], 'y': [0.5, float('nan')]}], 'layout': {}},
+        outputs=(1, 'a', None),
+        keys={('Boston', 1): 2.0},
+        array=np.arange(6, dtype='int32').reshape(2, 3),
+        dates=dates,
+        strings=np.array(['a', None], dtype=object),
+        scalar=np.int32(3),
+        frame=pd.DataFrame({'Sales': [1.0, 2.0, 3.0], 'City': ['a', 'b', 'c']}, index=dates),
+        series=pd.Series([1, 2], index=pd.Index(['a', 'b'], name='Cat'), name='Sales'),
+        point=Point(np.ones(2), pd.Index([1, 2])),
+    )
+    cache.set('key', value)
+    read = SharedCache(directory, 'v1', classes=(Point,)).get('key')
+    assert read['figure']['data'][0]['x'] == [1, 2] and np.isnan(read['figure']['data'][0]['y'][1])
+    assert read['outputs'] == (1, 'a', None) and read['keys'] == {('Boston', 1): 2.0}
+    assert read['array'].dtype == 'int32' and np.array_equal(read['array'], value['array'])
+    assert read['dates'].equals(dates) and read['dates'].freq == dates.freq and read['dates'].name == 'Date'
+    assert list(read['strings']) == ['a', None]
+    assert read['scalar'] == 3 and isinstance(read['scalar'], np.int32)
+    pd.testing.assert_frame_equal(read['frame'], value['frame'])
+    pd.testing.assert_series_equal(read['series'], value['series'])
+    assert isinstance(read['point'], Point) and np.array_equal(read['point'].x, np.ones(2))
+
+
+def test_only_the_given_classes_are_shared(directory):
+    cache = SharedCache(directory, 'v1')
+    cache.set('key', Point(1, 2))
+    assert cache.get('key') is None and cache.writes == 0
+    # written by a cache knowing Point, read by one which does not: a miss
+    SharedCache(directory, 'v1', classes=(Point,)).set('key', Point(1, 2))
+    assert cache.get('key') is None
+
+
+def test_a_pickle_is_never_loaded(directory):
+    cache = SharedCache(directory, 'v1')
+    with open(cache.path('key'), 'wb') as f:
+        pickle.dump({'a': 1}, f)
+    assert cache.get('key', 'missing') == 'missing'
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid'), reason="no owner nor mode on this platform")
+def test_folder_writable_by_others_is_refused(directory, tmp_path):
+    cache = SharedCache(directory, 'v1')
+    assert os.stat(cache.directory).st_mode & 0o777 == 0o700
+    open_folder = tmp_path / 'open'
+    open_folder.mkdir()
+    os.chmod(open_folder, 0o777)
+    with pytest.raises(PermissionError):
+        SharedCache(str(open_folder))
+
+
+def test_content_version(tmp_path):
+    data = tmp_path / 'data.csv'
+    data.write_text('a,b\n1,2\n')
+    version = content_version(str(data))
+    os.utime(data, (0, 0))
+    assert content_version(str(data)) == version
+    data.write_text('a,b\n1,3\n')
+    assert content_version(str(data)) != version
+
+
+def test_get_or_compute_once_and_lock_removed(directory):
+    cache = SharedCache(directory, 'v1')
+    calls = []
+
+    def compute(value):
+        time.sleep(0.2)
+        calls.append(value)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        SharedCache(directory, 'v1').get_or_compute('key', compute, 21))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 4 and len(calls) == 1
+    assert [name for name in os.listdir(cache.folder) if not name.endswith('.json')] == []
+
+
+def test_ttl_and_max_bytes(directory):
+    cache = SharedCache(directory, 'v1', ttl=60)
+    cache.set('old', 1)
+    os.utime(cache.path('old'), (time.time() - 120, time.time() - 120))
+    assert cache.get('old') is None
+    for key in 'abc':
+        cache.set(key, np.zeros(100))
+    cache.get('a')
+    os.utime(cache.path('b'), (time.time() - 30, time.time()))
+    size = os.path.getsize(cache.path('a'))
+    cache.evict(max_bytes=2 * size)
+    assert cache.get('b') is None and cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get('old') is None and cache.stats()['entries'] == 2
+
+
+def test_other_versions_are_deleted_once_stale(directory):
+    old = SharedCache(directory, 'v1', stale=60)
+    old.set('key', 1)
+    new = SharedCache(directory, 'v2', stale=60)
+    # a worker still on the old data keeps its results
+    assert old.get('key') == 1
+    for entry in os.scandir(old.folder):
+        os.utime(entry.path, (time.time() - 120, time.time() - 120))
+    os.utime(old.folder, (time.time() - 120, time.time() - 120))
+    new.evict()
+    assert sorted(os.listdir(directory)) == ['v2']
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from row_index import RowIndex
+
+MARCH = [(pd.Timestamp('2019-03-01'), pd.Timestamp('2019-04-01'))]
+
+
+def positions(mask):
+    return np.flatnonzero(mask.to_numpy())
+
+
+def test_without_filter_every_row(sales):
+    assert np.array_equal(np.sort(RowIndex(sales).rows()), np.arange(len(sales)))
+
+
+def test_rows_of_filters(sales):
+    rows = RowIndex(sales).rows({'City': ['Boston', 'Dallas'], 'Cat': 'Smartphone'})
+    mask = sales['City'].isin(['Boston', 'Dallas']) & (sales['Cat'] == 'Smartphone')
+    assert np.array_equal(np.sort(rows), positions(mask))
+
+
+def test_rows_of_date_ranges_end_excluded(sales):
+    ranges = MARCH + [(pd.Timestamp('2019-05-01'), pd.Timestamp('2019-05-10'))]
+    rows = RowIndex(sales).rows({'City': 'Austin'}, ranges)
+    dates = sales['Date']
+    in_ranges = np.logical_or.reduce([(dates >= start) & (dates < end) for start, end in ranges])
+    assert np.array_equal(np.sort(rows), positions((sales['City'] == 'Austin') & in_ranges))
+
+
+def test_rows_sorted_by_cell_then_date(sales):
+    rows = RowIndex(sales).rows({'City': 'Boston', 'Cat': 'Ordinateur'})
+    assert (np.diff(sales['Date'].to_numpy()[rows]) > np.timedelta64(0)).all()
+
+
+def test_unknown_value_and_empty_ranges_match_no_row(sales):
+    index = RowIndex(sales)
+    assert len(index.rows({'City': 'Nowhere'})) == 0
+    march = (sales['Date'] >= MARCH[0][0]) & (sales['Date'] < MARCH[0][1])
+    assert np.array_equal(np.sort(index.rows({'City': ['Nowhere', 'Boston']}, MARCH)), positions((sales['City'] == 'Boston') & march))
+    # a month absent from the data has no range: no row, not every row
+    assert len(index.rows(None, [])) == 0
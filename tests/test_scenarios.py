@@ -0,0 +1,53 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from scenarios import simulate, percentiles
+
+DASHBOARD_DATE = datetime.date(2019, 5, 23)
+
+
+def monthly(sales, column):
+    return sales.groupby(sales['Date'].dt.to_period('M').dt.start_time)[column].sum().to_numpy()
+
+
+def test_shapes_and_months(sales):
+    results = simulate(sales, DASHBOARD_DATE, n_scenarios=200)
+    assert list(results['months']) == list(pd.date_range('2019-01-01', periods=12, freq='MS'))
+    for metric in ('sales_2020', 'profit_2020'):
+        assert results[metric]['target'].shape == results[metric]['progress'].shape == (200, 12)
+
+
+def test_seeded(sales):
+    first = simulate(sales, DASHBOARD_DATE, n_scenarios=50, seed=1)
+    again = simulate(sales, DASHBOARD_DATE, n_scenarios=50, seed=1)
+    other = simulate(sales, DASHBOARD_DATE, n_scenarios=50, seed=2)
+    assert np.array_equal(first['sales_2020']['progress'], again['sales_2020']['progress'])
+    assert not np.array_equal(first['sales_2020']['progress'], other['sales_2020']['progress'])
+
+
+def test_without_deviation_the_targets_of_the_notebook(sales):
+    # sales_target = sales_2019 * 1.15, profit_target = sales_target * 0.08 (generate_data.ipynb)
+    results = simulate(sales, DASHBOARD_DATE, n_scenarios=3, city_sd=0, cat_sd=0, margin_sd=0)
+    expected = monthly(sales, 'sales_2019') * 1.15
+    np.testing.assert_allclose(results['sales_2020']['target'], np.tile(expected, (3, 1)))
+    np.testing.assert_allclose(results['profit_2020']['target'], np.tile(expected * 0.08, (3, 1)))
+
+
+def test_past_months_are_known(sales):
+    results = simulate(sales, DASHBOARD_DATE, n_scenarios=100)
+    progress = results['sales_2020']['progress']
+    known = monthly(sales, 'sales_2020')
+    # january to april are over: the month-end actual is known, only the target varies
+    np.testing.assert_allclose(progress[:, :4] * results['sales_2020']['target'][:, :4], np.tile(known[:4], (100, 1)))
+    # june onwards is projected: the scenarios spread
+    assert progress[:, 6].std() > progress[:, 0].std()
+
+
+def test_percentiles():
+    values = np.random.default_rng(0).normal(1, 0.1, (1000, 12))
+    bands = percentiles(values, [5, 50, 95])
+    assert bands.shape == (3, 12)
+    assert (bands[0] < bands[1]).all() and (bands[1] < bands[2]).all()
+    np.testing.assert_allclose(bands[1], np.median(values, axis=0))
@@ -0,0 +1,62 @@
+import json
+import base64
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from shared.serializer import typed_array, encode_array, prepare_figure
+
+
+def decode(spec):
+    """ typed array spec -> numpy array, as plotly.js reads it """
+    array = np.frombuffer(base64.b64decode(spec['bdata']), dtype=np.dtype(spec['dtype']).newbyteorder('<'))
+    return array.reshape([int(n) for n in spec['shape'].split(',')]) if 'shape' in spec else array
+
+
+def test_typed_array_round_trip():
+    values = np.array([1.5, -2.25, 3.0])
+    spec = typed_array(values)
+    assert spec['dtype'] == 'f8' and np.array_equal(decode(spec), values)
+    matrix = np.arange(6, dtype='f4').reshape(2, 3)
+    spec = typed_array(matrix)
+    assert spec['shape'] == '2,3' and np.array_equal(decode(spec), matrix)
+
+
+def test_typed_array_casts_the_types_plotly_does_not_read():
+    assert typed_array(np.array([True, False]))['dtype'] == 'u1'
+    small = typed_array(np.array([1, 2**20], dtype='i8'))
+    assert small['dtype'] == 'i4' and list(decode(small)) == [1, 2**20]
+    big = typed_array(np.array([1, 2**40], dtype='i8'))
+    assert big['dtype'] == 'f8' and list(decode(big)) == [1, 2**40]
+    assert typed_array(np.array([], dtype='i8'))['dtype'] == 'i4'
+
+
+def test_encode_array():
+    assert encode_array(np.array([1.0, np.nan, np.inf])) == [1.0, None, None]
+    # NaN are not valid json, nor typed: the list is kept
+    assert encode_array(np.array([1.0, np.nan]), typed=True) == [1.0, None]
+    assert encode_array(np.array([1.0, 2.0]), typed=True)['dtype'] == 'f8'
+    assert encode_array(np.array(['a', 'b'], dtype=object), typed=True) == ['a', 'b']
+    assert encode_array(np.array(['2019-01-01', '2019-01-02'], dtype='datetime64[D]')) == ['2019-01-01', '2019-01-02']
+    dates = np.array([datetime.datetime(2019, 1, 1, 12), datetime.datetime(2019, 1, 2)], dtype=object)
+    assert list(pd.to_datetime(encode_array(dates))) == list(pd.to_datetime(dates))
+
+
+def test_prepare_figure_only_json_native_types():
+    index = pd.date_range('2019-01-01', periods=3, freq='D')
+    figure = go.Figure(go.Scatter(x=index, y=pd.Series([1.0, np.nan, 3.0]), text=np.array(['a', 'b', 'c'])))
+    prepared = prepare_figure(figure)
+    trace = prepared['data'][0]
+    assert trace['y'] == [1.0, None, 3.0] and trace['text'] == ['a', 'b', 'c']
+    assert [x[:10] for x in trace['x']] == ['2019-01-01', '2019-01-02', '2019-01-03']
+    assert prepare_figure({'a': (np.int64(1), np.float32(0.5), float('nan'))}) == {'a': [1, 0.5, None]}
+    # the same figure as plotly's own encoder
+    assert prepare_figure(figure)['data'][0]['y'] == json.loads(figure.to_json())['data'][0]['y']
+
+
+def test_prepare_figure_typed():
+    prepared = prepare_figure({'x': np.arange(3), 'y': pd.Series([0.5, 1.5, 2.5])}, typed=True)
+    assert np.array_equal(decode(prepared['x']), [0, 1, 2]) and np.array_equal(decode(prepared['y']), [0.5, 1.5, 2.5])
+    assert prepare_figure({'x': np.arange(3)}, typed=True)['x']['dtype'] == 'i4'
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from star import StarSchema
+
+
+def expected(orders, attributes):
+    return orders.groupby(attributes)[StarSchema.measures].sum()
+
+
+def test_dimension_tables_hold_each_value_once(summed_orders):
+    star = StarSchema(summed_orders)
+    assert len(star.tables['products']) == summed_orders['Product'].nunique()
+    assert len(star.tables['cities']) == summed_orders['City'].nunique()
+    assert len(star.tables['periods']) == summed_orders['Period'].nunique() == 24
+    assert star.facts['product_id'].dtype == 'int32' and star.facts['Hour'].dtype == 'int8'
+    assert len(star.facts) == len(summed_orders.groupby(['Period', 'Hour', 'City', 'Product']))
+
+
+def test_sum_by_like_a_group_by_of_the_orders(summed_orders):
+    star = StarSchema(summed_orders)
+    pd.testing.assert_frame_equal(star.sum_by('products'), expected(summed_orders, ['Product', 'Cat', 'Price Each']))
+    pd.testing.assert_frame_equal(star.sum_by('cities', ['City']), expected(summed_orders, ['City']))
+    pd.testing.assert_frame_equal(star.sum_by('periods', ['Month_num']), expected(summed_orders, ['Month_num']))
+
+
+def test_add_merges_the_facts(summed_orders):
+    # the second half brings new periods, the facts of the same keys are summed
+    half = len(summed_orders) // 2
+    star = StarSchema(summed_orders.iloc[:half]).add(summed_orders.iloc[half:])
+    pd.testing.assert_frame_equal(star.sum_by('periods', ['Period']), expected(summed_orders, ['Period']))
+    assert not star.facts.duplicated(StarSchema.fact_keys).any()
+
+
+def test_restrict_to_a_city(summed_orders):
+    star = StarSchema(summed_orders)
+    boston = star.restrict('cities', star.tables['cities']['City'] == 'Boston')
+    rows = summed_orders[summed_orders['City'] == 'Boston']
+    pd.testing.assert_frame_equal(boston.sum_by('products', ['Product']), expected(rows, ['Product']))
+    # the dimension rows without facts are left out of the sums
+    nothing = star.restrict('cities', np.zeros(len(star.tables['cities']), dtype=bool))
+    assert nothing.sum_by('products').empty
+
+
+def test_timestamps_of_the_facts(summed_orders):
+    star = StarSchema(summed_orders)
+    assert star.facts['Timestamp'].dtype == 'int64'
+    periods = star.tables['periods']['Period'].to_numpy()[star.facts['period_id']]
+    hours = pd.to_timedelta(star.facts['Hour'].astype('int64'), unit='h')
+    expected_times = pd.to_datetime(periods) + hours.to_numpy()
+    np.testing.assert_array_equal(pd.to_datetime(star.facts['Timestamp']), expected_times)
+
+
+def test_restricted_schema_has_its_own_tables(summed_orders):
+    first_year = summed_orders['Period'] < '2019'
+    star = StarSchema(summed_orders[first_year])
+    periods = star.tables['periods']
+    boston = star.restrict('cities', star.tables['cities']['City'] == 'Boston')
+    assert boston.tables is not star.tables
+    # the new periods of the restricted schema are not added to the tables of star
+    boston.add(summed_orders[~first_year])
+    assert star.tables['periods'] is periods and len(periods) == 12
+    assert len(boston.tables['periods']) == 24
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from shared.styling import threshold_colors, palette_codes, palette_colors, millify, percent_labels
+
+
+def test_threshold_colors():
+    colors = threshold_colors(pd.Series([0.5, 1, 1.5, np.nan]), 1, 'green', 'red')
+    assert list(colors) == ['red', 'green', 'green', 'red']
+
+
+def test_palette_of_categories():
+    palette = {'Smartphone': 'blue', 'TV & Moniteur': 'green'}
+    values = ['TV & Moniteur', 'Ordinateur', 'Smartphone']
+    assert list(palette_codes(values, palette)) == [1, -1, 0]
+    assert list(palette_colors(values, palette)) == ['green', 'grey', 'blue']
+    assert list(palette_colors(values, palette, default='black')) == ['green', 'black', 'blue']
+
+
+def test_millify_units():
+    labels = millify(pd.Series([1234, 999_999, 1_000_000, 1_234_567, 8_262_203.87]))
+    assert list(labels) == ['1.2K', '1000.0K', '1.0M', '1.2M', '8.3M']
+
+
+def test_millify_small_values_and_scalars():
+    assert list(millify([12.5, 999])) == ['12.5', '999']
+    assert millify(1234) == '1.2K'
+    assert millify(np.zeros((2, 2))).shape == (2, 2)
+
+
+def test_percent_labels():
+    assert list(percent_labels([0.583, 1.2, 0])) == ['58%', '120%', '0%']
+    assert list(percent_labels([0.5834], decimals=1)) == ['58.3%']
+    assert list(percent_labels(pd.Series([58.3]), scale=1)) == ['58%']
+
+
+def test_percent_label_of_a_scalar():
+    assert percent_labels(0.583) == '58%'
+    assert percent_labels(0.5834, decimals=1) == '58.3%'
+
+
+def test_small_ints_stay_ints():
+    assert list(millify([1, 2500])) == ['1', '2.5K']
+    assert list(millify([1, 2500.5, 12.5])) == ['1', '2.5K', '12.5']
+    assert list(millify(pd.Series([7, 1_500_000]))) == ['7', '1.5M']
+    assert millify(np.int64(5)) == '5'
+
+
+def test_missing_values():
+    with np.errstate(all='raise'):
+        assert list(percent_labels([0.5, np.nan, np.inf, -np.inf])) == ['50%', '-', '-', '-']
+        assert percent_labels(np.nan) == '-' and percent_labels(np.nan, missing='') == ''
+        assert list(percent_labels(pd.Series([0.25, None]), decimals=1)) == ['25.0%', '-']
+        assert list(millify([np.nan, 1e7, np.inf])) == ['-', '10.0M', '-']
+    assert list(percent_labels([-0.004])) == ['0%']
+    assert len(millify([])) == 0 and len(percent_labels([])) == 0
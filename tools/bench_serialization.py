@@ -0,0 +1,96 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                  SERIALIZATION BENCHMARK
+   -------------------------------------------------------------------------------------------
+   Build and serialization cost per figure, from the same data (numpy arrays, series):
+
+        * before: what the dashboard did before the figure templates, a go.Figure built from the
+          static properties and the data (plotly validates every property), then encoded by
+          PlotlyJSONEncoder as dash does with a go.Figure
+        * after: FigureTemplate.fill of the data (shared.serializer, plain lists) then encoded by dash
+        * typed: the same with base64 typed arrays
+
+   The dashboard figures are the fill() calls of one view of the dashboard, recorded with their
+   data as compute_outputs passes it.
+
+   usage (from the root of the project):
+        python tools/bench_serialization.py
+        python tools/bench_serialization.py --points 1000 100000 --repeat 20
+'''
+import os
+import sys
+import json
+import timeit
+import argparse
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.utils import PlotlyJSONEncoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+# the modules of the dashboard, imported by name as the app does
+sys.path.insert(0, os.path.join(ROOT, 'dashboard'))
+from figure_template import FigureTemplate, merge
+
+
+def dashboard_figures():
+    """ template, traces and layout of every fill() of the default view of the dashboard """
+    os.chdir(os.path.join(ROOT, 'dashboard'))
+    os.environ['WARM_UP'] = '0'
+    import app
+    calls = []
+    fill = FigureTemplate.fill
+
+    def record(template, traces=(), layout=None):
+        calls.append((template, traces, layout))
+        return fill(template, traces, layout)
+
+    FigureTemplate.fill = record
+    try:
+        app.compute_outputs(app.registry[0].key, app.dashboard_date.month)
+    finally:
+        FigureTemplate.fill = fill
+    names = {id(template): name for name, template in app.create_templates().items()}
+    return {names[id(template)]: (template, traces, layout) for template, traces, layout in calls}
+
+
+def series_figure(n_points):
+    """ actual vs target time series, the kind of chart the dashboard is growing to """
+    dates = pd.date_range('2015-01-01', periods=n_points, freq='H')
+    rng = np.random.default_rng(42)
+    target = rng.uniform(1e4, 1e5, n_points)
+    template = FigureTemplate(go.Figure([go.Scattergl(name='Objectif'), go.Scattergl(name="Chiffre d'affaires")]))
+    traces = [dict(x=dates, y=target), dict(x=dates, y=target * rng.uniform(0.4, 2, n_points))]
+    return template, traces, None
+
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def bench(figures, repeat):
+    print(f"{'figure':<20}{'before (ms)':>14}{'after (ms)':>14}{'typed (ms)':>14}{'size before':>14}{'size typed':>14}")
+    for name, (template, traces, layout) in figures.items():
+        typed_template = FigureTemplate({'data': template.data, 'layout': template.layout}, typed=True)
+        # the static properties and the data of the request in one figure, validated at each call
+        figure = {
+            'data': [merge(static, trace) for static, trace in zip(template.data, list(traces) + [{}] * len(template.data))],
+            'layout': merge(template.layout, layout) if layout else template.layout}
+        before = lambda: json.dumps(go.Figure(figure), cls=PlotlyJSONEncoder)
+        after = lambda: json.dumps(template.fill(traces, layout), cls=PlotlyJSONEncoder)
+        typed = lambda: json.dumps(typed_template.fill(traces, layout), cls=PlotlyJSONEncoder)
+        print(f"{name:<20}{measure(before, repeat):>14.2f}{measure(after, repeat):>14.2f}{measure(typed, repeat):>14.2f}"
+            f"{len(before()):>14}{len(typed()):>14}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="serialization cost per figure")
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000], help="number of points of the time series")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    figures = {f'series_{n}': series_figure(n) for n in args.points}
+    figures = {**dashboard_figures(), **figures}
+    bench(figures, args.repeat)
@@ -0,0 +1,68 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                    STYLING BENCHMARK
+   -------------------------------------------------------------------------------------------
+   Colors and labels of n rows (cities, categories, products...), before: the python function
+   applied to every row that the apps used and after: shared.styling, for a growing n.
+
+   usage (from the root of the project):
+        python tools/bench_styling.py
+        python tools/bench_styling.py --rows 10 1000 100000 --repeat 20
+'''
+import os
+import sys
+import timeit
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from shared.styling import threshold_colors, palette_codes, millify, percent_labels
+
+green, red = '#55a630', '#e71d36'
+
+
+def millify_row(n):
+    if n > 999:
+        if n > 1e6-1:
+            return f'{round(n/1e6,1)}M'
+        return f'{round(n/1e3,1)}K'
+    return n
+
+
+def cases(n_rows):
+    """ (name, before, after) of each styling function for n_rows rows """
+    rng = np.random.default_rng(42)
+    percents = pd.Series(rng.uniform(0.5, 1.5, n_rows))
+    sales = pd.Series(rng.uniform(0, 1e7, n_rows))
+    palette = {f'cat_{i}': f'#{i:06x}' for i in range(max(n_rows // 10, 1))}
+    cats = pd.Series(rng.choice(list(palette), n_rows))
+    str_to_int = {key: i for i, key in enumerate(palette)}
+    return [
+        ('threshold_colors', lambda: percents.apply(lambda x: green if x >= 1 else red), lambda: threshold_colors(percents, 1, green, red)),
+        ('palette_codes', lambda: cats.apply(lambda x: str_to_int[x]), lambda: palette_codes(cats, palette)),
+        ('millify', lambda: sales.apply(lambda x: millify_row(x)), lambda: millify(sales)),
+        ('percent_labels', lambda: [f"{int(np.round(p))}%" for p in percents * 100], lambda: percent_labels(percents)),
+    ]
+
+
+def measure(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def bench(rows, repeat):
+    print(f"{'function':<20}{'rows':>10}{'before (ms)':>14}{'after (ms)':>14}")
+    for n_rows in rows:
+        for name, before, after in cases(n_rows):
+            print(f"{name:<20}{n_rows:>10}{measure(before, repeat):>14.3f}{measure(after, repeat):>14.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="cost of the styling functions per number of rows")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000], help="number of rows styled")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    bench(args.rows, args.repeat)
@@ -0,0 +1,308 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                        LOAD TEST
+   -------------------------------------------------------------------------------------------
+   Simulated users replaying what a browser sends to an app, at growing concurrency:
+
+        * dashboard: page load (/, /_dash-layout, /_dash-dependencies, the initial callbacks)
+          then metric and month switches (view job submitted then polled until its figures
+          come back, daily_update, export links)
+        * rapport: page loads of reports of random periods and cities (serve_report)
+
+   For each number of users: throughput, latency percentiles and error rate, in total and per
+   request. 'view' is the time from the submission of a view job to its figures: a poll answered
+   without figures (204, lost job) or a view still not ready after max_polls count as errors.
+   The app is started locally (flask threaded server, or gunicorn with --workers, see
+   requirements.txt) unless --url points to a running one.
+
+   usage (from the root of the project):
+        python tools/load_test.py dashboard
+        python tools/load_test.py dashboard --users 1 4 16 --duration 30 --workers 4
+        python tools/load_test.py rapport --url http://127.0.0.1:8050 --json load_rapport.json
+'''
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+import brotli
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# started in the app folder when no --url is given
+SERVE = "import app; app.app.run_server(host='127.0.0.1', port={port}, debug=False, threaded=True)"
+
+
+'''----- HTTP -----'''
+
+class Client:
+    """ one keep-alive connection per simulated user, every request is timed into results """
+    def __init__(self, url, results, encoding='gzip'):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.results = results
+        self.encoding = encoding
+        self.connection = None
+
+    def request(self, name, method, path, body=None, expect_body=False):
+        """
+            return the decoded json body, None for an error or a non json response.
+            expect_body: a response without body (204) is an error
+        """
+        headers = {'Accept-Encoding': self.encoding}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            ok = response.status < 400 and not (expect_body and response.status == 204)
+            content_encoding = response.getheader('Content-Encoding')
+        except (OSError, http.client.HTTPException):
+            self.connection = None
+            ok, data, content_encoding = False, b'', None
+        self.results.append((name, time.perf_counter() - start, ok))
+        if not ok or not data.strip():
+            return None
+        if content_encoding == 'gzip':
+            data = gzip.decompress(data)
+        elif content_encoding == 'br':
+            data = brotli.decompress(data)
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def page(self):
+        """ what dash loads before the first callback """
+        self.request('index', 'GET', '/')
+        layout = self.request('layout', 'GET', '/_dash-layout')
+        self.request('dependencies', 'GET', '/_dash-dependencies')
+        return layout
+
+    def callback(self, name, outputs, inputs, changed=None, state=(), expect_body=False):
+        """
+            * outputs: (id, property) updated by the callback (list)
+            * inputs, state: (id, property, value) (list)
+        """
+        ids = [f'{component}.{prop}' for component, prop in outputs]
+        body = {
+            'output': ids[0] if len(ids) == 1 else '..' + '...'.join(ids) + '..',
+            'outputs': [{'id': c, 'property': p} for c, p in outputs] if len(ids) > 1 else {'id': outputs[0][0], 'property': outputs[0][1]},
+            'inputs': [{'id': c, 'property': p, 'value': v} for c, p, v in inputs],
+            'changedPropIds': [changed or f'{inputs[0][0]}.{inputs[0][1]}'],
+            'state': [{'id': c, 'property': p, 'value': v} for c, p, v in state],
+        }
+        return self.request(name, 'POST', '/_dash-update-component', body, expect_body)
+
+
+def output_value(response, component_id, prop):
+    """ value of an output in the json response of a callback, None if it was not updated """
+    if not response:
+        return None
+    return response.get('response', {}).get(component_id, {}).get(prop)
+
+
+def find_component(layout, component_id):
+    """ props of the component of a dash layout (json) with this id """
+    if isinstance(layout, list):
+        for child in layout:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    elif isinstance(layout, dict):
+        props = layout.get('props', {})
+        if props.get('id') == component_id:
+            return props
+        return find_component(props.get('children'), component_id)
+    return None
+
+
+'''----- SESSIONS -----'''
+
+def dashboard_session(client, rng, switches=10, max_polls=120, poll_interval=0.5):
+    """ a user opening the dashboard then switching metric and month """
+    layout = client.page()
+    metric_props = find_component(layout, 'metric_dropwdown') or {}
+    month_props = find_component(layout, 'date_dropwdown') or {}
+    metric_values = [option['value'] for option in metric_props.get('options', [])] or ['sales_2020']
+    month_values = [option['value'] for option in month_props.get('options', [])] or [1]
+    metric, month, filters = metric_props.get('value', metric_values[0]), month_props.get('value', month_values[0]), {}
+    view_job = view_current = None
+    view_outputs = [('progress_pie', 'figure'), ('card_sum', 'figure'), ('city_sales', 'figure'), ('monthly_sales', 'figure'),
+        ('cat_sales', 'figure'), ('city_cat_heatmap', 'figure'), ('view_progress', 'value'), ('view_error', 'children'),
+        ('view_poll', 'disabled'), ('view_current', 'data')]
+
+    def update(changed, daily=False):
+        nonlocal view_job, view_current
+        view = [('metric_dropwdown', 'value', metric), ('date_dropwdown', 'value', month), ('filters', 'data', filters)]
+        # the figures are computed as a job: submitted, then polled until the poll is disabled
+        submitted = client.callback('view_submit', [('view_job', 'data')], view, changed,
+            [('view_job', 'data', view_job), ('view_current', 'data', view_current)])
+        view_job = output_value(submitted, 'view_job', 'data') or view_job
+        start, ready = time.perf_counter(), False
+        for polls in range(1, max_polls + 1):
+            polled = client.callback('view_poll', view_outputs, [('view_job', 'data', view_job), ('view_poll', 'n_intervals', polls)],
+                'view_job.data' if polls == 1 else 'view_poll.n_intervals', view + [('view_current', 'data', view_current)],
+                expect_body=True)
+            if polled is None:
+                break
+            # the job submitted again by a worker that did not know it
+            view_current = output_value(polled, 'view_current', 'data') or view_current
+            if output_value(polled, 'view_poll', 'disabled'):
+                ready = output_value(polled, 'progress_pie', 'figure') is not None
+                break
+            time.sleep(poll_interval)
+        client.results.append(('view', time.perf_counter() - start, ready))
+        client.callback('export_links', [('export_csv', 'href'), ('export_parquet', 'href')], view, changed)
+        if daily:
+            client.callback('daily_update', [('daily_sales', 'figure')], [
+                ('metric_dropwdown', 'value', metric), ('filters', 'data', filters),
+                ('granularity', 'value', 'D'), ('daily_sales', 'relayoutData', None)], changed)
+
+    update('metric_dropwdown.value', daily=True)
+    for _ in range(switches):
+        if rng.random() < 0.5:
+            metric = rng.choice(metric_values)
+            update('metric_dropwdown.value', daily=True)
+        else:
+            month = rng.choice(month_values)
+            update('date_dropwdown.value')
+
+
+def report_queries(n, seed=0):
+    """ n query strings of reports: every order, a month or a half year, some cities """
+    path = os.path.join(ROOT, 'rapport', 'data', 'city_info.csv')
+    with open(path) as f:
+        cities = [row['City'] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    queries = ['']
+    while len(queries) < n:
+        query = []
+        period = rng.choice([None, f'2019-{rng.randint(1, 12):02d}', '2019-01:2019-06', '2019-07:2019-12'])
+        if period:
+            query.append(('period', period))
+        query += [('city', city) for city in rng.sample(cities, rng.choice([0, 1, 2]))]
+        queries.append('?' + urlencode(query) if query else '')
+    return queries
+
+
+def rapport_session(client, rng, queries, pages=3):
+    """ a user opening a few reports """
+    for _ in range(pages):
+        client.page()
+        client.callback('serve_report', [('report', 'children')], [('url', 'search', rng.choice(queries))])
+
+
+'''----- RUN -----'''
+
+def run(url, users, duration, session, seed=0, encoding='gzip'):
+    """ users threads running sessions for duration seconds, return (results, elapsed) """
+    results = []
+    stop = time.perf_counter() + duration
+
+    def user(index):
+        rng = random.Random(seed + index)
+        client = Client(url, results, encoding)
+        while time.perf_counter() < stop:
+            session(client, rng)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    """ throughput, error rate and latency percentiles (ms), in total and per request name """
+    def stats(rows):
+        latencies = np.array([latency for _, latency, _ in rows]) * 1000
+        errors = sum(not ok for _, _, ok in rows)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(rows) else (np.nan,) * 3
+        return dict(requests=len(rows), errors=errors, error_rate=errors / max(len(rows), 1),
+            throughput=len(rows) / elapsed, p50=p50, p90=p90, p99=p99, max=latencies.max() if len(rows) else np.nan)
+    names = sorted({name for name, _, _ in results})
+    return dict(total=stats(results), **{name: stats([r for r in results if r[0] == name]) for name in names})
+
+
+def print_summary(users, summary):
+    print(f"\n>> {users} users <<")
+    print(f"{'request':<18}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, s in summary.items():
+        print(f"{name:<18}{s['requests']:>8}{s['error_rate']:>7.1%} {s['throughput']:>9.1f}"
+            f"{s['p50']:>9.1f}{s['p90']:>9.1f}{s['p99']:>9.1f}{s['max']:>9.1f}")
+
+
+def start_server(app_name, port, workers=None):
+    """ the app in a subprocess, return it once it answers """
+    if workers:
+        command = ['gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}', 'app:server']
+    else:
+        command = [sys.executable, '-c', SERVE.format(port=port)]
+    process = subprocess.Popen(command, cwd=os.path.join(ROOT, app_name), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"the {app_name} server stopped (exit code {process.returncode})")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/_dash-layout')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    sys.exit(f"the {app_name} server did not answer on port {port}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="concurrent users load test of an app")
+    parser.add_argument('app', choices=['dashboard', 'rapport'])
+    parser.add_argument('--url', help="running app (default: start one locally)")
+    parser.add_argument('--port', type=int, default=8765, help="port of the local app")
+    parser.add_argument('--workers', type=int, help="gunicorn workers of the local app (default: flask threaded server)")
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="numbers of concurrent users")
+    parser.add_argument('--duration', type=float, default=20, help="seconds per number of users")
+    parser.add_argument('--reports', type=int, default=20, help="distinct reports requested (rapport)")
+    parser.add_argument('--encoding', default='gzip', choices=['gzip', 'br', 'identity'], help="Accept-Encoding of the requests")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the summaries to this file")
+    args = parser.parse_args()
+
+    if args.app == 'dashboard':
+        session = dashboard_session
+    else:
+        queries = report_queries(args.reports, args.seed)
+        session = lambda client, rng: rapport_session(client, rng, queries)
+
+    server = None if args.url else start_server(args.app, args.port, args.workers)
+    url = args.url or f'http://127.0.0.1:{args.port}'
+    summaries = {}
+    try:
+        for users in args.users:
+            summaries[users] = summarize(*run(url, users, args.duration, session, args.seed, args.encoding))
+            print_summary(users, summaries[users])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(app=args.app, url=url, workers=args.workers, duration=args.duration, summaries=summaries), f, indent=1, default=float)
@@ -0,0 +1,59 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                      MEMORY REPORT
+   -------------------------------------------------------------------------------------------
+   Load an app as a worker would (data, aggregates, figures, every view of the dashboard or
+   the default report), then print what each object kept in memory weighs (shared.memory):
+   datasets and their columns, aggregates, caches and figures. The same report is served on
+   /_memory by a running app started with MEMORY_ENDPOINT=1.
+
+   usage (from the root of the project):
+        python tools/memory_report.py dashboard
+        python tools/memory_report.py rapport --top 5
+'''
+import os
+import sys
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from shared.memory import memory_report
+
+
+def load_app(app_name):
+    """ import the app from its folder and fill what a worker keeps after serving every view """
+    os.environ.setdefault('WARM_UP', '0')
+    os.chdir(os.path.join(ROOT, app_name))
+    sys.path.insert(0, os.getcwd())
+    import app
+    if app_name == 'dashboard':
+        for key in app.view_keys():
+            app.view_outputs(*key[:2], {})
+    else:
+        app.build_layout(app.default_dataset, None, ())
+    return app
+
+
+def megabytes(n):
+    return f"{n / 2**20:10.2f} MB" if n is not None else f"{'-':>13}"
+
+
+def print_report(report, top=10):
+    print(f"rss {megabytes(report['rss'])}    accounted {megabytes(report['total'])}")
+    for name, entry in sorted(report['objects'].items(), key=lambda item: -item[1]['bytes']):
+        print(f"\n{name:<40}{megabytes(entry['bytes'])}  ({entry['type']})")
+        if 'entries' in entry:
+            print(f"\t{entry['entries']} entries, {entry['evictions']} evictions, {entry['hits']} hits, {entry['misses']} misses")
+        details = entry.get('columns') or entry.get('items') or {}
+        for detail, size in sorted(details.items(), key=lambda item: -item[1])[:top]:
+            print(f"\t{detail:<32}{megabytes(size)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="memory kept by an app, per object")
+    parser.add_argument('app', choices=['dashboard', 'rapport'])
+    parser.add_argument('--top', type=int, default=10, help="columns or items shown per object")
+    args = parser.parse_args()
+
+    app = load_app(args.app)
+    print_report(memory_report(app.memory_objects()), args.top)
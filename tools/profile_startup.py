@@ -0,0 +1,94 @@
+'''
+   -------------------------------------------------------------------------------------------
+                                   STARTUP PROFILER
+   -------------------------------------------------------------------------------------------
+   Report the cold start cost of an app: import time per module (python -X importtime)
+   and the time spent in each initialization step that was moved out of import time.
+
+   usage (from the root of the project):
+        python tools/profile_startup.py dashboard
+        python tools/profile_startup.py rapport --top 30
+        python tools/profile_startup.py dashboard --init get_sales
+'''
+import os
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# initialization functions of each app, called in this order after the import
+INIT_STEPS = {
+    'dashboard': ['init_plotly', 'get_sales'],
+    'rapport': ['build_layout'],
+}
+
+# run inside the app folder: import the app then time each init step
+CHILD = '''
+import sys, json, time
+t = time.perf_counter()
+import app
+timings = [("import app", time.perf_counter() - t)]
+for step in sys.argv[1:]:
+    t = time.perf_counter()
+    getattr(app, step)()
+    timings.append((step, time.perf_counter() - t))
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(stderr):
+    """ sum the self time of every imported module per top level package (in seconds) """
+    packages = defaultdict(float)
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        modules.append((name, int(cumulative_us) / 1e6))
+        packages[name.split('.')[0]] += int(self_us) / 1e6
+    return packages, modules
+
+
+def profile(app_name, steps):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD] + steps,
+        cwd=os.path.join(ROOT, app_name),
+        # no background warm-up in the child, it would compete with the steps being timed
+        env={**os.environ, 'WARM_UP': '0'},
+        capture_output=True,
+        text=True)
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    packages, modules = parse_importtime(result.stderr)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return packages, modules, timings
+
+
+def report(app_name, packages, modules, timings, top=20):
+    print(f"STARTUP PROFILE: {app_name}")
+    print("---------------")
+    print("\n>> import time per package (self time) <<")
+    for name, seconds in sorted(packages.items(), key=lambda x: -x[1])[:top]:
+        print(f"\t{seconds * 1000:9.1f} ms  {name}")
+    print("\n>> slowest modules (cumulative time) <<")
+    for name, seconds in sorted(modules, key=lambda x: -x[1])[:top]:
+        print(f"\t{seconds * 1000:9.1f} ms  {name}")
+    print("\n>> initialization <<")
+    for step, seconds in timings:
+        print(f"\t{seconds * 1000:9.1f} ms  {step}")
+    print(f"\n\ttotal: {sum(s for _, s in timings) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="import and initialization time of a dash app")
+    parser.add_argument('app', choices=sorted(INIT_STEPS))
+    parser.add_argument('--init', action='append', help="init function of the app to time (default: all the known steps)")
+    parser.add_argument('--top', type=int, default=20, help="number of packages and modules to show")
+    args = parser.parse_args()
+
+    steps = args.init or INIT_STEPS[args.app]
+    report(args.app, *profile(args.app, steps), top=args.top)